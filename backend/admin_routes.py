@@ -1,15 +1,23 @@
 from flask import Blueprint, jsonify, request, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from .decorators import admin_required
-from .models import db, User, ServiceProfessional, Document, Service, ServiceRequest, Customer, Review
+from .models import db, User, ServiceProfessional, Document, Service, ServiceRequest, Customer, Review, DailyStat
+from .pagination import InvalidCursor, keyset_page
+from .fieldsets import InvalidFields, USER_FIELDS
+from .streaming import InvalidStream, stream_json_array, stream_requested
+from .exports import InvalidExport, export_response
+from .caching import bump_catalog_version, single_flight, single_flight_stats
+from .extensions import cache
+from .identity_cache import identity_cache_stats, invalidate_identity
+from .availability import refresh_availability
+from .warming import schedule_rewarm
 from datetime import datetime
-from sqlalchemy import func
+from sqlalchemy import func, case, and_
 from datetime import timedelta
 import os
 import logging
 from werkzeug.utils import secure_filename
 import uuid
-from celery.result import AsyncResult
 
 logger = logging.getLogger(__name__)
 admin_bp = Blueprint('admin', __name__)
@@ -17,9 +25,40 @@ admin_bp = Blueprint('admin', __name__)
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'service-images')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
+REQUIRED_DOCUMENT_TYPES = ['idProof', 'addressProof', 'qualification']
+BULK_ACTIONS = {'approve', 'reject', 'block', 'unblock'}
+MAX_BULK_USERS = 1000
+# Seconds analytics responses stay fresh before one worker recomputes them
+ANALYTICS_CACHE_TIMEOUT = 60
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def document_issues(documents):
+    """Return the (missing, unverified) required document types of a professional."""
+    uploaded_doc_types = [doc.document_type for doc in documents]
+    missing_docs = [doc_type for doc_type in REQUIRED_DOCUMENT_TYPES if doc_type not in uploaded_doc_types]
+    
+    unverified_docs = []
+    for doc_type in REQUIRED_DOCUMENT_TYPES:
+        matching_docs = [doc for doc in documents if doc.document_type == doc_type]
+        if not matching_docs or not matching_docs[0].verified:
+            unverified_docs.append(doc_type)
+    return missing_docs, unverified_docs
+
+def with_professional_details(query):
+    """Batch-load what ``ServiceProfessional.to_dict`` reads: documents and service."""
+    return query.options(
+        db.selectinload(ServiceProfessional.documents),
+        db.joinedload(ServiceProfessional.service)
+    )
+
+def with_user_details(query):
+    """Batch-load the subclass columns and relationships ``to_dict`` reads from a mixed user list."""
+    return with_professional_details(query.options(
+        db.selectin_polymorphic(User, [ServiceProfessional, Customer])
+    ))
+
 
 
 @admin_bp.route('/admin/users', methods=['GET'])
@@ -29,9 +68,25 @@ def get_all_users():
     """Get all users except admin users"""
     try:
         logger.debug("Admin requesting all users")
-        users = User.query.filter(User.role != 'admin').all()
+        fields = USER_FIELDS.requested()
+        query = User.query.filter(User.role != 'admin')
+        if fields:
+            query = USER_FIELDS.narrow(query, fields)
+        else:
+            query = with_user_details(query)
+
+        def serialize(user):
+            return USER_FIELDS.serialize(user, fields) if fields else user.to_dict()
+
+        if stream_requested():
+            return stream_json_array(query, User.id, serialize)
+        page = keyset_page(query, User.id)
+        users = page.rows if page else query.all()
         logger.debug(f"Found {len(users)} non-admin users")
-        return jsonify([user.to_dict() for user in users]), 200
+        result = [serialize(user) for user in users]
+        return jsonify(page.wrap(result) if page else result), 200
+    except (InvalidCursor, InvalidFields, InvalidStream) as e:
+        return jsonify({'msg': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting users: {str(e)}")
         return jsonify({'msg': str(e)}), 422
@@ -50,7 +105,7 @@ def get_professionals():
         logger.debug(f"Admin requesting professionals with filters: approved={approval_status}, active={active_status}, include_verification={include_verification}")
         
         # Start with base query for all professionals
-        query = ServiceProfessional.query
+        query = with_professional_details(ServiceProfessional.query)
         
         # Apply filters if provided
         if approval_status is not None:
@@ -61,42 +116,43 @@ def get_professionals():
             is_active = active_status.lower() == 'true'
             query = query.filter(ServiceProfessional.is_active == is_active)
         
-        professionals = query.all()
+        def serialize(pro):
+            pro_data = pro.to_dict()
+            if not include_verification:
+                # Just return basic professional info without verification details
+                return pro_data
+            
+            # Get documents for verification status
+            docs = pro.documents
+            pro_data['documents_count'] = len(docs)
+            
+            # Initialize document verification status
+            doc_types = {'idProof': False, 'addressProof': False, 'qualification': False}
+            
+            # Check verification status for each document
+            for doc in docs:
+                if doc.document_type in doc_types:
+                    doc_types[doc.document_type] = doc.verified
+            
+            # Set overall verification status
+            pro_data['documents_verified'] = all(doc_types.values()) and len(docs) >= 3
+            pro_data['documents_status'] = doc_types
+            
+            # Get service name if available
+            if pro.service_type_id:
+                pro_data['service_name'] = pro.service.name if pro.service else None
+            return pro_data
+        
+        if stream_requested():
+            return stream_json_array(query, ServiceProfessional.id, serialize)
+        page = keyset_page(query, ServiceProfessional.id)
+        professionals = page.rows if page else query.all()
         logger.debug(f"Found {len(professionals)} professionals matching criteria")
         
-        # If verification info is requested, include it
-        if include_verification:
-            result = []
-            for pro in professionals:
-                pro_data = pro.to_dict()
-                
-                # Get documents for verification status
-                docs = Document.query.filter_by(professional_id=pro.id).all()
-                pro_data['documents_count'] = len(docs)
-                
-                # Initialize document verification status
-                doc_types = {'idProof': False, 'addressProof': False, 'qualification': False}
-                
-                # Check verification status for each document
-                for doc in docs:
-                    if doc.document_type in doc_types:
-                        doc_types[doc.document_type] = doc.verified
-                
-                # Set overall verification status
-                pro_data['documents_verified'] = all(doc_types.values()) and len(docs) >= 3
-                pro_data['documents_status'] = doc_types
-                
-                # Get service name if available
-                if pro.service_type_id:
-                    service = Service.query.get(pro.service_type_id)
-                    pro_data['service_name'] = service.name if service else None
-                
-                result.append(pro_data)
-            
-            return jsonify(result), 200
-        else:
-            # Just return basic professional info without verification details
-            return jsonify([pro.to_dict() for pro in professionals]), 200
+        result = [serialize(pro) for pro in professionals]
+        return jsonify(page.wrap(result) if page else result), 200
+    except (InvalidCursor, InvalidStream) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting professionals: {str(e)}")
         return jsonify({'error': str(e)}), 422
@@ -115,7 +171,7 @@ def get_professionals_details():
         logger.debug(f"Admin requesting professionals with filters: approved={approval_status}, active={active_status}, include_verification={include_verification}")
         
         # Start with base query for all professionals
-        query = ServiceProfessional.query
+        query = with_professional_details(ServiceProfessional.query)
         
         # Apply filters if provided
         if approval_status is not None:
@@ -126,7 +182,8 @@ def get_professionals_details():
             is_active = active_status.lower() == 'true'
             query = query.filter(ServiceProfessional.is_active == is_active)
         
-        professionals = query.all()
+        page = keyset_page(query, ServiceProfessional.id)
+        professionals = page.rows if page else query.all()
         logger.debug(f"Found {len(professionals)} professionals matching criteria")
         
         # If verification info is requested, include it
@@ -136,7 +193,7 @@ def get_professionals_details():
                 pro_data = pro.to_dict()
                 
                 # Get documents for verification status
-                docs = Document.query.filter_by(professional_id=pro.id).all()
+                docs = pro.documents
                 pro_data['documents_count'] = len(docs)
                 
                 # Initialize document verification status
@@ -153,15 +210,16 @@ def get_professionals_details():
                 
                 # Get service name if available
                 if pro.service_type_id:
-                    service = Service.query.get(pro.service_type_id)
-                    pro_data['service_name'] = service.name if service else None
+                    pro_data['service_name'] = pro.service.name if pro.service else None
                 
                 result.append(pro_data)
-            
-            return jsonify(result), 200
         else:
             # Just return basic professional info without verification details
-            return jsonify([pro.to_dict() for pro in professionals]), 200
+            result = [pro.to_dict() for pro in professionals]
+        
+        return jsonify(page.wrap(result) if page else result), 200
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting professionals: {str(e)}")
         return jsonify({'error': str(e)}), 422
@@ -173,9 +231,16 @@ def get_customers():
     """Get all customer users"""
     try:
         logger.debug("Admin requesting all customers")
-        customers = Customer.query.all()
+        query = Customer.query
+        if stream_requested():
+            return stream_json_array(query, Customer.id, Customer.to_dict)
+        page = keyset_page(query, Customer.id)
+        customers = page.rows if page else query.all()
         logger.debug(f"Found {len(customers)} customers")
-        return jsonify([customer.to_dict() for customer in customers]), 200
+        result = [customer.to_dict() for customer in customers]
+        return jsonify(page.wrap(result) if page else result), 200
+    except (InvalidCursor, InvalidStream) as e:
+        return jsonify({'msg': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting customers: {str(e)}")
         return jsonify({'msg': str(e)}), 422
@@ -197,13 +262,7 @@ def approve_user(user_id):
         if user.role == 'professional':
             # Find all documents for this professional
             documents = Document.query.filter_by(professional_id=user_id).all()
-            
-            # Check if the professional has uploaded all required documents
-            required_doc_types = ['idProof', 'addressProof', 'qualification']
-            uploaded_doc_types = [doc.document_type for doc in documents]
-            
-            # Check for missing documents
-            missing_docs = [doc_type for doc_type in required_doc_types if doc_type not in uploaded_doc_types]
+            missing_docs, unverified_docs = document_issues(documents)
             
             if missing_docs:
                 logger.warning(f"Professional is missing required documents: {missing_docs}")
@@ -212,16 +271,6 @@ def approve_user(user_id):
                     'missing_documents': missing_docs
                 }), 400
             
-            # Check if all uploaded documents are verified
-            verified_status = {}
-            for doc_type in required_doc_types:
-                matching_docs = [doc for doc in documents if doc.document_type == doc_type]
-                if not matching_docs or not matching_docs[0].verified:
-                    verified_status[doc_type] = False
-                else:
-                    verified_status[doc_type] = True
-            
-            unverified_docs = [doc_type for doc_type, verified in verified_status.items() if not verified]
             if unverified_docs:
                 logger.warning(f"Professional has unverified documents: {unverified_docs}")
                 return jsonify({
@@ -238,6 +287,8 @@ def approve_user(user_id):
             professional.rejection_reason = None
         
         db.session.commit()
+        invalidate_identity(user_id)
+        refresh_availability(user_id)
         logger.info(f"User ID {user_id} ({user.username}) approved successfully")
         
         return jsonify({'message': 'User approved successfully', 'user': user.to_dict()}), 200
@@ -275,6 +326,8 @@ def reject_user(user_id):
                     professional.rejection_reason = rejection_reason
         
         db.session.commit()
+        invalidate_identity(user_id)
+        refresh_availability(user_id)
         logger.info(f"User ID {user_id} ({user.username}) rejected successfully")
         
         return jsonify({'message': 'User rejected successfully', 'user': user.to_dict()}), 200
@@ -298,6 +351,8 @@ def block_user(user_id):
             
         user.is_active = False
         db.session.commit()
+        invalidate_identity(user_id)
+        refresh_availability(user_id)
         logger.info(f"User ID {user_id} ({user.username}) blocked successfully")
         
         return jsonify({'message': 'User blocked successfully', 'user': user.to_dict()}), 200
@@ -320,6 +375,8 @@ def unblock_user(user_id):
             
         user.is_active = True
         db.session.commit()
+        invalidate_identity(user_id)
+        refresh_availability(user_id)
         logger.info(f"User ID {user_id} ({user.username}) unblocked successfully")
         
         return jsonify({'message': 'User unblocked successfully', 'user': user.to_dict()}), 200
@@ -327,6 +384,96 @@ def unblock_user(user_id):
         logger.error(f"Error unblocking user {user_id}: {str(e)}")
         return jsonify({'msg': str(e)}), 422
 
+@admin_bp.route('/admin/users/bulk/<string:action>', methods=['PUT'])
+@jwt_required()
+@admin_required
+def bulk_moderate_users(action):
+    """Approve, reject, block or unblock many users in a single transaction"""
+    try:
+        if action not in BULK_ACTIONS:
+            return jsonify({'error': f'Invalid action: {action}'}), 400
+        
+        data = request.get_json() or {}
+        user_ids = data.get('user_ids')
+        if not isinstance(user_ids, list) or not user_ids or \
+                not all(isinstance(user_id, int) for user_id in user_ids):
+            return jsonify({'error': 'user_ids must be a non-empty list of integers'}), 400
+        if len(user_ids) > MAX_BULK_USERS:
+            return jsonify({'error': f'At most {MAX_BULK_USERS} users can be moderated at once'}), 400
+        user_ids = list(dict.fromkeys(user_ids))
+        logger.debug(f"Admin bulk {action} for {len(user_ids)} users")
+        
+        roles = dict(db.session.query(User.id, User.user_type).filter(User.id.in_(user_ids)).all())
+        outcomes = {}
+        for user_id in user_ids:
+            if user_id not in roles:
+                outcomes[user_id] = {'id': user_id, 'status': 'error', 'error': 'User not found'}
+        
+        # Professionals can only be approved once their documents are verified
+        if action == 'approve':
+            professional_ids = [user_id for user_id, role in roles.items() if role == 'professional']
+            documents = {user_id: [] for user_id in professional_ids}
+            if professional_ids:
+                for doc in Document.query.filter(
+                    Document.professional_id.in_(professional_ids)
+                ).order_by(Document.id).all():
+                    documents[doc.professional_id].append(doc)
+            for user_id, docs in documents.items():
+                missing_docs, unverified_docs = document_issues(docs)
+                if missing_docs:
+                    outcomes[user_id] = {
+                        'id': user_id, 'status': 'error',
+                        'error': 'Cannot approve professional with missing required documents',
+                        'missing_documents': missing_docs
+                    }
+                elif unverified_docs:
+                    outcomes[user_id] = {
+                        'id': user_id, 'status': 'error',
+                        'error': 'Cannot approve professional with unverified documents',
+                        'unverified_documents': unverified_docs
+                    }
+        
+        eligible = [user_id for user_id in user_ids if user_id not in outcomes]
+        professional_ids = [user_id for user_id in eligible if roles[user_id] == 'professional']
+        users_table = User.__table__
+        professionals_table = ServiceProfessional.__table__
+        
+        if eligible:
+            if action in ('approve', 'reject'):
+                db.session.execute(users_table.update().where(
+                    users_table.c.id.in_(eligible)
+                ).values(is_approved=(action == 'approve')))
+            else:
+                db.session.execute(users_table.update().where(
+                    users_table.c.id.in_(eligible)
+                ).values(is_active=(action == 'unblock')))
+            
+            # Approval clears any earlier rejection reason; rejection may set one
+            rejection_reason = data.get('rejection_reason')
+            if professional_ids and (action == 'approve' or (action == 'reject' and rejection_reason)):
+                db.session.execute(professionals_table.update().where(
+                    professionals_table.c.id.in_(professional_ids)
+                ).values(rejection_reason=None if action == 'approve' else rejection_reason))
+        
+        db.session.commit()
+        invalidate_identity(*eligible)
+        refresh_availability(*professional_ids)
+        
+        status = {'approve': 'approved', 'reject': 'rejected', 'block': 'blocked', 'unblock': 'unblocked'}[action]
+        for user_id in eligible:
+            outcomes[user_id] = {'id': user_id, 'status': status}
+        logger.info(f"Bulk {action}: {len(eligible)} of {len(user_ids)} users {status}")
+        
+        return jsonify({
+            'action': action,
+            'updated': len(eligible),
+            'results': [outcomes[user_id] for user_id in user_ids]
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error in bulk {action}: {str(e)}")
+        return jsonify({'error': str(e)}), 422
+
 @admin_bp.route('/admin/search-professionals', methods=['GET'])
 @jwt_required()
 @admin_required
@@ -356,7 +503,8 @@ def search_professionals():
             is_active = active_status.lower() == 'true'
             query = query.filter(ServiceProfessional.is_active == is_active)
         
-        professionals = query.all()
+        page = keyset_page(query, ServiceProfessional.id)
+        professionals = page.rows if page else query.all()
         logger.debug(f"Found {len(professionals)} professionals matching criteria")
         
         result = []
@@ -387,8 +535,10 @@ def search_professionals():
             
             result.append(pro_data)
         
-        return jsonify(result), 200
+        return jsonify(page.wrap(result) if page else result), 200
     
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error searching professionals: {str(e)}")
         return jsonify({'error': str(e)}), 422
@@ -415,10 +565,14 @@ def search_customers():
             is_active = active_status.lower() == 'true'
             query = query.filter(Customer.is_active == is_active)
         
-        customers = query.all()
+        page = keyset_page(query, Customer.id)
+        customers = page.rows if page else query.all()
         logger.debug(f"Found {len(customers)} customers matching criteria")
         
-        return jsonify([customer.to_dict() for customer in customers]), 200
+        result = [customer.to_dict() for customer in customers]
+        return jsonify(page.wrap(result) if page else result), 200
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error searching customers: {str(e)}")
         return jsonify({'error': str(e)}), 422
@@ -602,6 +756,8 @@ def manage_services():
             
             db.session.add(new_service)
             db.session.commit()
+            bump_catalog_version()
+            schedule_rewarm(new_service.id)
             logger.info(f"Service created with ID: {new_service.id}, Name: {new_service.name}")
             
             # Return service data directly
@@ -701,6 +857,8 @@ def service_detail(service_id):
 
             service.updated_at = datetime.utcnow()
             db.session.commit()
+            bump_catalog_version()
+            schedule_rewarm(service_id)
             logger.info(f"Service {service_id} updated successfully")
 
             return jsonify({
@@ -741,6 +899,8 @@ def service_detail(service_id):
 
             db.session.delete(service)
             db.session.commit()
+            bump_catalog_version()
+            schedule_rewarm()
             logger.info(f"Service {service_id} deleted successfully")
             
             return jsonify({
@@ -759,34 +919,29 @@ def service_detail(service_id):
 @admin_bp.route('/admin/analytics/revenue', methods=['GET'])
 @jwt_required()
 @admin_required
+@single_flight(timeout=ANALYTICS_CACHE_TIMEOUT)
 def get_revenue_analytics():
     """Get revenue analytics for admin dashboard"""
     try:
         logger.debug("Admin requesting revenue analytics")
-        total_revenue = db.session.query(
-            func.sum(Service.base_price)
-        ).join(ServiceRequest).filter(
-            ServiceRequest.status == 'completed'
-        ).scalar() or 0.0
-
-        current_month = datetime.now().replace(day=1)
+        current_month = datetime.now().date().replace(day=1)
         last_month = current_month - timedelta(days=1)
         last_month = last_month.replace(day=1)
-        
-        current_month_revenue = db.session.query(
-            func.sum(Service.base_price)
-        ).join(ServiceRequest).filter(
-            ServiceRequest.status == 'completed',
-            ServiceRequest.completion_date >= current_month
-        ).scalar() or 0.0
-        
-        last_month_revenue = db.session.query(
-            func.sum(Service.base_price)
-        ).join(ServiceRequest).filter(
-            ServiceRequest.status == 'completed',
-            ServiceRequest.completion_date >= last_month,
-            ServiceRequest.completion_date < current_month
-        ).scalar() or 0.0
+
+        # Total, current month and previous month revenue from the daily rollup
+        revenue = db.session.query(
+            func.sum(DailyStat.revenue),
+            func.sum(case(
+                (DailyStat.day >= current_month, DailyStat.revenue)
+            )),
+            func.sum(case(
+                (and_(DailyStat.day >= last_month,
+                      DailyStat.day < current_month), DailyStat.revenue)
+            ))
+        ).one()
+        total_revenue = revenue[0] or 0.0
+        current_month_revenue = revenue[1] or 0.0
+        last_month_revenue = revenue[2] or 0.0
         
         revenue_growth = 0
         if last_month_revenue > 0:
@@ -806,23 +961,22 @@ def get_revenue_analytics():
 @admin_bp.route('/admin/services/stats', methods=['GET'])
 @jwt_required()
 @admin_required
+@single_flight(timeout=ANALYTICS_CACHE_TIMEOUT)
 def get_services_stats():
     """Get service statistics for admin dashboard"""
     try:
         logger.debug("Admin requesting services statistics")
-        total_active_services = Service.query.filter_by(status='active').count()
         current_month = datetime.now().replace(day=1)
         last_month = current_month - timedelta(days=1)
         last_month = last_month.replace(day=1)
         
-        new_services = Service.query.filter(
-            Service.created_at >= current_month
-        ).count()
-        
-        old_services = Service.query.filter(
-            Service.created_at >= last_month,
-            Service.created_at < current_month
-        ).count()
+        # COUNT ignores the NULLs produced by unmatched CASE branches
+        total_active_services, new_services, old_services = db.session.query(
+            func.count(case((Service.status == 'active', 1))),
+            func.count(case((Service.created_at >= current_month, 1))),
+            func.count(case((and_(Service.created_at >= last_month,
+                                  Service.created_at < current_month), 1)))
+        ).one()
         
         service_growth = 0
         if old_services > 0:
@@ -842,41 +996,35 @@ def get_services_stats():
 @admin_bp.route('/admin/users/stats', methods=['GET'])
 @jwt_required()
 @admin_required
+@single_flight(timeout=ANALYTICS_CACHE_TIMEOUT)
 def get_users_stats():
     """Get user statistics for admin dashboard"""
     try:
         logger.debug("Admin requesting user statistics")
-        total_professionals = User.query.filter(User.user_type == 'professional').count()
-        total_customers = User.query.filter(User.user_type == 'customer').count()
         current_month = datetime.now().replace(day=1)
         last_month = current_month - timedelta(days=1)
         last_month = last_month.replace(day=1)
 
-        new_professionals = User.query.filter(
-            User.created_at >= current_month,
-            User.user_type == 'professional'
-        ).count()
-        
-        old_professionals = User.query.filter(
-            User.created_at >= last_month,
-            User.created_at < current_month,
-            User.user_type == 'professional'
-        ).count()
+        is_professional = User.user_type == 'professional'
+        is_customer = User.user_type == 'customer'
+        this_month = User.created_at >= current_month
+        previous_month = and_(User.created_at >= last_month, User.created_at < current_month)
+
+        # All six counts in a single scan of the users table
+        (total_professionals, total_customers,
+         new_professionals, old_professionals,
+         new_customers, old_customers) = db.session.query(
+            func.count(case((is_professional, 1))),
+            func.count(case((is_customer, 1))),
+            func.count(case((and_(is_professional, this_month), 1))),
+            func.count(case((and_(is_professional, previous_month), 1))),
+            func.count(case((and_(is_customer, this_month), 1))),
+            func.count(case((and_(is_customer, previous_month), 1)))
+        ).select_from(User).one()
         
         professional_growth = 0
         if old_professionals > 0:
             professional_growth = ((new_professionals - old_professionals) / old_professionals) * 100
-
-        new_customers = User.query.filter(
-            User.created_at >= current_month,
-            User.user_type == 'customer'
-        ).count()
-        
-        old_customers = User.query.filter(
-            User.created_at >= last_month,
-            User.created_at < current_month,
-            User.user_type == 'customer'
-        ).count()
         
         customer_growth = 0
         if old_customers > 0:
@@ -941,16 +1089,29 @@ def export_service_requests():
     try:
         from backend.celery.tasks import export_service_requests_csv
         task = export_service_requests_csv.delay()
-        result = AsyncResult(task.id)
-        if result.ready:
-            return jsonify({'message': 'CSV export task completed'}), 200
         logger.info(f"CSV export task triggered with ID: {task.id}")
+        # The file is e-mailed to the admin once the task has written it
+        return jsonify({'message': 'CSV export started', 'task_id': task.id}), 202
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@admin_bp.route('/admin/service-requests/export', methods=['GET'])
+@jwt_required()
+@admin_required
+def stream_service_requests_export():
+    """Stream service requests as CSV or NDJSON, optionally filtered"""
+    try:
+        return export_response()
+    except InvalidExport as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error exporting service requests: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @admin_bp.route('/admin/analytics/revenue/<string:timeframe>', methods=['GET'])
 @jwt_required()
 @admin_required
+@single_flight(timeout=ANALYTICS_CACHE_TIMEOUT)
 def get_revenue_analytics_timeframe(timeframe):
     """Get revenue analytics for given timeframe (week, month or year)"""
     try:
@@ -966,10 +1127,9 @@ def get_revenue_analytics_timeframe(timeframe):
             return jsonify({'error': 'Invalid timeframe'}), 400
 
         revenue = db.session.query(
-            func.sum(Service.base_price)
-        ).join(ServiceRequest).filter(
-            ServiceRequest.status == 'completed',
-            ServiceRequest.completion_date >= start_date
+            func.sum(DailyStat.revenue)
+        ).filter(
+            DailyStat.day >= start_date.date()
         ).scalar() or 0.0
         return jsonify({
             'timeframe': timeframe,
@@ -983,11 +1143,14 @@ def get_revenue_analytics_timeframe(timeframe):
 @admin_bp.route('/admin/analytics/user-growth', methods=['GET'])
 @jwt_required()
 @admin_required
+@single_flight(timeout=ANALYTICS_CACHE_TIMEOUT)
 def get_user_growth_analytics():
     """Return basic user growth analytics"""
     try:
-        total_customers = User.query.filter_by(user_type='customer').count()
-        total_professionals = User.query.filter_by(user_type='professional').count()
+        total_customers, total_professionals = db.session.query(
+            func.count(case((User.user_type == 'customer', 1))),
+            func.count(case((User.user_type == 'professional', 1)))
+        ).select_from(User).one()
         # Dummy data for labels and growth over time
         labels = ['Week 1', 'Week 2', 'Week 3', 'Week 4']
         customerData = [int(total_customers/4)] * 4
@@ -1004,19 +1167,20 @@ def get_user_growth_analytics():
 @admin_bp.route('/admin/analytics/services-usage', methods=['GET'])
 @jwt_required()
 @admin_required
+@single_flight(timeout=ANALYTICS_CACHE_TIMEOUT)
 def get_services_usage_analytics():
     """Return basic services usage analytics"""
     try:
-        services = Service.query.all()
-        labels = []
-        data = []
-        for service in services:
-            labels.append(service.name)
-            c = ServiceRequest.query.filter(
-                ServiceRequest.service_id == service.id,
-                ServiceRequest.status=='completed'
-            ).count()
-            data.append(c)
+        # Completed request count per service from the daily rollup,
+        # including services with none
+        usage = db.session.query(
+            Service.name,
+            func.coalesce(func.sum(DailyStat.completed_count), 0)
+        ).outerjoin(
+            DailyStat, DailyStat.service_id == Service.id
+        ).group_by(Service.id, Service.name).order_by(Service.id).all()
+        labels = [name for name, _ in usage]
+        data = [count for _, count in usage]
         return jsonify({
             'labels': labels,
             'data': data
@@ -1049,5 +1213,19 @@ def get_professional_reviews(professional_id):
             'totalReviews': total_reviews,
             'reviews': reviews_list
         }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/cache/stats', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_cache_stats():
+    """Hit and miss counters of the caches in the worker serving this request"""
+    try:
+        return jsonify({
+            'tiers': cache.cache.tier_stats() if hasattr(cache.cache, 'tier_stats') else None,
+            'identity': identity_cache_stats(),
+            'single_flight': single_flight_stats()
+        }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -9,11 +9,24 @@ from .admin_routes import admin_bp
 from .customer_routes import customer_bp
 from .serviceProfessional_routes import professional_bp
 from .extensions import cache
+from .database import init_database, check_database
+from .db_routing import use_primary
+from .migrations import migration_lock, upgrade_database
+from .instrumentation import init_sql_instrumentation
+from .compression import init_compression
+from .json_provider import OrjsonProvider
+from .identity_cache import load_identity
+from .rollups import backfill_daily_stats
+from .availability import rebuild_availability
+from datetime import date
+import click
 import os
 
 
 app = Flask(__name__, static_folder='../dist')
 app.config.from_object(Config)
+if app.config['JSON_PROVIDER'] == 'orjson':
+    app.json = OrjsonProvider(app)
 
 CORS(app, resources={
     r"/api/*": {
@@ -32,7 +45,9 @@ app.config['JWT_IDENTITY_CLAIM'] = 'sub'
 
 # Initialize extensions
 jwt = JWTManager(app)
-db.init_app(app)
+init_database(app)
+init_sql_instrumentation(app)
+init_compression(app)
 cache.init_app(app)
 
 # Very important - make sure we're handling integer vs string conversions properly
@@ -54,7 +69,8 @@ def user_lookup_callback(_jwt_header, jwt_data):
     user_id = int(identity) if identity.isdigit() else identity
     print(f"DEBUG - User ID for lookup: {user_id}, type: {type(user_id)}")
     
-    return User.query.filter_by(id=user_id).one_or_none()
+    # Served from the identity cache, keyed by user and token issue time
+    return load_identity(user_id, jwt_data.get("iat"))
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -63,11 +79,45 @@ app.register_blueprint(admin_bp, url_prefix='/api')
 app.register_blueprint(customer_bp, url_prefix='/api')
 app.register_blueprint(professional_bp, url_prefix='/api')
 
+# Fail fast when the configured database engine cannot serve queries
+if app.config['DB_STARTUP_CHECK']:
+    check_database(app)
+
 @app.before_first_request
 def create_tables():
-    db.create_all()
-    # Create admin user if it doesn't exist
-    create_default_admin()
+    # Setup must see the primary even when the first request is a GET
+    use_primary()
+    # Every worker runs this on its first request; the lock lets one of them
+    # migrate and create the admin while the others wait and then find both done
+    with migration_lock():
+        # Bring the schema up to date through the versioned migrations
+        upgrade_database()
+        # Create admin user if it doesn't exist
+        create_default_admin()
+
+@app.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Apply pending schema migrations."""
+    with migration_lock():
+        version = upgrade_database()
+    click.echo(f"Database schema is at version {version}")
+
+@app.cli.command('backfill-daily-stats')
+@click.option('--start', help='First day to rebuild (YYYY-MM-DD), defaults to the first recorded activity')
+@click.option('--end', help='Last day to rebuild (YYYY-MM-DD), defaults to today')
+def backfill_daily_stats_command(start, end):
+    """Rebuild the daily_stats rollup from existing data."""
+    rows = backfill_daily_stats(
+        date.fromisoformat(start) if start else None,
+        date.fromisoformat(end) if end else None
+    )
+    click.echo(f"Backfilled {rows} daily_stats rows")
+
+@app.cli.command('rebuild-availability')
+def rebuild_availability_command():
+    """Rebuild the pin code service availability index from existing professionals."""
+    rows = rebuild_availability()
+    click.echo(f"Rebuilt {rows} service_availability rows")
 
 def create_default_admin():
     """Create a default admin user if no admin exists."""
@@ -4,6 +4,7 @@ from flask_jwt_extended import (
     jwt_required, get_jwt_identity, get_jwt
 )
 from .models import db, User, Document, ServiceProfessional, Customer, Service
+from .availability import refresh_availability
 import jwt
 from datetime import datetime, timedelta
 import os
@@ -238,6 +239,8 @@ def register():
             user.set_password(password)
             db.session.add(user)
             db.session.commit()
+            if user.role == 'professional':
+                refresh_availability(user.id)
             print(f"DEBUG - User registered successfully: ID={user.id}, Role={user.role}")
             
             return jsonify({
@@ -304,6 +307,8 @@ def register():
             
             db.session.add(user)
             db.session.commit()
+            if user.role == 'professional':
+                refresh_availability(user.id)
             print(f"DEBUG - User registered successfully via JSON: ID={user.id}, Role={user.role}")
             
             return jsonify({
@@ -0,0 +1,136 @@
+"""
+Location search index.
+
+``service_availability`` holds the number of approved, active professionals
+for every (pin code, service) pair that has at least one, so a location
+search is a single primary-key range lookup instead of a professional query
+per service.
+
+Handlers that register a professional or change whether one is approved or
+active call ``refresh_availability`` after committing; it recounts only the
+pairs of the given professionals. ``rebuild_availability`` recomputes the
+whole table (migration backfill and the ``rebuild-availability`` command).
+
+A refresh updates the rows of its pairs in place. It first inserts any
+missing row (``ON CONFLICT DO NOTHING``) and locks them all in key order,
+so concurrent refreshes of the same pair run one after the other and each
+counts what the previous one committed. Pairs left without professionals
+keep a row with a count of 0.
+"""
+from datetime import datetime
+import logging
+
+from sqlalchemy import and_, bindparam, func, literal, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import db, ServiceAvailability, ServiceProfessional
+
+logger = logging.getLogger(__name__)
+
+# INSERT statements with an ON CONFLICT clause, per supported dialect
+INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def counted_professionals():
+    """Query of (pin_code, service_type_id, count) over approved, active professionals."""
+    return db.session.query(
+        ServiceProfessional.pin_code,
+        ServiceProfessional.service_type_id,
+        func.count(ServiceProfessional.id)
+    ).filter(
+        ServiceProfessional.is_approved == True,
+        ServiceProfessional.is_active == True,
+        ServiceProfessional.pin_code.isnot(None),
+        ServiceProfessional.pin_code != '',
+        ServiceProfessional.service_type_id.isnot(None)
+    ).group_by(ServiceProfessional.pin_code, ServiceProfessional.service_type_id)
+
+
+def rebuild_availability(conn=None):
+    """Recompute the whole index. Runs on ``conn`` when given, else commits the session."""
+    table = ServiceAvailability.__table__
+    counts = counted_professionals().add_columns(literal(datetime.utcnow()))
+    insert = table.insert().from_select(
+        ['pin_code', 'service_type_id', 'professional_count', 'updated_at'],
+        counts.statement
+    )
+    if conn is not None:
+        conn.execute(table.delete())
+        return conn.execute(insert).rowcount
+    db.session.execute(table.delete())
+    rows = db.session.execute(insert).rowcount
+    db.session.commit()
+    logger.info(f"Service availability rebuilt ({rows} rows)")
+    return rows
+
+
+def lock_pairs(pairs, now):
+    """Create the missing rows of ``pairs`` and lock all of them until the transaction ends."""
+    table = ServiceAvailability.__table__
+    # Sorted so that concurrent refreshes take their locks in the same order
+    pairs = sorted(pairs)
+    db.session.execute(INSERTS[db.engine.dialect.name](table).values([
+        {'pin_code': pin_code, 'service_type_id': service_type_id,
+         'professional_count': 0, 'updated_at': now}
+        for pin_code, service_type_id in pairs
+    ]).on_conflict_do_nothing())
+    # FOR UPDATE is not rendered on SQLite, where the insert already holds the write lock
+    db.session.execute(select(table.c.pin_code).where(
+        tuple_(table.c.pin_code, table.c.service_type_id).in_(pairs)
+    ).order_by(table.c.pin_code, table.c.service_type_id).with_for_update())
+
+
+def refresh_availability(*professional_ids):
+    """
+    Recount the (pin code, service) pairs of the given professionals. Call
+    after committing a registration or a change to their approval or active
+    state; ids of other users are ignored.
+    """
+    if not professional_ids:
+        return
+    try:
+        pairs = db.session.query(
+            ServiceProfessional.pin_code, ServiceProfessional.service_type_id
+        ).filter(
+            ServiceProfessional.id.in_(professional_ids),
+            ServiceProfessional.pin_code.isnot(None),
+            ServiceProfessional.pin_code != '',
+            ServiceProfessional.service_type_id.isnot(None)
+        ).distinct().all()
+        if not pairs:
+            return
+        pairs = [tuple(pair) for pair in pairs]
+        now = datetime.utcnow()
+        lock_pairs(pairs, now)
+        counts = {
+            (pin_code, service_type_id): count
+            for pin_code, service_type_id, count in counted_professionals().filter(
+                tuple_(ServiceProfessional.pin_code, ServiceProfessional.service_type_id).in_(pairs)
+            )
+        }
+
+        table = ServiceAvailability.__table__
+        db.session.execute(table.update().where(and_(
+            table.c.pin_code == bindparam('pair_pin_code'),
+            table.c.service_type_id == bindparam('pair_service_type_id')
+        )).values(professional_count=bindparam('pair_count'), updated_at=now), [
+            {'pair_pin_code': pin_code, 'pair_service_type_id': service_type_id,
+             'pair_count': counts.get((pin_code, service_type_id), 0)}
+            for pin_code, service_type_id in pairs
+        ])
+        db.session.commit()
+        logger.debug(f"Service availability refreshed for {len(pairs)} pin code/service pairs")
+    except Exception as e:
+        db.session.rollback()
+        # The index lags until the next refresh of these pairs or a rebuild
+        logger.error(f"Could not refresh service availability for {professional_ids}: {str(e)}")
+
+
+def available_services(pin_code):
+    """Map of service id to approved, active professional count for a pin code."""
+    return dict(db.session.query(
+        ServiceAvailability.service_type_id, ServiceAvailability.professional_count
+    ).filter(
+        ServiceAvailability.pin_code == pin_code,
+        ServiceAvailability.professional_count > 0
+    ).all())
@@ -0,0 +1,601 @@
+"""
+Two-tier cache backend for Flask-Caching.
+
+``TwoTierRedisCache`` keeps a small in-process LRU (L1) in front of Redis
+(L2). Reads are served from L1 when possible, saving the Redis round trip;
+misses fall through to Redis and populate L1.
+
+L1 is kept coherent across workers and nodes with Redis pub/sub: every write
+(set, add, delete, inc, clear, ...) publishes the affected keys and all other
+processes evict them from their L1. A process only uses its L1 while its
+subscription is live; when the subscription drops it clears L1 and serves
+every read from Redis until it has re-subscribed, so no invalidation can be
+missed. Entries also expire from L1 after ``CACHE_L1_TTL`` seconds.
+
+L1 holds serialized values, so callers never share (and mutate) the same
+object. Keys starting with one of ``CACHE_L1_BYPASS_PREFIXES`` (locks) always
+go to Redis.
+
+Redis is reached with short socket timeouts behind a circuit breaker. The
+first connection error or timeout opens the breaker: from then on every
+operation is answered by a bounded per-process fallback cache
+(``CACHE_FALLBACK_MAX_ENTRIES`` entries, at most ``CACHE_FALLBACK_TTL``
+seconds each) without touching the network, while a background thread pings
+Redis every ``CACHE_BREAKER_PROBE_INTERVAL`` seconds. Keys written during the
+outage are remembered; once Redis answers again they are deleted there and
+published, so neither this process nor any other keeps an entry that missed
+a write (version keys restart at a newer number), then the breaker closes.
+The fallback is not shared: during an outage each process bumps its own
+version keys, and the others keep serving entries a write has outdated
+until those expire from their fallback or Redis is back.
+
+Enable it with ``CACHE_TYPE = 'backend.cache_backend.TwoTierRedisCache'``.
+"""
+from collections import OrderedDict
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from flask_caching.backends.rediscache import RedisCache
+from redis.exceptions import (
+    ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError, WatchError
+)
+
+logger = logging.getLogger(__name__)
+
+# Errors meaning Redis cannot be reached, as opposed to a rejected command
+REDIS_DOWN_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError)
+
+# Beyond this many keys written during an outage, the whole cache is cleared on recovery
+DIRTY_KEYS_LIMIT = 10000
+
+
+class RedisUnavailable(Exception):
+    """Raised instead of calling Redis while the circuit breaker is open."""
+
+
+class LocalLRU:
+    """
+    Thread-safe LRU of serialized values with per-entry expiry.
+
+    ``generation`` moves forward on every eviction, letting a reader that
+    fetched a value from Redis detect an invalidation that arrived meanwhile.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _live(self, key):
+        # Callers hold the lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def _store(self, key, data, timeout):
+        # Callers hold the lock
+        ttl = self.ttl if timeout is None or timeout < 0 else min(self.ttl, timeout)
+        self._entries[key] = (time.monotonic() + ttl, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def set(self, key, data, timeout=None, generation=None):
+        """Store a value for at most ``timeout`` seconds, unless evictions happened since ``generation``."""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._store(key, data, timeout)
+
+    def add(self, key, data, timeout=None):
+        """Store a value only if the key holds none, returning whether it was stored."""
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._store(key, data, timeout)
+            return True
+
+    def incr(self, key, delta=1):
+        """Atomically add ``delta`` to an integer entry (stored as ASCII digits, as Redis does)."""
+        with self._lock:
+            entry = self._live(key)
+            value = (int(entry[1]) if entry is not None else 0) + delta
+            if entry is not None:
+                # Keep the expiry, like INCRBY
+                self._entries[key] = (entry[0], str(value).encode('ascii'))
+            else:
+                self._store(key, str(value).encode('ascii'), None)
+            return value
+
+    def delete(self, *keys):
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def delete_if(self, key, data):
+        """Delete an entry only while it holds ``data``, returning whether it did."""
+        with self._lock:
+            entry = self._live(key)
+            if entry is None or entry[1] != data:
+                return False
+            self.generation += 1
+            del self._entries[key]
+            return True
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TwoTierRedisCache(RedisCache):
+    """Redis cache with a pub/sub-invalidated in-process LRU in front of it and a local fallback behind a circuit breaker."""
+
+    def __init__(self, *args, l1_max_entries=1024, l1_ttl=10, l1_bypass_prefixes=('lock:',),
+                 fallback_max_entries=4096, fallback_ttl=300, probe_interval=1.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.l1 = LocalLRU(l1_max_entries, l1_ttl)
+        self.l1_bypass_prefixes = tuple(l1_bypass_prefixes)
+        self.channel = f"{self._get_prefix()}l1-invalidate"
+        self.origin = uuid.uuid4().hex
+        self._subscribed = threading.Event()
+        self._subscriber_pid = None
+        self._subscriber_lock = threading.Lock()
+        self.fallback = LocalLRU(fallback_max_entries, fallback_ttl)
+        self.probe_interval = probe_interval
+        self._breaker_lock = threading.Lock()
+        self._open_since = None
+        self._probe_pid = None
+        self._dirty = set()
+        self._dirty_overflow = False
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'l1_hits': 0, 'l1_misses': 0, 'redis_hits': 0, 'redis_misses': 0,
+            'fallback_hits': 0, 'fallback_misses': 0, 'breaker_trips': 0
+        }
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(
+            l1_max_entries=config.get('CACHE_L1_MAX_ENTRIES', 1024),
+            l1_ttl=config.get('CACHE_L1_TTL', 10),
+            l1_bypass_prefixes=config.get('CACHE_L1_BYPASS_PREFIXES', ('lock:',)),
+            fallback_max_entries=config.get('CACHE_FALLBACK_MAX_ENTRIES', 4096),
+            fallback_ttl=config.get('CACHE_FALLBACK_TTL', 300),
+            probe_interval=config.get('CACHE_BREAKER_PROBE_INTERVAL', 1.0),
+        )
+        # Fail fast instead of blocking requests on an unreachable server
+        config['CACHE_OPTIONS'] = {
+            'socket_timeout': config.get('CACHE_REDIS_SOCKET_TIMEOUT', 0.25),
+            'socket_connect_timeout': config.get('CACHE_REDIS_CONNECT_TIMEOUT', 0.25),
+            **(config.get('CACHE_OPTIONS') or {}),
+        }
+        return super().factory(app, config, args, kwargs)
+
+    # Circuit breaker
+
+    @property
+    def breaker_open(self):
+        return self._open_since is not None
+
+    def _redis(self, operation, *args):
+        """Run a Redis operation, raising RedisUnavailable when the breaker is (or goes) open."""
+        if self._open_since is not None:
+            self._ensure_probe()
+            raise RedisUnavailable('circuit breaker open')
+        try:
+            return operation(*args)
+        except REDIS_DOWN_ERRORS as e:
+            self._trip(e)
+            raise RedisUnavailable(str(e)) from e
+
+    def _trip(self, error):
+        with self._breaker_lock:
+            if self._open_since is not None:
+                return
+            self._open_since = time.monotonic()
+        self._count('breaker_trips')
+        logger.error(f"Redis unavailable, serving the cache from local memory: {str(error)}")
+        # L1 cannot hear invalidations while Redis is down
+        self.l1.clear()
+        self._ensure_probe()
+
+    def _ensure_probe(self):
+        # Threads do not survive a fork, so each worker process starts its own
+        if self._probe_pid == os.getpid():
+            return
+        with self._breaker_lock:
+            if self._probe_pid == os.getpid() or self._open_since is None:
+                return
+            self._probe_pid = os.getpid()
+        threading.Thread(target=self._probe, name='cache-redis-probe', daemon=True).start()
+
+    def _probe(self):
+        try:
+            while True:
+                time.sleep(self.probe_interval)
+                try:
+                    self._write_client.ping()
+                    self._recover()
+                    return
+                except Exception as e:
+                    logger.debug(f"Redis still unavailable: {str(e)}")
+        finally:
+            self._probe_pid = None
+
+    def _recover(self):
+        """Replay the outage's writes as invalidations, then close the breaker."""
+        self._replay(*self._take_dirty())
+        # Writes keep landing in the fallback meanwhile; close the breaker
+        # together with taking the last of them so none is left behind
+        with self._breaker_lock:
+            keys, overflow = self._take_dirty_locked()
+            if self._open_since is None:
+                return
+            outage = time.monotonic() - self._open_since
+            self.fallback.clear()
+            self.l1.clear()
+            self._open_since = None
+        try:
+            self._replay(keys, overflow)
+        except REDIS_DOWN_ERRORS as e:
+            self._trip(e)
+            self._mark_dirty(keys, overflow)
+            raise
+        logger.warning(f"Redis is back after {round(outage, 1)} s, local fallback cache dropped")
+
+    def _take_dirty_locked(self):
+        keys, overflow = self._dirty, self._dirty_overflow
+        self._dirty, self._dirty_overflow = set(), False
+        return keys, overflow
+
+    def _take_dirty(self):
+        with self._breaker_lock:
+            return self._take_dirty_locked()
+
+    def _replay(self, keys, overflow):
+        """Delete keys written during an outage from Redis and from every worker's L1."""
+        try:
+            if overflow:
+                super().clear()
+                self._write_client.publish(self.channel, json.dumps({'origin': self.origin, 'clear': True}))
+            elif keys:
+                self._delete_keys(keys)
+                self._write_client.publish(self.channel, json.dumps({'origin': self.origin, 'keys': list(keys)}))
+        except Exception:
+            if self._open_since is not None:
+                self._mark_dirty(keys, overflow)
+            raise
+
+    def _mark_dirty(self, keys=(), overflow=False):
+        with self._breaker_lock:
+            closed = self._open_since is None
+            if not closed:
+                if self._dirty_overflow:
+                    return
+                self._dirty.update(keys)
+                if overflow or len(self._dirty) > DIRTY_KEYS_LIMIT:
+                    self._dirty_overflow = True
+                    self._dirty = set()
+        if closed:
+            # The breaker closed while this write went to the fallback
+            try:
+                self._redis(self._replay, list(keys), overflow)
+            except Exception as e:
+                logger.warning(f"Could not invalidate keys written during the outage: {str(e)}")
+
+    # Fallback store
+
+    def _local_timeout(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return timeout if timeout > 0 else None
+
+    def _fallback_get(self, key):
+        data = self.fallback.get(key)
+        if data is None:
+            self._count('fallback_misses')
+            return None
+        self._count('fallback_hits')
+        return self.serializer.loads(data)
+
+    def _fallback_set(self, key, value, timeout):
+        self.fallback.set(key, self.serializer.dumps(value), self._local_timeout(timeout))
+        self._mark_dirty([key])
+        return True
+
+    def _fallback_delete(self, *keys):
+        self.fallback.delete(*keys)
+        self._mark_dirty(keys)
+        return True
+
+    # Invalidation channel
+
+    def _ensure_subscriber(self):
+        # Threads do not survive a fork, so each worker process starts its own
+        if self._subscriber_pid == os.getpid():
+            return
+        with self._subscriber_lock:
+            if self._subscriber_pid == os.getpid():
+                return
+            self._subscribed.clear()
+            self.l1.clear()
+            self._subscriber_pid = os.getpid()
+            threading.Thread(target=self._listen, name='cache-l1-invalidation', daemon=True).start()
+
+    def _listen(self):
+        backoff = 0.5
+        while True:
+            pubsub = None
+            try:
+                pubsub = self._write_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Entries cached while unsubscribed may have missed invalidations
+                self.l1.clear()
+                self._subscribed.set()
+                backoff = 0.5
+                while True:
+                    # Poll rather than block past the client's socket timeout
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None and message.get('type') == 'message':
+                        self._apply_invalidation(message['data'])
+            except Exception as e:
+                logger.warning(f"L1 cache invalidation channel lost: {str(e)}")
+            finally:
+                self._subscribed.clear()
+                self.l1.clear()
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def _apply_invalidation(self, data):
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return
+        if message.get('origin') == self.origin:
+            return
+        if message.get('clear'):
+            self.l1.clear()
+        else:
+            self.l1.delete(*message.get('keys', []))
+
+    def _publish(self, keys=None, clear=False):
+        message = {'origin': self.origin}
+        if clear:
+            message['clear'] = True
+        else:
+            message['keys'] = list(keys)
+        try:
+            self._redis(self._write_client.publish, self.channel, json.dumps(message))
+        except Exception as e:
+            # Published again once Redis is reachable; until then other
+            # workers keep their copy for at most CACHE_L1_TTL seconds
+            if not isinstance(e, RedisUnavailable):
+                logger.warning(f"Could not publish cache invalidation: {str(e)}")
+            self._mark_dirty(message.get('keys', ()), clear)
+
+    def _l1_enabled(self, key):
+        self._ensure_subscriber()
+        return (self._subscribed.is_set() and self._open_since is None
+                and not key.startswith(self.l1_bypass_prefixes))
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def tier_stats(self):
+        """Per-tier hit counters and ratios of this process."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        l1_lookups = stats['l1_hits'] + stats['l1_misses']
+        redis_lookups = stats['redis_hits'] + stats['redis_misses']
+        stats['l1_hit_ratio'] = round(stats['l1_hits'] / l1_lookups, 4) if l1_lookups else None
+        stats['redis_hit_ratio'] = round(stats['redis_hits'] / redis_lookups, 4) if redis_lookups else None
+        stats['l1_entries'] = len(self.l1)
+        stats['l1_subscribed'] = self._subscribed.is_set()
+        open_since = self._open_since
+        stats['breaker_open'] = open_since is not None
+        stats['breaker_open_seconds'] = round(time.monotonic() - open_since, 1) if open_since is not None else None
+        stats['fallback_entries'] = len(self.fallback)
+        stats['dirty_keys'] = len(self._dirty)
+        return stats
+
+    # Reads
+
+    def _fetch(self, name):
+        # Fetch the remaining lifetime in the same round trip so L1 never
+        # outlives the Redis entry
+        pipe = self._read_client.pipeline(transaction=False)
+        pipe.get(name)
+        pipe.pttl(name)
+        return pipe.execute()
+
+    def get(self, key):
+        use_l1 = self._l1_enabled(key)
+        if not use_l1:
+            try:
+                return self._redis(super().get, key)
+            except RedisUnavailable:
+                return self._fallback_get(key)
+
+        data = self.l1.get(key)
+        if data is not None:
+            self._count('l1_hits')
+            return self.serializer.loads(data)
+        self._count('l1_misses')
+
+        generation = self.l1.generation
+        try:
+            data, pttl = self._redis(self._fetch, f"{self._get_prefix()}{key}")
+        except RedisUnavailable:
+            return self._fallback_get(key)
+        if data is None:
+            self._count('redis_misses')
+            return None
+        self._count('redis_hits')
+        self.l1.set(key, data, pttl / 1000 if pttl >= 0 else None, generation)
+        return self.serializer.loads(data)
+
+    def get_many(self, *keys):
+        return [self.get(key) for key in keys]
+
+    def has(self, key):
+        if self._l1_enabled(key) and self.l1.get(key) is not None:
+            return True
+        try:
+            return self._redis(super().has, key)
+        except RedisUnavailable:
+            return self.fallback.get(key) is not None
+
+    # Writes
+
+    def set(self, key, value, timeout=None):
+        try:
+            result = self._redis(super().set, key, value, timeout)
+        except RedisUnavailable:
+            return self._fallback_set(key, value, timeout)
+        self._publish([key])
+        self.l1.delete(key)
+        if result and self._l1_enabled(key):
+            timeout = self._local_timeout(timeout)
+            self.l1.set(key, self.serializer.dumps(value), timeout)
+        return result
+
+    def add(self, key, value, timeout=None):
+        try:
+            created = self._redis(super().add, key, value, timeout)
+        except RedisUnavailable:
+            created = self.fallback.add(key, self.serializer.dumps(value), self._local_timeout(timeout))
+            if created:
+                self._mark_dirty([key])
+            return created
+        if created:
+            self._publish([key])
+            self.l1.delete(key)
+        return created
+
+    def set_many(self, mapping, timeout=None):
+        try:
+            result = self._redis(super().set_many, mapping, timeout)
+        except RedisUnavailable:
+            return [key for key, value in mapping.items() if self._fallback_set(key, value, timeout)]
+        self._publish(mapping.keys())
+        self.l1.delete(*mapping.keys())
+        return result
+
+    def delete(self, key):
+        try:
+            result = self._redis(super().delete, key)
+        except RedisUnavailable:
+            return self._fallback_delete(key)
+        self._publish([key])
+        self.l1.delete(key)
+        return result
+
+    def delete_if_equals(self, key, value):
+        """
+        Delete ``key`` only while it still holds ``value``, as one atomic
+        step (lock release), returning whether it was deleted.
+        """
+        expected = self.serializer.dumps(value)
+        try:
+            deleted = self._redis(self._delete_if_equals, f"{self._get_prefix()}{key}", expected)
+        except RedisUnavailable:
+            deleted = self.fallback.delete_if(key, expected)
+            if deleted:
+                self._mark_dirty([key])
+            return deleted
+        if deleted:
+            self._publish([key])
+            self.l1.delete(key)
+        return deleted
+
+    def _delete_if_equals(self, name, expected):
+        with self._write_client.pipeline() as pipe:
+            try:
+                # EXEC fails if another client writes the key after WATCH
+                pipe.watch(name)
+                if pipe.get(name) != expected:
+                    return False
+                pipe.multi()
+                pipe.delete(name)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    def _delete_keys(self, keys):
+        # The base class re-checks every key with has(), one round trip each
+        if keys:
+            self._write_client.delete(*[f"{self._get_prefix()}{key}" for key in keys])
+        return list(keys)
+
+    def delete_many(self, *keys):
+        try:
+            result = self._redis(self._delete_keys, keys)
+        except RedisUnavailable:
+            self._fallback_delete(*keys)
+            return list(keys)
+        self._publish(keys)
+        self.l1.delete(*keys)
+        return result
+
+    def unlink(self, *keys):
+        try:
+            result = self._redis(super().unlink, *keys)
+        except RedisUnavailable:
+            return self._fallback_delete(*keys)
+        self._publish(keys)
+        self.l1.delete(*keys)
+        return result
+
+    def inc(self, key, delta=1):
+        try:
+            value = self._redis(super().inc, key, delta)
+        except RedisUnavailable:
+            value = self.fallback.incr(key, delta)
+            self._mark_dirty([key])
+            return value
+        self._publish([key])
+        self.l1.delete(key)
+        return value
+
+    def dec(self, key, delta=1):
+        return self.inc(key, -delta)
+
+    def clear(self):
+        try:
+            result = self._redis(super().clear)
+        except RedisUnavailable:
+            self.fallback.clear()
+            self._mark_dirty(overflow=True)
+            return True
+        self._publish(clear=True)
+        self.l1.clear()
+        return result
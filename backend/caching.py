@@ -0,0 +1,251 @@
+"""
+Application caching helpers.
+
+Versioned caching for the service catalog and per-user dashboard stats:
+
+Cached values are stored under keys that embed one or more version numbers.
+A write bumps the relevant version with an atomic increment, so every entry
+built from the old data becomes unreachable at once: readers never see stale
+data after a write and no TTL has to be tuned to the rate of changes.
+Orphaned entries simply expire.
+
+* The catalog version is bumped by admin writes to ``Service``.
+* Each customer and professional has a stats version, bumped whenever one of
+  their service requests changes status or receives a review. Stats entries
+  also embed the catalog version because earnings depend on service prices.
+
+Expensive views whose results may lag a little (popular services, admin
+analytics) use ``single_flight`` instead: when an entry goes stale, one
+worker recomputes it under a lock held in the cache while the others keep
+serving the stale copy, so an expiry never triggers a stampede of identical
+queries.
+
+The cache is an optimisation only; when it is unreachable values are read
+from the database.
+"""
+from functools import wraps
+import logging
+import threading
+import time
+import uuid
+
+from flask import current_app, make_response, request
+
+from .db_routing import primary_reads
+from .extensions import cache
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def initial_version():
+    # A fresh (or evicted) version key must never restart at a number that
+    # older entries still in the cache were stored under
+    return int(time.time() * 1000)
+
+
+def current_version(key):
+    """Value of a version key, creating the key if it is missing."""
+    version = cache.get(key)
+    if version is None:
+        # Incrementing a missing key creates it; a concurrent creator only
+        # makes the number larger. The Cache facade has no inc(), the
+        # backend's is atomic (INCRBY on Redis).
+        version = cache.cache.inc(key, initial_version())
+    return version
+
+
+def bump_version(key):
+    """Move a version key forward, orphaning every entry stored under it."""
+    try:
+        current_version(key)
+        version = cache.cache.inc(key)
+        logger.debug(f"{key} bumped to {version}")
+    except Exception as e:
+        logger.error(f"Could not bump {key}: {str(e)}")
+
+
+def catalog_version():
+    return current_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog entry. Call after committing a catalog change."""
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def cached_value(make_key, loader):
+    """
+    Return the value cached under ``make_key()``, computing it with ``loader``
+    on a miss. The key is built before loading, so a value computed from data
+    that changed meanwhile is stored under an already outdated version. The
+    value is loaded from the primary: a lagging replica's copy would be
+    stored under the current version and outlive the lag.
+    """
+    try:
+        key = make_key()
+        value = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Cache unavailable: {str(e)}")
+        return loader()
+
+    if value is None:
+        logger.debug(f"Cache miss: {key}")
+        with primary_reads():
+            value = loader()
+        try:
+            cache.set(key, value)
+        except Exception as e:
+            logger.warning(f"Could not cache {key}: {str(e)}")
+    return value
+
+
+def cached_catalog(name, parts, loader):
+    """
+    Return the cached value for a catalog query, computing it with ``loader``
+    on a miss. ``parts`` identifies the filter combination of the entry.
+    """
+    def make_key():
+        return ':'.join(['catalog', str(catalog_version()), name] + [repr(part) for part in parts])
+    return cached_value(make_key, loader)
+
+
+def stats_version_key(role, user_id):
+    return f"stats:version:{role}:{int(user_id)}"
+
+
+def cached_user_stats(role, user_id, loader):
+    """Return the dashboard stats of a customer or professional, computing them on a miss."""
+    def make_key():
+        version = current_version(stats_version_key(role, user_id))
+        return f"stats:{role}:{int(user_id)}:{version}:{catalog_version()}"
+    return cached_value(make_key, loader)
+
+
+def invalidate_request_stats(service_request):
+    """
+    Invalidate the cached stats of everyone involved in a service request.
+    Call after committing a change to the request or its review.
+    """
+    if service_request.customer_id is not None:
+        bump_version(stats_version_key('customer', service_request.customer_id))
+    if service_request.pro_id is not None:
+        bump_version(stats_version_key('professional', service_request.pro_id))
+
+
+# Seconds a worker waits for another worker to fill a missing entry
+SINGLE_FLIGHT_WAIT = 5
+SINGLE_FLIGHT_POLL = 0.05
+
+_single_flight_lock = threading.Lock()
+_single_flight_counters = {'hits': 0, 'stale_hits': 0, 'refreshes': 0, 'waits': 0}
+
+
+def count_single_flight(name):
+    with _single_flight_lock:
+        _single_flight_counters[name] += 1
+
+
+def single_flight_stats():
+    """Single-flight cache counters of this process."""
+    with _single_flight_lock:
+        return dict(_single_flight_counters)
+
+
+def view_cache_key():
+    args = '&'.join(f"{name}={value}" for name, value in sorted(request.args.items(multi=True)))
+    return f"single_flight:{request.path}?{args}"
+
+
+def acquire_lock(key, timeout):
+    """Take the refresh lock of an entry, returning its owner token or None."""
+    token = uuid.uuid4().hex
+    return token if cache.add(f"lock:{key}", token, timeout=timeout) else None
+
+
+def release_lock(key, token):
+    """Release an entry's refresh lock unless it expired and another worker took it."""
+    try:
+        delete_if_equals = getattr(cache.cache, 'delete_if_equals', None)
+        if delete_if_equals is not None:
+            delete_if_equals(f"lock:{key}", token)
+        elif cache.get(f"lock:{key}") == token:
+            # Backends without an atomic compare-and-delete (SimpleCache)
+            cache.delete(f"lock:{key}")
+    except Exception as e:
+        logger.warning(f"Could not release lock for {key}: {str(e)}")
+
+
+def wait_for_entry(key):
+    """Poll for an entry another worker is computing, giving up after SINGLE_FLIGHT_WAIT."""
+    deadline = time.monotonic() + SINGLE_FLIGHT_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(SINGLE_FLIGHT_POLL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def cached_response(entry):
+    return current_app.response_class(entry['data'], mimetype=entry['mimetype'])
+
+
+def single_flight(timeout, stale_timeout=None, lock_timeout=30):
+    """
+    Cache successful responses of a view for ``timeout`` seconds, then keep
+    serving the stale copy for up to ``stale_timeout`` more seconds while a
+    single worker recomputes it.
+    """
+    stale_timeout = timeout if stale_timeout is None else stale_timeout
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = view_cache_key()
+            try:
+                entry = cache.get(key)
+                if entry is not None and entry['fresh_until'] > time.time():
+                    count_single_flight('hits')
+                    return cached_response(entry)
+                token = acquire_lock(key, lock_timeout)
+            except Exception as e:
+                logger.warning(f"Cache unavailable for {key}: {str(e)}")
+                return fn(*args, **kwargs)
+
+            if token is None:
+                # Another worker is refreshing the entry
+                if entry is not None:
+                    count_single_flight('stale_hits')
+                    return cached_response(entry)
+                count_single_flight('waits')
+                entry = wait_for_entry(key)
+                if entry is not None:
+                    return cached_response(entry)
+                logger.warning(f"Timed out waiting for {key}, computing it here")
+                return fn(*args, **kwargs)
+
+            try:
+                # The previous lock holder may have refreshed the entry since it was read
+                entry = cache.get(key)
+                if entry is not None and entry['fresh_until'] > time.time():
+                    count_single_flight('hits')
+                    return cached_response(entry)
+                count_single_flight('refreshes')
+                logger.debug(f"Refreshing {key}")
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code == 200:
+                    try:
+                        cache.set(key, {
+                            'data': response.get_data(),
+                            'mimetype': response.mimetype,
+                            'fresh_until': time.time() + timeout
+                        }, timeout=timeout + stale_timeout)
+                    except Exception as e:
+                        logger.warning(f"Could not cache {key}: {str(e)}")
+                return response
+            finally:
+                release_lock(key, token)
+        return wrapper
+    return decorator
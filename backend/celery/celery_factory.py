@@ -27,6 +27,17 @@ class CeleryConfig():
             'task': 'backend.celery.tasks.send_monthly_activity_report',
             'schedule': crontab(day_of_month=1, hour=0, minute=0),
         },
+        # Run every 10 minutes to keep the analytics rollup current
+        'update-daily-stats': {
+            'task': 'backend.celery.tasks.update_daily_stats',
+            'schedule': crontab(minute='*/10'),
+        },
+        # Run every 5 minutes to rebuild public cache entries lost to a flush
+        # and refresh popular services while their stale copy is still served
+        'warm-public-caches': {
+            'task': 'backend.celery.tasks.warm_public_caches',
+            'schedule': crontab(minute='*/5'),
+        },
     }
 
 class FlaskTask(Task):
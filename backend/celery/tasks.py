@@ -1,4 +1,5 @@
 from celery import shared_task
+from celery.signals import worker_ready
 from backend.models import ServiceProfessional, ServiceRequest
 from backend.celery.mail_service import send_email
 from sqlalchemy import and_
@@ -68,46 +69,31 @@ def send_monthly_activity_report():
     Generate a monthly activity report for each customer and send it via email.
     """
     from datetime import datetime, timedelta
-    from backend.models import Customer, ServiceRequest
+    from backend.models import db, Customer, ServiceRequest
+    from backend.serializers import MONTHLY_REPORT_REQUEST
 
     today = datetime.utcnow()
     first_day_of_current = datetime(today.year, today.month, 1)
     last_day_previous = first_day_of_current - timedelta(microseconds=1)
     first_day_previous = datetime(last_day_previous.year, last_day_previous.month, 1)
 
-    customers = Customer.query.all()
+    customers = db.session.query(Customer.id, Customer.full_name, Customer.email).all()
+    # The month's requests of every customer in one column-only query
+    details_by_customer = {}
+    rows = MONTHLY_REPORT_REQUEST.query().filter(
+        ServiceRequest.request_date >= first_day_previous,
+        ServiceRequest.request_date <= last_day_previous
+    ).order_by(ServiceRequest.id)
+    for row in rows:
+        details_by_customer.setdefault(row.customer_id, []).append(MONTHLY_REPORT_REQUEST.serialize(row))
+
     for customer in customers:
-        requests = ServiceRequest.query.filter(
-            ServiceRequest.customer_id == customer.id,
-            ServiceRequest.request_date >= first_day_previous,
-            ServiceRequest.request_date <= last_day_previous
-        ).all()
-        total = len(requests)
-        completed = len([r for r in requests if r.status == 'completed'])
-        pending = len([r for r in requests if r.status == 'assigned'])
-        requested = len([r for r in requests if r.status == 'requested'])
-        cancelled = len([r for r in requests if r.status == 'cancelled'])
-        
-        service_details = []
-        for r in requests:
-            service_name = r.service.name if r.service and hasattr(r.service, 'name') else "Unknown"
-            professional_name = r.professional.full_name if r.professional else "Not Assigned"
-            request_date = r.request_date.strftime("%Y-%m-%d") if r.request_date else "N/A"
-            completion_date = r.completion_date.strftime("%Y-%m-%d") if r.completion_date else "N/A"
-            assigned_date = r.assigned_date.strftime("%Y-%m-%d") if r.assigned_date else "N/A"
-            completed_on = r.completed_on.strftime("%Y-%m-%d") if r.completed_on else "N/A"
-            cancelled_on = r.cancelled_on.strftime("%Y-%m-%d") if r.cancelled_on else "N/A"
-            service_details.append({
-                'service_name': service_name,
-                'request_date': request_date,
-                'completion_date': completion_date,
-                'assigned_date': assigned_date,
-                'completed_on': completed_on,
-                'cancelled_on': cancelled_on,
-                'cancelled_by': r.cancelled_by or "N/A",
-                'status': r.status,
-                'professional_name': professional_name
-            })
+        service_details = details_by_customer.get(customer.id, [])
+        total = len(service_details)
+        completed = len([r for r in service_details if r['status'] == 'completed'])
+        pending = len([r for r in service_details if r['status'] == 'assigned'])
+        requested = len([r for r in service_details if r['status'] == 'requested'])
+        cancelled = len([r for r in service_details if r['status'] == 'cancelled'])
 
         subject = f"Your Monthly Activity Report: {first_day_previous.strftime('%B %Y')}"
         content = render_template(
@@ -125,13 +111,40 @@ def send_monthly_activity_report():
         email_reminder.delay(customer.email, subject, content)
     return f"Monthly activity reports sent to {len(customers)} customers"
 
+@shared_task(ignore_result=True)
+def update_daily_stats():
+    """
+    Incrementally refresh the daily_stats rollup read by the admin analytics.
+    """
+    from backend.rollups import update_daily_stats as refresh
+    rows = refresh()
+    return f"Daily stats refreshed ({rows} rows)"
+
+@shared_task(ignore_result=True)
+def warm_public_caches(service_ids=None):
+    """
+    Pre-populate the cache entries of the public catalog endpoints, or only
+    of the catalog and the given services.
+    """
+    from backend.warming import warm_public_caches as warm
+    warmed = warm(service_ids)
+    return f"Warmed {warmed} public cache entries"
+
+@worker_ready.connect
+def warm_caches_on_startup(sender, **kwargs):
+    # A deploy restarts the workers; rebuild the entries it left cold
+    warm_public_caches.delay()
+
 @shared_task(ignore_result=True)
 def export_service_requests_csv():
     file_dir = os.path.join(os.path.dirname(__file__), "user-downloads")
     os.makedirs(file_dir, exist_ok=True)
     filename = f"service_requests_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.csv"
     file_path = os.path.join(file_dir, filename)
-    requests = ServiceRequest.query.filter(ServiceRequest.status=='completed').all()
+    # Read in batches so the export does not hold every row in memory
+    requests = ServiceRequest.query.filter(ServiceRequest.status=='completed').order_by(
+        ServiceRequest.id
+    ).yield_per(current_app.config['STREAM_BATCH_SIZE'])
     with open(file_path, 'w', newline='') as file:
         writer = csv.writer(file)
         writer.writerow(["service_id", "customer_id", "pro_id", "request_date", "status", "notes"])
@@ -0,0 +1,82 @@
+"""
+Response compression.
+
+``init_compression(app)`` compresses response bodies with brotli (when the
+``brotli`` package is installed) or gzip, whichever the client prefers in
+``Accept-Encoding``. Only responses whose mimetype is in
+``COMPRESSION_MIMETYPES`` and whose body is at least ``COMPRESSION_MIN_SIZE``
+bytes are compressed; files served with ``send_file`` (images, PDFs),
+streamed bodies and responses that already carry a ``Content-Encoding`` are
+left alone.
+
+A compressed representation gets its own strong ETag (the original value
+with an ``-gzip`` / ``-br`` suffix); ``conditional`` accepts every variant of
+its ETag in ``If-None-Match``.
+"""
+import gzip
+import logging
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+def available_encodings():
+    """Supported encodings, most preferred first (used to break ties in Accept-Encoding)."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def etag_variants(etag):
+    """The ETag of each representation of a response, uncompressed first."""
+    return [etag] + [f"{etag}-{encoding}" for encoding in available_encodings()]
+
+
+def compress(data, encoding):
+    config = current_app.config
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESSION_BROTLI_QUALITY'])
+    # A fixed mtime keeps the output, and so its ETag, stable
+    return gzip.compress(data, compresslevel=config['COMPRESSION_GZIP_LEVEL'], mtime=0)
+
+
+def compress_response(response):
+    config = current_app.config
+    if response.mimetype not in config['COMPRESSION_MIMETYPES']:
+        return response
+    # The body depends on the request's Accept-Encoding from here on
+    response.vary.add('Accept-Encoding')
+
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers):
+        return response
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < config['COMPRESSION_MIN_SIZE']:
+        return response
+    compressed = compress(data, encoding)
+    if len(compressed) >= len(data):
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    logger.debug(f"Compressed {request.path} with {encoding}: {len(data)} -> {len(compressed)} bytes")
+    return response
+
+
+def init_compression(app):
+    """Compress eligible responses of the app."""
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+    app.after_request(compress_response)
@@ -0,0 +1,94 @@
+"""
+Conditional GET support.
+
+``conditional(stamp)`` wraps a view with a cheap change-stamp function. The
+stamp is computed before the view runs and yields a strong ETag and a
+Last-Modified time; when the request's ``If-None-Match`` (or, without it,
+``If-Modified-Since``) shows the client already holds that representation,
+a 304 is returned without running the view at all, so nothing is queried
+beyond the stamp and nothing is serialized.
+
+Stamp functions receive the view arguments and return
+``(validator, last_modified)``, where ``validator`` is any value whose repr
+changes whenever the response body would, or ``None`` to skip conditional
+handling (e.g. for a resource that does not exist). The view can read the
+validator from ``g.change_stamp``, e.g. to key a cache entry on it.
+``last_modified`` must move forward on every change, deletions included;
+when it cannot (a representation that shrinks when rows are deleted) the
+stamp returns ``None`` for it, no Last-Modified is sent and
+``If-Modified-Since`` is ignored.
+"""
+from datetime import timezone
+from functools import wraps
+import hashlib
+import logging
+
+from flask import current_app, g, make_response, request
+
+from .compression import etag_variants
+
+logger = logging.getLogger(__name__)
+
+# Clients must revalidate before reusing a cached copy
+CACHE_CONTROL = 'no-cache'
+
+
+def make_etag(validator):
+    return hashlib.sha1(repr(validator).encode()).hexdigest()
+
+
+def http_time(value):
+    """Naive UTC datetime as an aware datetime with HTTP (second) precision."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def not_modified(etag, last_modified):
+    """The ETag of the representation the client holds, or None if it is outdated."""
+    if request.if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 7232).
+        # A compressed copy carries a suffixed ETag of the same stamp.
+        for variant in etag_variants(etag):
+            if request.if_none_match.contains_weak(variant):
+                return variant
+        return None
+    if last_modified is not None and request.if_modified_since is not None:
+        return etag if last_modified <= request.if_modified_since else None
+    return None
+
+
+def conditional(stamp):
+    """Answer conditional GETs for the wrapped view from ``stamp(**view_args)``."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                validator, last_modified = stamp(**kwargs)
+            except Exception as e:
+                logger.warning(f"Could not compute change stamp for {request.path}: {str(e)}")
+                validator = None
+            g.change_stamp = validator
+            if validator is None:
+                return fn(*args, **kwargs)
+
+            etag = make_etag(validator)
+            last_modified = http_time(last_modified)
+            held = not_modified(etag, last_modified)
+            if held is not None:
+                logger.debug(f"Not modified: {request.path}")
+                response = current_app.response_class(status=304)
+                etag = held
+            else:
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = CACHE_CONTROL
+            return response
+        return wrapper
+    return decorator
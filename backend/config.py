@@ -6,6 +6,28 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///housecare.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Optional read replica; read-only requests are routed to it
+    SQLALCHEMY_BINDS = {'replica': os.environ['DATABASE_REPLICA_URL']} if os.environ.get('DATABASE_REPLICA_URL') else {}
+    REPLICA_LAG_TOLERANCE = int(os.environ.get('REPLICA_LAG_TOLERANCE', 5))  # seconds a writer stays on the primary
+
+    # Server database (PostgreSQL) engine profile, ignored for SQLite
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # seconds
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))  # 0 disables the timeout
+    DB_STARTUP_CHECK = os.environ.get('DB_STARTUP_CHECK', 'true').lower() == 'true'
+
+    # SQLite engine profile, pragmas applied to every new connection
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', 'true').lower() == 'true'
+    SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', 5))
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # bytes
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))  # negative means KiB
+
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-for-dev'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
@@ -14,8 +36,47 @@ class Config:
     JWT_HEADER_NAME = 'Authorization'
     JWT_HEADER_TYPE = 'Bearer'
     
-    # Redis Cache Configuration
-    CACHE_TYPE = 'redis'
+    # Trailing days recomputed by every incremental daily_stats update
+    DAILY_STATS_WINDOW_DAYS = int(os.environ.get('DAILY_STATS_WINDOW_DAYS', 2))
+
+    # Per-request SQL statistics (headers in debug mode, log records otherwise)
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', 'true').lower() == 'true'
+    # Executions of one SELECT shape within a request that flag a likely N+1
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+
+    # Response compression (brotli when installed, else gzip) for text payloads
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))  # bytes
+    COMPRESSION_MIMETYPES = set(os.environ.get(
+        'COMPRESSION_MIMETYPES',
+        'application/json,text/html,text/css,text/plain,text/csv,application/javascript'
+    ).split(','))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))  # 1-9
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))  # 0-11
+
+    # JSON encoder for responses: 'orjson' (same bytes, faster) or 'stdlib'
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'orjson')
+    # Rows fetched and serialized per batch by ?stream=true list responses
+    STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 1000))
+
+    # Redis Cache Configuration (in-process LRU in front of Redis, kept
+    # coherent across workers through pub/sub invalidation)
+    CACHE_TYPE = 'backend.cache_backend.TwoTierRedisCache'
     CACHE_REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
     CACHE_DEFAULT_TIMEOUT = 600  # 10 minutes
     CACHE_KEY_PREFIX = 'housecare_cache:'
+    CACHE_L1_MAX_ENTRIES = int(os.environ.get('CACHE_L1_MAX_ENTRIES', 1024))
+    CACHE_L1_TTL = int(os.environ.get('CACHE_L1_TTL', 10))  # seconds
+    # Short Redis timeouts; when Redis is unreachable a circuit breaker serves
+    # the cache from a bounded per-process store and probes for recovery
+    CACHE_REDIS_SOCKET_TIMEOUT = float(os.environ.get('CACHE_REDIS_SOCKET_TIMEOUT', 0.25))  # seconds
+    CACHE_REDIS_CONNECT_TIMEOUT = float(os.environ.get('CACHE_REDIS_CONNECT_TIMEOUT', 0.25))  # seconds
+    CACHE_FALLBACK_MAX_ENTRIES = int(os.environ.get('CACHE_FALLBACK_MAX_ENTRIES', 4096))
+    CACHE_FALLBACK_TTL = int(os.environ.get('CACHE_FALLBACK_TTL', 300))  # seconds
+    CACHE_BREAKER_PROBE_INTERVAL = float(os.environ.get('CACHE_BREAKER_PROBE_INTERVAL', 1.0))  # seconds
+
+    # JWT user lookup cache: shared (Redis) and per-process lifetimes in seconds
+    IDENTITY_CACHE_ENABLED = os.environ.get('IDENTITY_CACHE_ENABLED', 'true').lower() == 'true'
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 60))
+    IDENTITY_CACHE_LOCAL_TTL = int(os.environ.get('IDENTITY_CACHE_LOCAL_TTL', 10))
+    IDENTITY_CACHE_LOCAL_SIZE = int(os.environ.get('IDENTITY_CACHE_LOCAL_SIZE', 1024))
@@ -2,6 +2,12 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from .decorators import customer_required
 from .models import db, User, Customer, ServiceProfessional, ServiceRequest, Service, Review
+from .pagination import InvalidCursor, keyset_page
+from .fieldsets import InvalidFields
+from .serializers import CUSTOMER_REQUEST, CUSTOMER_REQUEST_DETAIL
+from .caching import cached_user_stats, invalidate_request_stats
+from .identity_cache import invalidate_identity
+from sqlalchemy import func, case
 import logging
 from datetime import datetime
 
@@ -34,6 +40,7 @@ def customer_profile():
                 customer.address = data['address']
         
         db.session.commit()
+        invalidate_identity(current_user_id)
         logger.info(f"Customer {current_user_id} profile updated")
         return jsonify({'message': 'Profile updated', 'user': user.to_dict()}), 200
 
@@ -46,25 +53,19 @@ def customer_service_requests():
     # GET - List all service requests for the customer
     if request.method == 'GET':
         logger.debug(f"Customer {current_user_id} requesting service requests")
-        requests = ServiceRequest.query.filter_by(customer_id=current_user_id).all()
+        try:
+            fields = CUSTOMER_REQUEST.requested()
+        except InvalidFields as e:
+            return jsonify({'error': str(e)}), 400
+        query = CUSTOMER_REQUEST.query(fields).filter(ServiceRequest.customer_id == current_user_id)
+        try:
+            page = keyset_page(query, ServiceRequest.id)
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+        requests = page.rows if page else query.all()
         logger.debug(f"Found {len(requests)} requests for customer {current_user_id}")
-        return jsonify([{
-            'id': req.id,
-            'service_id': req.service_id,
-            'service_name': req.service.name if req.service else 'Unknown',
-            'pro_id': req.pro_id,
-            'professional_name': req.professional.username if req.professional else None,
-            'status': req.status,
-            'notes': req.notes if req.notes else None,
-            'service_price': req.service.base_price,
-            'service_duration': req.service.avg_duration,
-            'request_date': req.request_date.isoformat(),
-            'assigned_date': req.assigned_date.isoformat() if req.assigned_date else None,
-            'completed_on': req.completed_on.isoformat() if req.completed_on else None,
-            'cancelled_on': req.cancelled_on.isoformat() if req.cancelled_on else None,
-            'cancelled_by': req.cancelled_by if req.cancelled_by else None,
-            'completion_date': req.completion_date.isoformat() if req.completion_date else None
-        } for req in requests]), 200
+        result = [CUSTOMER_REQUEST.serialize(row, fields) for row in requests]
+        return jsonify(page.wrap(result) if page else result), 200
     
     # POST - Create a new service request
     if request.method == 'POST':
@@ -117,6 +118,7 @@ def customer_service_requests():
         
         db.session.add(new_request)
         db.session.commit()
+        invalidate_request_stats(new_request)
         logger.info(f"Customer {current_user_id} created service request {new_request.id} for service {service_id}")
         return jsonify({
             'message': 'Service request created successfully',
@@ -130,6 +132,18 @@ def customer_service_request_detail(request_id):
     current_user_id = get_jwt_identity()
     logger.debug(f"Customer {current_user_id} accessing request {request_id}")
     
+    # GET - Get service request details
+    if request.method == 'GET':
+        logger.debug(f"Customer {current_user_id} getting details for request {request_id}")
+        row = CUSTOMER_REQUEST_DETAIL.query().filter(
+            ServiceRequest.id == request_id,
+            ServiceRequest.customer_id == current_user_id
+        ).first()
+        if row is None:
+            logger.warning(f"Service request {request_id} not found for customer {current_user_id}")
+            return jsonify({'error': 'Service request not found'}), 404
+        return jsonify(CUSTOMER_REQUEST_DETAIL.serialize(row)), 200
+    
     # Check if the request exists and belongs to the customer
     service_request = ServiceRequest.query.filter_by(
         id=request_id, 
@@ -140,29 +154,6 @@ def customer_service_request_detail(request_id):
         logger.warning(f"Service request {request_id} not found for customer {current_user_id}")
         return jsonify({'error': 'Service request not found'}), 404
     
-    # GET - Get service request details
-    if request.method == 'GET':
-        logger.debug(f"Customer {current_user_id} getting details for request {request_id}")
-        return jsonify({
-            'id': service_request.id,
-            'service_id': service_request.service_id,
-            'service_name': service_request.service.name if service_request.service else 'Unknown',
-            'pro_id': service_request.pro_id,
-            'professional_name': service_request.professional.username if service_request.professional else None,
-            'professional_phone': service_request.professional.phone_number if service_request.professional else None,
-            'professional_email': service_request.professional.email if service_request.professional else None,
-            'status': service_request.status,
-            'service_price': service_request.service.base_price,
-            'service_duration': service_request.service.avg_duration,
-            'request_date': service_request.request_date.isoformat(),
-            'assigned_date': service_request.assigned_date.isoformat() if service_request.assigned_date else None,
-            'completed_on': service_request.completed_on.isoformat() if service_request.completed_on else None,
-            'cancelled_on': service_request.cancelled_on.isoformat() if service_request.cancelled_on else None,
-            'cancelled_by': service_request.cancelled_by if service_request.cancelled_by else None,
-            'completion_date': service_request.completion_date.isoformat() if service_request.completion_date else None,
-            'notes': service_request.notes
-        }), 200
-    
     # PUT - Update (cancel or modify) service request
     if request.method == 'PUT':
         data = request.get_json()
@@ -215,6 +206,7 @@ def customer_service_request_detail(request_id):
                 return jsonify({'error': 'Invalid date format for completion date'}), 400
         
         db.session.commit()
+        invalidate_request_stats(service_request)
         return jsonify({'message': 'Service request updated successfully'}), 200
 
 @customer_bp.route('/customer/service-requests/<int:request_id>/review', methods=['GET', 'POST'])
@@ -292,6 +284,10 @@ def customer_request_review(request_id):
             logger.debug(f"Updated professional {professional.id} rating to {new_avg} ({new_total_reviews} reviews)")
         
         db.session.commit()
+        invalidate_request_stats(service_request)
+        if professional:
+            # The cached identity carries the rating columns
+            invalidate_identity(professional.id)
         logger.info(f"Customer {current_user_id} submitted review for request {request_id}")
                                 
         return jsonify({'message': 'Review submitted successfully'}), 201
@@ -303,31 +299,28 @@ def customer_service_stats():
     current_user_id = get_jwt_identity()
     logger.debug(f"Customer {current_user_id} requesting service statistics")
     
-    # Get counts of different request statuses
-    total_requests = ServiceRequest.query.filter_by(customer_id=current_user_id).count()
-    completed_requests = ServiceRequest.query.filter_by(customer_id=current_user_id, status='completed').count()
-    pending_requests = ServiceRequest.query.filter(
-        ServiceRequest.customer_id == current_user_id,
-        ServiceRequest.status.in_(['requested', 'assigned'])
-    ).count()
-    
-    # Calculate total spent
-    total_spent = 0
-    completed_requests_data = ServiceRequest.query.filter_by(
-        customer_id=current_user_id, 
-        status='completed'
-    ).all()
-    for req in completed_requests_data:
-        if req.service:
-            total_spent += req.service.base_price
+    def load_stats():
+        # Status counts and total spent in a single aggregate query
+        completed = ServiceRequest.status == 'completed'
+        total_requests, completed_requests, pending_requests, total_spent = db.session.query(
+            func.count(ServiceRequest.id),
+            func.count(case((completed, ServiceRequest.id))),
+            func.count(case((ServiceRequest.status.in_(['requested', 'assigned']), ServiceRequest.id))),
+            func.sum(case((completed, Service.base_price)))
+        ).outerjoin(Service, Service.id == ServiceRequest.service_id).filter(
+            ServiceRequest.customer_id == current_user_id
+        ).one()
+        total_spent = total_spent or 0
+        
+        logger.debug(f"Customer {current_user_id} stats: total={total_requests}, completed={completed_requests}, pending={pending_requests}, spent=${total_spent}")
+        return {
+            'totalRequests': total_requests,
+            'completedRequests': completed_requests,
+            'pendingRequests': pending_requests,
+            'totalSpent': total_spent
+        }
     
-    logger.debug(f"Customer {current_user_id} stats: total={total_requests}, completed={completed_requests}, pending={pending_requests}, spent=${total_spent}")
-    return jsonify({
-        'totalRequests': total_requests,
-        'completedRequests': completed_requests,
-        'pendingRequests': pending_requests,
-        'totalSpent': total_spent
-    }), 200
+    return jsonify(cached_user_stats('customer', current_user_id, load_stats)), 200
 
 @customer_bp.route('/customer/service-history', methods=['GET'])
 @customer_required
@@ -338,6 +331,10 @@ def customer_service_history():
     # Get all service requests for this customer with their review status
     requests = db.session.query(ServiceRequest, Review).\
         outerjoin(Review, Review.request_id == ServiceRequest.id).\
+        options(
+            db.joinedload(ServiceRequest.service),
+            db.joinedload(ServiceRequest.professional)
+        ).\
         filter(ServiceRequest.customer_id == current_user_id).all()
     
     logger.debug(f"Found {len(requests)} service requests in history for customer {current_user_id}")
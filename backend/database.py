@@ -0,0 +1,129 @@
+"""
+Database engine setup.
+
+Builds the SQLAlchemy engine options for the configured backend and checks at
+startup that the engine can actually serve queries, so a misconfigured
+database fails the deploy instead of the first user request.
+
+SQLite deployments get a tuned profile: a small connection pool and a set of
+pragmas (WAL journaling, busy timeout, relaxed fsync, mmap and page cache)
+applied whenever the pool opens a new connection, so concurrent commits wait
+for the write lock instead of failing with "database is locked".
+"""
+import logging
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from .db_routing import REPLICA_BIND, init_replica_routing
+from .models import db
+
+logger = logging.getLogger(__name__)
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def server_engine_options(config):
+    """Pool and timeout options for a server database such as PostgreSQL."""
+    options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    timeout = config['DB_STATEMENT_TIMEOUT_MS']
+    if timeout and make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'postgresql':
+        # Applied by the server to every statement on the connection
+        options['connect_args'] = {'options': f'-c statement_timeout={timeout}'}
+    return options
+
+
+def sqlite_engine_options(config):
+    """Pool options for a tuned SQLite file database."""
+    if not config['SQLITE_TUNING']:
+        return {}
+    options = {
+        # Seconds the driver waits on a locked database before raising
+        'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000},
+    }
+    if make_url(config['SQLALCHEMY_DATABASE_URI']).database not in (None, '', ':memory:'):
+        # Reuse connections so the pragmas are paid once per connection,
+        # not once per checkout; connections move between worker threads
+        options['poolclass'] = QueuePool
+        options['pool_size'] = config['SQLITE_POOL_SIZE']
+        options['connect_args']['check_same_thread'] = False
+    return options
+
+
+def sqlite_pragmas(config):
+    return [
+        ('journal_mode', config['SQLITE_JOURNAL_MODE']),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT_MS']),
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+        ('cache_size', config['SQLITE_CACHE_SIZE']),
+    ]
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Run the given pragmas on every new DBAPI connection of the engine."""
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def engine_options(config):
+    """Engine options for the configured database URI."""
+    if is_sqlite(config['SQLALCHEMY_DATABASE_URI']):
+        return sqlite_engine_options(config)
+    return server_engine_options(config)
+
+
+def init_database(app):
+    """Apply the engine profile and bind the SQLAlchemy extension to the app."""
+    options = engine_options(app.config)
+    # Explicit SQLALCHEMY_ENGINE_OPTIONS entries win over the profile defaults
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    db.init_app(app)
+    init_replica_routing(app)
+
+    if is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']) and app.config['SQLITE_TUNING']:
+        with app.app_context():
+            for engine in database_engines(app):
+                install_sqlite_pragmas(engine, sqlite_pragmas(app.config))
+
+
+def database_engines(app):
+    """The primary engine followed by the replica engine, when configured."""
+    engines = [db.get_engine(app)]
+    if REPLICA_BIND in (app.config.get('SQLALCHEMY_BINDS') or {}):
+        engines.append(db.get_engine(app, bind=REPLICA_BIND))
+    return engines
+
+
+def check_database(app):
+    """
+    Validate the engine by running a trivial query.
+
+    Raises RuntimeError when the database cannot be reached so the process
+    refuses to start with a broken engine.
+    """
+    with app.app_context():
+        try:
+            engines = database_engines(app)
+            for engine in engines:
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT 1'))
+        except Exception as e:
+            logger.error(f"Database startup check failed: {str(e)}")
+            raise RuntimeError(f"Database is not reachable: {str(e)}") from e
+        for engine in engines:
+            logger.info(f"Database engine ready: dialect={engine.dialect.name}, pool={engine.pool.status()}")
@@ -0,0 +1,141 @@
+"""
+Read-replica routing for the SQLAlchemy session.
+
+When a ``replica`` bind is configured, statements issued while handling a
+read-only request (GET/HEAD/OPTIONS, or a view decorated with ``read_only``)
+are sent to the replica. Everything else goes to the primary:
+
+* statements outside a request (Celery tasks, CLI commands, migrations),
+* any request once the session has written, by a flush or by executing an
+  insert, update or delete statement, so a handler always reads its own
+  writes,
+* requests from a user who wrote within the last ``REPLICA_LAG_TOLERANCE``
+  seconds, so replication lag never hides a user's own recent changes,
+* reads inside ``primary_reads()``, used when a result outlives the request
+  (a cache fill), so a lagging replica's data is never stored.
+"""
+from contextlib import contextmanager
+import logging
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import orm
+from sqlalchemy.sql.dml import UpdateBase
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = 'replica'
+READ_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+
+def use_primary():
+    """Pin the rest of the current request to the primary database."""
+    if has_request_context():
+        g.db_wrote = True
+
+
+@contextmanager
+def primary_reads():
+    """
+    Send the reads of the enclosed block to the primary. Unlike
+    ``use_primary`` this does not pin the rest of the request or mark the
+    user as a recent writer.
+    """
+    if not has_request_context():
+        yield
+        return
+    previous = g.get('db_primary_reads', False)
+    g.db_primary_reads = True
+    try:
+        yield
+    finally:
+        g.db_primary_reads = previous
+
+
+def read_only(fn):
+    """Mark a non-GET view as safe to serve from the read replica."""
+    fn.read_only = True
+    return fn
+
+
+def recent_write_key(identity):
+    return f"db_recent_write:{identity}"
+
+
+def current_identity():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        # JWT not verified (yet) for this request
+        return None
+
+
+def request_is_read_only():
+    if request.method in READ_METHODS:
+        return True
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, 'read_only', False)
+
+
+def user_wrote_recently():
+    """Whether the requesting user wrote within the replica lag tolerance."""
+    identity = current_identity()
+    if identity is None:
+        return False
+    recent = g.get('db_recent_write')
+    if recent is None:
+        from .extensions import cache
+        try:
+            recent = bool(cache.get(recent_write_key(identity)))
+        except Exception as e:
+            # Without the marker we cannot rule out lag, so stay on the primary
+            logger.warning(f"Could not read recent-write marker: {str(e)}")
+            recent = True
+        g.db_recent_write = recent
+    return recent
+
+
+class RoutingSession(SignallingSession):
+    """Session that sends read-only request traffic to the replica bind."""
+
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (self._flushing or isinstance(clause, UpdateBase)) and has_request_context():
+            g.db_wrote = True
+        elif self._use_replica():
+            return self.db.get_engine(self.app, bind=REPLICA_BIND)
+        return super().get_bind(mapper, clause)
+
+    def _use_replica(self):
+        if REPLICA_BIND not in (self.app.config.get('SQLALCHEMY_BINDS') or {}):
+            return False
+        if not has_request_context() or g.get('db_wrote') or g.get('db_primary_reads'):
+            return False
+        return request_is_read_only() and not user_wrote_recently()
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def remember_writes(response):
+    """After-request hook pinning a user who just wrote to the primary."""
+    tolerance = current_app.config.get('REPLICA_LAG_TOLERANCE', 0)
+    if g.get('db_wrote') and tolerance:
+        identity = current_identity()
+        if identity is not None:
+            from .extensions import cache
+            try:
+                cache.set(recent_write_key(identity), True, timeout=tolerance)
+            except Exception as e:
+                logger.warning(f"Could not record recent write: {str(e)}")
+    return response
+
+
+def init_replica_routing(app):
+    app.after_request(remember_writes)
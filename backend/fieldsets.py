@@ -0,0 +1,146 @@
+"""
+Sparse fieldsets for list endpoints.
+
+A client passing ``fields=id,username,is_active`` gets only those keys in
+each item, and the query behind the response is narrowed to match: only the
+columns the requested fields are built from are selected (``load_only``),
+relationships are joined only when a requested field reads them, and every
+other relationship is left unloaded instead of being eagerly fetched.
+
+Without ``fields`` the endpoints keep returning their full representation.
+An unknown field name returns 400. Service request listings are built from
+column projections instead (see ``serializers``), which narrow the same way.
+"""
+from flask import request
+from sqlalchemy.orm import joinedload, lazyload, load_only, selectinload
+
+from .models import Document, Service, ServiceProfessional, User
+
+
+class InvalidFields(ValueError):
+    """Raised when the fields query parameter names an unknown field."""
+
+
+def requested_fields(allowed):
+    """Field names of the request's ``fields`` argument, or None for all fields."""
+    raw = request.args.get('fields')
+    if raw is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    if not names:
+        raise InvalidFields('No fields requested')
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+class Field:
+    """
+    One output field: the columns it is built from, the columns it reads
+    through relationships, and how its value is rendered from a loaded row.
+    """
+
+    def __init__(self, render, columns=(), related=(), counted=None):
+        self.render = render
+        self.columns = columns
+        # (relationship, column) pairs loaded with a joined eager load
+        self.related = related
+        # Returns the (one-to-many relationship, foreign key) whose rows are
+        # only counted; a callable because backrefs exist once mappers are configured
+        self.counted = counted
+
+
+def column(attr, render=None):
+    """A field holding the value of a single column."""
+    if render is None:
+        return Field(lambda row: getattr(row, attr.key), columns=(attr,))
+    return Field(lambda row: render(getattr(row, attr.key)), columns=(attr,))
+
+
+def timestamp(attr):
+    return column(attr, isoformat)
+
+
+class FieldSet:
+    """The fields a list endpoint can return, in their default order."""
+
+    def __init__(self, key, fields):
+        # Always loaded, keyset pagination reads it from the last row
+        self.key = key
+        self.fields = fields
+
+    def requested(self):
+        return requested_fields(self.fields)
+
+    def narrow(self, query, names):
+        """Restrict ``query`` to what the named fields need."""
+        columns = {self.key.key: self.key}
+        related = {}
+        counted = []
+        for name in names:
+            field = self.fields[name]
+            for attr in field.columns:
+                columns[attr.key] = attr
+            for relationship, attr in field.related:
+                related.setdefault(relationship, {})[attr.key] = attr
+            if field.counted is not None and field.counted() not in counted:
+                counted.append(field.counted())
+
+        options = [load_only(*columns.values()), lazyload('*')]
+        for relationship, attrs in related.items():
+            options.append(joinedload(relationship).load_only(*attrs.values()))
+        for relationship, key in counted:
+            options.append(selectinload(relationship).load_only(key))
+        return query.options(*options)
+
+    def serialize(self, row, names):
+        return {name: self.fields[name].render(row) for name in names}
+
+
+def user_fields(entity):
+    """The fields of ``User.to_dict`` for ``entity`` (User or a subclass)."""
+    return {
+        'id': column(entity.id),
+        'username': column(entity.username),
+        'email': column(entity.email),
+        'role': column(entity.user_type),
+        'full_name': column(entity.full_name),
+        'is_approved': column(entity.is_approved),
+        'is_active': column(entity.is_active),
+        'created_at': timestamp(entity.created_at),
+    }
+
+
+USER_FIELDS = FieldSet(User.id, user_fields(User))
+
+PROFESSIONAL_FIELDS = FieldSet(ServiceProfessional.id, {
+    **user_fields(ServiceProfessional),
+    'service_type_id': column(ServiceProfessional.service_type_id),
+    'description': column(ServiceProfessional.description),
+    'phone_number': column(ServiceProfessional.phone_number),
+    'pin_code': column(ServiceProfessional.pin_code),
+    'rejection_reason': column(ServiceProfessional.rejection_reason),
+    'experience_years': column(ServiceProfessional.experience_years),
+    'average_rating': column(ServiceProfessional.average_rating),
+    'total_reviews': column(ServiceProfessional.total_reviews),
+    'documents_verified': column(ServiceProfessional.documents_verified),
+    'documents_count': Field(
+        lambda pro: len(pro.documents),
+        counted=lambda: (ServiceProfessional.documents, Document.professional_id)
+    ),
+    'service_name': Field(
+        lambda pro: pro.service.name if pro.service else None,
+        columns=(ServiceProfessional.service_type_id,),
+        related=((ServiceProfessional.service, Service.name),)
+    ),
+    'experience': column(
+        ServiceProfessional.experience_years,
+        lambda years: f"{years} years experience" if years else "New Professional"
+    ),
+})
+
@@ -0,0 +1,155 @@
+"""
+Cache for the JWT current-user lookup.
+
+Every JWT-protected request resolves its user through
+``user_lookup_callback``. Instead of querying ``users`` (joined with the
+subclass tables) each time, the user's column values are cached for a short
+time per (user id, token ``iat``):
+
+* a per-process dictionary (``IDENTITY_CACHE_LOCAL_TTL`` seconds), and
+* a Redis entry ``identity:<user id>`` mapping each ``iat`` to the column
+  values (``IDENTITY_CACHE_TTL`` seconds), shared by all workers.
+
+On a hit the user is rebuilt from the cached values and attached to the
+session without a query, so handlers fetching the same user by id reuse it.
+Handlers changing a user's account state or profile call
+``invalidate_identity`` after committing; other workers may keep serving
+their local copy for up to ``IDENTITY_CACHE_LOCAL_TTL`` seconds.
+"""
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached, with_polymorphic
+
+from .extensions import cache
+from .models import db, User
+
+logger = logging.getLogger(__name__)
+
+# Never copied into the cache; loaded on demand if a handler needs it
+EXCLUDED_COLUMNS = frozenset(['password_hash'])
+
+_local = OrderedDict()
+_local_lock = threading.Lock()
+_counters = {'local_hits': 0, 'redis_hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def identity_key(user_id):
+    return f"identity:{int(user_id)}"
+
+
+def count(name):
+    with _local_lock:
+        _counters[name] += 1
+
+
+def identity_cache_stats():
+    """Hit and miss counters of this process."""
+    with _local_lock:
+        stats = dict(_counters)
+        stats['local_entries'] = len(_local)
+    lookups = stats['local_hits'] + stats['redis_hits'] + stats['misses']
+    stats['hit_ratio'] = round((stats['local_hits'] + stats['redis_hits']) / lookups, 4) if lookups else None
+    return stats
+
+
+def local_get(key):
+    with _local_lock:
+        entry = _local.get(key)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del _local[key]
+            return None
+        _local.move_to_end(key)
+        return data
+
+
+def local_set(key, data):
+    config = current_app.config
+    with _local_lock:
+        _local[key] = (time.monotonic() + config['IDENTITY_CACHE_LOCAL_TTL'], data)
+        _local.move_to_end(key)
+        while len(_local) > config['IDENTITY_CACHE_LOCAL_SIZE']:
+            _local.popitem(last=False)
+
+
+def user_columns(user):
+    """Column values of a loaded user, including its subclass columns."""
+    return {
+        attr.key: getattr(user, attr.key)
+        for attr in inspect(user).mapper.column_attrs
+        if attr.key not in EXCLUDED_COLUMNS
+    }
+
+
+def rebuild_user(data):
+    """Attach a user rebuilt from cached column values to the session without a query."""
+    mapper = inspect(User).polymorphic_map.get(data['user_type'], inspect(User))
+    user = mapper.class_(**data)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def query_user(user_id):
+    # Load the subclass columns in the same query instead of a second one
+    poly = with_polymorphic(User, '*')
+    return db.session.query(poly).filter(poly.id == user_id).one_or_none()
+
+
+def load_identity(user_id, iat):
+    """The user for a verified token, served from the cache when possible."""
+    if not current_app.config['IDENTITY_CACHE_ENABLED'] or not isinstance(user_id, int):
+        return query_user(user_id)
+
+    local_key = (int(user_id), iat)
+    data = local_get(local_key)
+    if data is not None:
+        count('local_hits')
+        return rebuild_user(data)
+
+    try:
+        entries = cache.get(identity_key(user_id)) or {}
+    except Exception as e:
+        logger.warning(f"Identity cache unavailable: {str(e)}")
+        entries = None
+
+    data = entries.get(iat) if entries else None
+    if data is not None:
+        count('redis_hits')
+        local_set(local_key, data)
+        return rebuild_user(data)
+
+    count('misses')
+    user = query_user(user_id)
+    if user is None:
+        return None
+    data = user_columns(user)
+    local_set(local_key, data)
+    if entries is not None:
+        entries[iat] = data
+        try:
+            cache.set(identity_key(user_id), entries, timeout=current_app.config['IDENTITY_CACHE_TTL'])
+        except Exception as e:
+            logger.warning(f"Could not cache identity of user {user_id}: {str(e)}")
+    return user
+
+
+def invalidate_identity(*user_ids):
+    """Drop the cached identities of the given users. Call after committing a change to them."""
+    user_ids = {int(user_id) for user_id in user_ids}
+    if not user_ids:
+        return
+    with _local_lock:
+        for key in [key for key in _local if key[0] in user_ids]:
+            del _local[key]
+        _counters['invalidations'] += len(user_ids)
+    try:
+        cache.delete_many(*[identity_key(user_id) for user_id in user_ids])
+    except Exception as e:
+        logger.error(f"Could not invalidate cached identities: {str(e)}")
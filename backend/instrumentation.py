@@ -0,0 +1,123 @@
+"""
+Per-request SQL instrumentation.
+
+Engine events record every statement executed while a request is handled:
+how many ran, how long they took in total, and how often each statement
+shape (its fingerprint) repeated. A fingerprint repeating at least
+``SQL_N_PLUS_ONE_THRESHOLD`` times within one request is reported as a
+likely N+1 pattern, e.g. a per-row lazy load inside a list endpoint.
+
+In debug mode the numbers are returned as ``X-SQL-*`` response headers;
+otherwise each request emits one log record, and a warning for every
+suspected N+1 fingerprint.
+"""
+from collections import Counter
+import hashlib
+import logging
+import re
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Expanded IN lists render one placeholder per value; collapse them so the
+# same query with a different number of ids shares a fingerprint
+IN_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s)(?:\s*,\s*(?:\?|%\(\w+\)s))*\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    normalized = WHITESPACE.sub(' ', statement).strip()
+    return IN_LIST.sub('(?)', normalized)
+
+
+class RequestSQLStats:
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.total_time += elapsed
+        self.statements[fingerprint(statement)] += 1
+
+    def repeated(self, threshold):
+        """Fingerprints of SELECTs executed at least ``threshold`` times."""
+        return [(statement, count) for statement, count in self.statements.most_common()
+                if count >= threshold and statement.upper().startswith('SELECT')]
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's execution context rather than the connection,
+    # so a statement that raises leaves nothing behind
+    if context is not None:
+        context.sql_start_time = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_time = getattr(context, 'sql_start_time', None)
+    if start_time is None:
+        return
+    elapsed = time.perf_counter() - start_time
+    if has_request_context():
+        stats = g.get('sql_stats')
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+
+def start_request_stats():
+    g.sql_stats = RequestSQLStats()
+
+
+def short_hash(statement):
+    return hashlib.sha1(statement.encode()).hexdigest()[:10]
+
+
+def report_request_stats(response):
+    stats = g.get('sql_stats')
+    if stats is None:
+        return response
+
+    threshold = current_app.config['SQL_N_PLUS_ONE_THRESHOLD']
+    repeated = stats.repeated(threshold)
+    total_ms = round(stats.total_time * 1000, 2)
+
+    if current_app.debug:
+        response.headers['X-SQL-Count'] = str(stats.count)
+        response.headers['X-SQL-Time-Ms'] = str(total_ms)
+        if repeated:
+            response.headers['X-SQL-N-Plus-One'] = ', '.join(
+                f"{short_hash(statement)}x{count}" for statement, count in repeated
+            )
+    else:
+        logger.info(
+            f"{request.method} {request.path} -> {response.status_code}: "
+            f"{stats.count} SQL statements in {total_ms} ms",
+            extra={
+                'sql_count': stats.count,
+                'sql_time_ms': total_ms,
+                'sql_repeated': {short_hash(statement): count for statement, count in repeated}
+            }
+        )
+
+    for statement, count in repeated:
+        logger.warning(
+            f"Likely N+1 in {request.endpoint}: statement {short_hash(statement)} "
+            f"ran {count} times: {statement[:300]}"
+        )
+    return response
+
+
+def init_sql_instrumentation(app):
+    """Hook statement timing into all engines and per-request reporting into the app."""
+    if not app.config.get('SQL_INSTRUMENTATION', True):
+        return
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+    app.before_request(start_request_stats)
+    app.after_request(report_request_stats)
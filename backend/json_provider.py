@@ -0,0 +1,128 @@
+"""
+Fast JSON provider.
+
+``OrjsonProvider`` serializes compact responses (``jsonify`` outside debug
+mode) with orjson and produces exactly the bytes Flask's stdlib provider
+would, so clients see no difference:
+
+* keys are sorted and non-ASCII characters escaped, as with ``json.dumps``;
+* dates and datetimes keep Flask's HTTP date format, dataclasses become
+  dicts, ``Decimal``, ``UUID`` and ``__html__`` objects become strings;
+* floats are written in the shortest form that round-trips, like
+  ``repr``.
+
+Output orjson cannot reproduce byte for byte (non-ASCII text, floats that
+``repr`` writes with an exponent, integers beyond 64 bits, non-string keys,
+unsupported types, NaN and infinities, which orjson writes as ``null``) is
+serialized again with the stdlib encoder, as is any pretty-printed or
+customised ``dumps`` call.
+
+Enable it with ``JSON_PROVIDER = 'orjson'``; without the ``orjson`` package
+every call goes to the stdlib encoder.
+"""
+import dataclasses
+import math
+import re
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+COMPACT_SEPARATORS = (',', ':')
+
+EXPONENT = re.compile(rb'e[-0-9]')
+
+
+def diverging_floats(data):
+    """
+    Whether orjson may have written a float differently from ``repr``, which
+    uses an exponent below 1e-4 and from 1e16 on where orjson writes
+    "0.00005" or "1e16" instead of "5e-05" or "1e+16". Matches inside
+    strings only cost a stdlib round.
+    """
+    if b'0.0000' in data:
+        return True
+    # A plain regex with a leading literal scans much faster than one
+    # starting with a digit class
+    return any(data[match.start() - 1:match.start()].isdigit() for match in EXPONENT.finditer(data))
+
+
+LEAF_TYPES = frozenset([str, int, bool, type(None)])
+CONTAINER_TYPES = frozenset([dict, list, tuple])
+
+
+def non_finite(obj):
+    """Whether ``obj`` holds a NaN or infinite float, which orjson writes as null."""
+    # An explicit stack and exact type checks first: this walks every value
+    # of payloads that contain a null, so it has to stay well under orjson's
+    # own encoding time
+    pending = [[obj]]
+    while pending:
+        container = pending.pop()
+        for value in (container.values() if isinstance(container, dict) else container):
+            cls = type(value)
+            if cls in LEAF_TYPES:
+                continue
+            if cls in CONTAINER_TYPES:
+                pending.append(value)
+            elif isinstance(value, float):
+                if not math.isfinite(value):
+                    return True
+            elif isinstance(value, (dict, list, tuple)):
+                pending.append(value)
+            elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+                pending.append([getattr(value, field.name) for field in dataclasses.fields(value)])
+    return False
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider encoding compact output with orjson."""
+
+    def fast_path(self, kwargs):
+        app = self._app
+        return (orjson is not None
+                and kwargs.get('separators') == COMPACT_SEPARATORS
+                and kwargs.keys() <= {'separators'}
+                and app._json_encoder is None
+                and app.config['JSON_AS_ASCII'] is None
+                and app.config['JSON_SORT_KEYS'] is None)
+
+    def encode(self, obj, kwargs):
+        """The UTF-8 JSON of ``obj`` from orjson, or None where only the stdlib gets it exactly right."""
+        if not self.fast_path(kwargs):
+            return None
+        # Dates go through default() for the HTTP date format
+        options = orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            # orjson keeps dataclass fields in definition order; asdict()
+            # in default() turns them into dicts that get sorted
+            options |= orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+        try:
+            data = orjson.dumps(obj, default=self.default, option=options)
+        except TypeError:
+            return None
+        if (self.ensure_ascii and not data.isascii()) or diverging_floats(data):
+            return None
+        # Only a payload with a null can hide a non-finite float
+        if b'null' in data and non_finite(obj):
+            return None
+        return data
+
+    def dumps(self, obj, **kwargs):
+        data = self.encode(obj, kwargs)
+        if data is not None:
+            return data.decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        # Same as the stdlib provider's response() without a round trip through str
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(obj)
+        data = self.encode(obj, {'separators': COMPACT_SEPARATORS})
+        if data is None:
+            return super().response(obj)
+        return self._app.response_class(data + b"\n", mimetype=self.mimetype)
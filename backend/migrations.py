@@ -0,0 +1,220 @@
+"""
+Versioned schema migrations.
+
+Each migration is registered with a version number and applied exactly once,
+in order, inside its own transaction. Applied versions are recorded in the
+``schema_version`` table, so running the upgrade against an existing database
+only executes the migrations it has not seen yet.
+
+Migrations must be idempotent (``checkfirst`` / inspector checks) because
+databases created by the old ``db.create_all()`` call already contain some of
+the objects a migration creates.
+
+Several workers may start at once, so upgrades run under ``migration_lock``:
+an advisory lock on PostgreSQL, a lock file next to the database on SQLite.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+import logging
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development server only
+    fcntl = None
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+
+from .availability import rebuild_availability
+from .models import (
+    db, DailyStat, DailyStatDirtyDay, Document, Review, Service, ServiceAvailability,
+    ServiceProfessional, ServiceRequest, User
+)
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key of the PostgreSQL advisory lock
+MIGRATION_LOCK_KEY = 720195001
+
+# Kept out of db.metadata so create_all() never touches the bookkeeping table
+version_metadata = MetaData()
+schema_version = Table(
+    'schema_version', version_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False, default=datetime.utcnow)
+)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register an upgrade function under the given schema version."""
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return fn
+    return decorator
+
+
+def index_names(conn, table):
+    """Names of the indexes on a table, including expression indexes."""
+    # The inspector leaves out indexes on expressions, so read the catalogs
+    if conn.dialect.name == 'postgresql':
+        return set(conn.execute(text(
+            'SELECT indexname FROM pg_indexes WHERE tablename = :table AND schemaname = current_schema()'
+        ), {'table': table.name}).scalars())
+    if conn.dialect.name == 'sqlite':
+        return set(conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"
+        ), {'table': table.name}).scalars())
+    return {index['name'] for index in inspect(conn).get_indexes(table.name)}
+
+
+def create_indexes(conn, table, names):
+    """Create the named indexes of a mapped table if they do not exist yet."""
+    existing = index_names(conn, table)
+    for index in table.indexes:
+        if index.name in names and index.name not in existing:
+            logger.info(f"Creating index {index.name} on {table.name}")
+            index.create(bind=conn)
+
+
+def add_column(conn, table, name):
+    """Add a mapped column to an existing table if it does not exist yet."""
+    existing = {column['name'] for column in inspect(conn).get_columns(table.name)}
+    if name in existing:
+        return False
+    column = table.c[name]
+    logger.info(f"Adding column {name} to {table.name}")
+    conn.execute(text(
+        f"ALTER TABLE {table.name} ADD COLUMN {name} {column.type.compile(dialect=conn.dialect)}"
+    ))
+    return True
+
+
+@migration(1, 'Baseline schema')
+def baseline(conn):
+    # The tables of the original schema; later tables belong to their own
+    # migration. Existing tables are left untouched.
+    db.metadata.create_all(bind=conn, checkfirst=True, tables=[
+        User.__table__, ServiceProfessional.__table__, Service.__table__,
+        ServiceRequest.__table__, Review.__table__, Document.__table__,
+    ])
+
+
+@migration(2, 'Indexes for service request and review filters')
+def service_request_indexes(conn):
+    create_indexes(conn, ServiceRequest.__table__, {
+        'ix_service_requests_customer_status',
+        'ix_service_requests_pro_status',
+        'ix_service_requests_service_status_completion',
+    })
+    create_indexes(conn, Review.__table__, {'ix_reviews_request_id'})
+
+
+@migration(3, 'Daily activity rollup table')
+def daily_stats_table(conn):
+    DailyStat.__table__.create(bind=conn, checkfirst=True)
+
+
+@migration(4, 'Change stamp for users')
+def user_updated_at(conn):
+    users = User.__table__
+    add_column(conn, users, 'updated_at')
+    conn.execute(users.update().where(users.c.updated_at.is_(None)).values(
+        updated_at=users.c.created_at
+    ))
+
+
+@migration(5, 'Pin code service availability index')
+def service_availability_table(conn):
+    ServiceAvailability.__table__.create(bind=conn, checkfirst=True)
+    rebuild_availability(conn)
+
+
+@migration(6, 'Dirty days of the daily activity rollup')
+def daily_stats_dirty_days_table(conn):
+    DailyStatDirtyDay.__table__.create(bind=conn, checkfirst=True)
+    # Completions without a completion date or time were left out of the
+    # rollup until now; they are bucketed by request date from here on
+    requests = ServiceRequest.__table__
+    conn.execute(DailyStatDirtyDay.__table__.insert().from_select(
+        ['day'],
+        select(func.date(requests.c.request_date)).where(
+            requests.c.status == 'completed',
+            requests.c.completion_date.is_(None),
+            requests.c.completed_on.is_(None),
+            requests.c.request_date.isnot(None)
+        ).group_by(func.date(requests.c.request_date))
+    ))
+
+
+@migration(7, 'Per-service index of the daily activity rollup')
+def daily_stats_service_index(conn):
+    create_indexes(conn, DailyStat.__table__, {'ix_daily_stats_service_completed'})
+
+
+@migration(8, 'Indexes for the rollup day range and rating totals')
+def rollup_day_and_rating_indexes(conn):
+    create_indexes(conn, ServiceRequest.__table__, {'ix_service_requests_status_completed_day'})
+    create_indexes(conn, Review.__table__, {'ix_reviews_request_rating'})
+
+
+def current_version(conn):
+    """Return the highest applied schema version (0 for an unversioned database)."""
+    version_metadata.create_all(bind=conn, checkfirst=True)
+    applied = conn.execute(
+        schema_version.select().order_by(schema_version.c.version.desc()).limit(1)
+    ).first()
+    return applied.version if applied else 0
+
+
+@contextmanager
+def migration_lock(engine=None):
+    """Hold the database-wide lock serializing schema upgrades across processes."""
+    engine = engine or db.engine
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as conn:
+            conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': MIGRATION_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': MIGRATION_LOCK_KEY})
+        return
+
+    database = engine.url.database
+    if engine.dialect.name != 'sqlite' or fcntl is None or database in (None, '', ':memory:'):
+        yield
+        return
+    with open(f"{os.path.abspath(database)}.migrate-lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def upgrade_database(engine=None):
+    """
+    Apply all pending migrations and return the resulting schema version.
+    Call under ``migration_lock`` when other processes may upgrade at the same time.
+    """
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        version = current_version(conn)
+
+    for target, description, upgrade in MIGRATIONS:
+        if target <= version:
+            continue
+        logger.info(f"Applying migration {target}: {description}")
+        with engine.begin() as conn:
+            upgrade(conn)
+            conn.execute(schema_version.insert().values(
+                version=target,
+                description=description,
+                applied_at=datetime.utcnow()
+            ))
+        version = target
+
+    return version
@@ -1,8 +1,9 @@
-from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from sqlalchemy import event
+from .db_routing import RoutingSQLAlchemy
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -14,6 +15,7 @@ class User(db.Model):
     is_approved = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_type = db.Column(db.String(50))  # admin, professional, customer
     
     # Common fields for all user types
@@ -47,6 +49,12 @@ class User(db.Model):
         'polymorphic_identity': 'user'
     }
 
+@event.listens_for(User, 'before_update', propagate=True)
+def touch_user(mapper, connection, target):
+    # Changes to subclass columns only update the subclass table, where the
+    # users.updated_at onupdate default would not fire
+    target.updated_at = datetime.utcnow()
+
 # Subclass for Admin Users
 class Admin(User):
     __mapper_args__ = {'polymorphic_identity': 'admin'}
@@ -141,21 +149,73 @@ class ServiceRequest(db.Model):
     cancelled_by = db.Column(db.String(20), nullable=True)  # 'customer' or 'professional'
     notes = db.Column(db.Text, nullable=True)  # Customer notes for the request
     
-    service = db.relationship('Service', backref='requests')
-    customer = db.relationship('Customer', foreign_keys=[customer_id])
-    professional = db.relationship('ServiceProfessional', foreign_keys=[pro_id])
+    # Batch-loaded so iterating a list of requests never issues a query per row
+    service = db.relationship('Service', backref='requests', lazy='selectin')
+    customer = db.relationship('Customer', foreign_keys=[customer_id], lazy='selectin')
+    professional = db.relationship('ServiceProfessional', foreign_keys=[pro_id], lazy='selectin')
+
+    # Composite indexes backing the dashboard and analytics filters
+    __table_args__ = (
+        db.Index('ix_service_requests_customer_status', 'customer_id', 'status'),
+        db.Index('ix_service_requests_pro_status', 'pro_id', 'status'),
+        db.Index('ix_service_requests_service_status_completion', 'service_id', 'status', 'completion_date'),
+        # The day the rollup buckets a completion on (rollups.completed_day)
+        db.Index('ix_service_requests_status_completed_day', 'status',
+                 db.func.coalesce(completion_date, completed_on, request_date)),
+    )
 
 class Review(db.Model):
     __tablename__ = 'reviews'
     
     id = db.Column(db.Integer, primary_key=True)
-    request_id = db.Column(db.Integer, db.ForeignKey('service_requests.id'))
+    request_id = db.Column(db.Integer, db.ForeignKey('service_requests.id'), index=True)
     rating = db.Column(db.Integer, nullable=False)
     comment = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     request = db.relationship('ServiceRequest', backref='reviews')
 
+    __table_args__ = (
+        # Covers a professional's rating totals, which read no other column
+        db.Index('ix_reviews_request_rating', 'request_id', 'rating', 'id'),
+    )
+
+class DailyStat(db.Model):
+    """Per-day, per-service activity rollup maintained by a Celery beat job."""
+    __tablename__ = 'daily_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    # NULL for activity not tied to a service (new customers)
+    service_id = db.Column(db.Integer, nullable=True)
+    completed_count = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Float, default=0.0, nullable=False)
+    new_customers = db.Column(db.Integer, default=0, nullable=False)
+    new_professionals = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('day', 'service_id', name='uq_daily_stats_day_service'),
+        # Covers the per-service usage totals, which read no other column
+        db.Index('ix_daily_stats_service_completed', 'service_id', 'completed_count'),
+    )
+
+class DailyStatDirtyDay(db.Model):
+    """A day whose ``daily_stats`` rows must be recomputed on the next incremental run."""
+    __tablename__ = 'daily_stats_dirty_days'
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+
+class ServiceAvailability(db.Model):
+    """Approved, active professionals per (pin code, service), maintained by ``availability``."""
+    __tablename__ = 'service_availability'
+
+    pin_code = db.Column(db.String(20), primary_key=True)
+    service_type_id = db.Column(db.Integer, primary_key=True)
+    professional_count = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
 class Document(db.Model):
     __tablename__ = 'documents'
     
@@ -1,12 +1,69 @@
-from flask import Blueprint, jsonify, request
-from .models import db, Service, ServiceProfessional, ServiceRequest, Review
+from flask import Blueprint, g, jsonify, request
+from .models import db, Service, ServiceProfessional, ServiceRequest, Review, Customer
 import logging
-from .extensions import cache
+from sqlalchemy import func
+from .caching import cached_catalog, cached_value, single_flight
+from .availability import available_services
+from .conditional import conditional, make_etag
+from .fieldsets import InvalidFields, PROFESSIONAL_FIELDS
 
 logger = logging.getLogger(__name__)
 public_bp = Blueprint('public', __name__)
+
+# The stamps below count rows that can go away (a deleted service, a
+# professional leaving a service, a request no longer completed) without
+# any remaining updated_at moving, so they return no Last-Modified time:
+# an If-Modified-Since check would answer 304 for the shrunk representation.
+# Only the ETag, which includes the counts, validates them.
+
+def services_stamp():
+    """Change stamp of the service catalog, cached per catalog version"""
+    def load_stamp():
+        return tuple(db.session.query(func.count(Service.id), func.max(Service.updated_at)).one())
+    return cached_catalog('stamp', (), load_stamp), None
+
+def service_professionals_stamp(service_id):
+    """Change stamp of a service and the professionals offering it"""
+    stamp = db.session.query(
+        Service.updated_at,
+        func.count(ServiceProfessional.id),
+        func.max(ServiceProfessional.updated_at)
+    ).outerjoin(
+        ServiceProfessional, ServiceProfessional.service_type_id == Service.id
+    ).filter(Service.id == service_id).group_by(Service.id, Service.updated_at).first()
+    if stamp is None:
+        return None, None
+    return tuple(stamp), None
+
+def professional_profile_stamp(professional_id):
+    """Change stamp of a professional's public profile and reviews"""
+    profile = db.session.query(
+        ServiceProfessional.updated_at, Service.updated_at
+    ).outerjoin(
+        Service, Service.id == ServiceProfessional.service_type_id
+    ).filter(ServiceProfessional.id == professional_id).first()
+    if profile is None:
+        return None, None
+    reviews = db.session.query(
+        func.count(Review.id),
+        func.max(Review.created_at),
+        func.max(Customer.updated_at),
+        func.count(Service.id),
+        func.max(Service.updated_at)
+    ).select_from(ServiceRequest).join(
+        Review, Review.request_id == ServiceRequest.id
+    ).outerjoin(
+        Customer, Customer.id == ServiceRequest.customer_id
+    ).outerjoin(
+        Service, Service.id == ServiceRequest.service_id
+    ).filter(
+        ServiceRequest.pro_id == professional_id,
+        ServiceRequest.status == 'completed'
+    ).one()
+    return tuple(profile) + tuple(reviews), None
     
 @public_bp.route('/services', methods=['GET'])
+@conditional(services_stamp)
 def get_services():
     """Get all available services with optional filters"""
     # Get query parameters for search/filter
@@ -20,32 +77,37 @@ def get_services():
     # Admin users can override this with include_inactive parameter
     include_inactive = request.args.get('include_inactive', 'false').lower() == 'true'
     
-    # Start with base query for services
-    query = Service.query
-    
-    # Apply filters based on parameters
-    if name:
-        query = query.filter(Service.name.ilike(f'%{name}%'))
-    if min_price is not None:
-        query = query.filter(Service.base_price >= min_price)
-    if max_price is not None:
-        query = query.filter(Service.base_price <= max_price)
-    
-    # Filter inactive services unless explicitly requested
-    if not include_inactive:
-        query = query.filter(Service.status == 'active')
+    def load_services():
+        # Start with base query for services
+        query = Service.query
+        
+        # Apply filters based on parameters
+        if name:
+            query = query.filter(Service.name.ilike(f'%{name}%'))
+        if min_price is not None:
+            query = query.filter(Service.base_price >= min_price)
+        if max_price is not None:
+            query = query.filter(Service.base_price <= max_price)
+        
+        # Filter inactive services unless explicitly requested
+        if not include_inactive:
+            query = query.filter(Service.status == 'active')
+        
+        services = query.all()
+        logger.debug(f"Found {len(services)} services matching criteria")
+        return [{
+            'id': service.id,
+            'name': service.name,
+            'base_price': service.base_price,
+            'description': service.description,
+            'avg_duration': service.avg_duration,
+            'status': service.status,
+            'image_path': service.image_path
+        } for service in services]
     
-    services = query.all()
-    logger.debug(f"Found {len(services)} services matching criteria")
-    return jsonify([{
-        'id': service.id,
-        'name': service.name,
-        'base_price': service.base_price,
-        'description': service.description,
-        'avg_duration': service.avg_duration,
-        'status': service.status,
-        'image_path': service.image_path
-    } for service in services]), 200
+    # Each filter combination is cached separately for the current catalog version
+    services = cached_catalog('services', (name, min_price, max_price, include_inactive), load_services)
+    return jsonify(services), 200
 
 @public_bp.route('/services/search', methods=['GET'])
 def search_services():
@@ -56,38 +118,35 @@ def search_services():
     
     logger.debug(f"Public service search: name={name}, pin_code={pin_code}")
     
-    # Start with base query for services
-    query = Service.query.filter_by(status='active')
-    
-    # Apply filters based on parameters
-    if name:
-        query = query.filter(Service.name.ilike(f'%{name}%'))
+    def load_active_services():
+        # Start with base query for services
+        query = Service.query.filter_by(status='active')
+        
+        # Apply filters based on parameters
+        if name:
+            query = query.filter(Service.name.ilike(f'%{name}%'))
+        
+        return [{
+            'id': service.id,
+            'name': service.name,
+            'base_price': service.base_price,
+            'description': service.description,
+            'avg_duration': service.avg_duration,
+            'image_path': service.image_path
+        } for service in query.all()]
     
-    services = query.all()
+    services = cached_catalog('active_services', (name,), load_active_services)
     logger.debug(f"Found {len(services)} active services")
     
-    # If pin code is provided, find professionals in that area
+    # If pin code is provided, keep the services with professionals in that area
     if pin_code:
+        # One lookup in the precomputed (pin code, service) index
+        available = available_services(pin_code)
         result = []
         for service in services:
-            # Find professionals for this service type in the area
-            professionals = ServiceProfessional.query.filter(
-                ServiceProfessional.service_type_id == service.id,
-                ServiceProfessional.is_approved == True,
-                ServiceProfessional.is_active == True,
-                ServiceProfessional.pin_code == pin_code
-                ).all()
-            
-            if professionals:
-                service_data = {
-                    'id': service.id,
-                    'name': service.name,
-                    'base_price': service.base_price,
-                    'description': service.description,
-                    'avg_duration': service.avg_duration,
-                    'image_path': service.image_path,
-                    'available_professionals': len(professionals)
-                }
+            if available.get(service['id']):
+                service_data = dict(service)
+                service_data['available_professionals'] = available[service['id']]
                 result.append(service_data)
         logger.debug(f"Found {len(result)} services with professionals in pin code {pin_code}")
         return jsonify(result), 200
@@ -95,14 +154,15 @@ def search_services():
     # If no pin code, return all active services
     logger.debug("Returning all active services")
     return jsonify([{
-        'id': service.id,
-        'name': service.name,
-        'base_price': service.base_price,
-        'description': service.description,
-        'avg_duration': service.avg_duration
+        'id': service['id'],
+        'name': service['name'],
+        'base_price': service['base_price'],
+        'description': service['description'],
+        'avg_duration': service['avg_duration']
     } for service in services]), 200
 
 @public_bp.route('/professionals/<int:professional_id>', methods=['GET'])
+@conditional(professional_profile_stamp)
 def get_professional_profile(professional_id):
     """Get a professional's public profile with reviews"""
     logger.debug(f"Getting public profile for professional {professional_id}")
@@ -142,40 +202,61 @@ def get_professional_profile(professional_id):
     return jsonify(result), 200
 
 @public_bp.route('/services/<int:service_id>/professionals', methods=['GET'])
+@conditional(service_professionals_stamp)
 def get_service_professionals(service_id):
     """Get professionals available for a specific service"""
     try:
         logger.debug(f"Getting professionals for service ID: {service_id}")
-        service = Service.query.get(service_id)
+        try:
+            fields = PROFESSIONAL_FIELDS.requested()
+        except InvalidFields as e:
+            return jsonify({'error': str(e)}), 400
+        
+        def load_professionals():
+            # Get all active, approved professionals for this service
+            query = ServiceProfessional.query.filter_by(
+                service_type_id=service_id,
+                is_approved=True,
+                is_active=True
+            )
+            if fields:
+                query = PROFESSIONAL_FIELDS.narrow(query, fields)
+            professionals = query.all()
+            
+            logger.debug(f"Found {len(professionals)} professionals for service {service_id}")
+            
+            if fields:
+                return [PROFESSIONAL_FIELDS.serialize(pro, fields) for pro in professionals]
+            result = []
+            for pro in professionals:
+                pro_data = pro.to_dict()
+                # Include additional info about the professional's experience
+                pro_data['experience'] = f"{pro.experience_years} years experience" if pro.experience_years else "New Professional"
+                result.append(pro_data)
+            return result
+        
+        # The change stamp only exists for an existing service and moves with
+        # the service and its professionals, so it keys the cached list
+        stamp = g.get('change_stamp')
+        if stamp is not None:
+            key = f"service_professionals:{service_id}:{make_etag(stamp)}"
+            if fields:
+                key += f":{','.join(fields)}"
+            return jsonify(cached_value(lambda: key, load_professionals)), 200
         
+        service = Service.query.get(service_id)
         if not service:
             logger.warning(f"Service {service_id} not found")
             return jsonify({'error': 'Service not found'}), 404
-            
-        # Get all active, approved professionals for this service
-        professionals = ServiceProfessional.query.filter_by(
-            service_type_id=service_id,
-            is_approved=True,
-            is_active=True
-        ).all()
-        
-        logger.debug(f"Found {len(professionals)} professionals for service {service_id}")
         
-        result = []
-        for pro in professionals:
-            pro_data = pro.to_dict()
-            # Include additional info about the professional's experience
-            pro_data['experience'] = f"{pro.experience_years} years experience" if pro.experience_years else "New Professional"
-            result.append(pro_data)
-            
-        return jsonify(result), 200
+        return jsonify(load_professionals()), 200
         
     except Exception as e:
         logger.error(f"Error getting professionals for service {service_id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @public_bp.route('/services/popular', methods=['GET'])
-@cache.cached(timeout=300)
+@single_flight(timeout=300)
 def get_popular_services():
     """Get popular services based on highly-rated reviews"""
     try:
@@ -0,0 +1,225 @@
+"""
+Daily activity rollup.
+
+``daily_stats`` holds one row per (day, service) with the number of completed
+requests and their revenue, plus the professionals who signed up for that
+service. Customer signups are not tied to a service and live in the
+(day, NULL) row. Admin analytics sum these rows instead of scanning the full
+service request history.
+
+Completed requests are bucketed by their ``completion_date``, falling back to
+``completed_on`` when no date was requested and to ``request_date`` when
+neither is set, so every completion counts towards the total revenue.
+
+Changes that move a request into, out of or between days (completing,
+un-completing or cancelling it, editing its dates) record the affected days
+in ``daily_stats_dirty_days``; the next incremental run recomputes them even
+when they are far outside the trailing window.
+"""
+from datetime import date, datetime, timedelta
+import logging
+
+from flask import current_app
+from sqlalchemy import event, func, inspect, select
+
+from .models import db, DailyStat, DailyStatDirtyDay, Service, ServiceProfessional, ServiceRequest, User
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK_DAYS = 31
+
+
+# Columns deciding whether and on which day a request counts as completed
+DAY_COLUMNS = ('status', 'completion_date', 'completed_on', 'request_date')
+
+
+def completed_day():
+    return func.coalesce(ServiceRequest.completion_date, ServiceRequest.completed_on,
+                         ServiceRequest.request_date)
+
+
+def rollup_day(values):
+    """The day a request with the given DAY_COLUMNS values is counted on, or None."""
+    if values['status'] != 'completed':
+        return None
+    moment = values['completion_date'] or values['completed_on'] or values['request_date']
+    return moment.date() if moment else None
+
+
+def stored_day(connection, request_id):
+    """The day a request is counted on according to its stored row."""
+    requests = ServiceRequest.__table__
+    values = connection.execute(
+        select(*[requests.c[name] for name in DAY_COLUMNS]).where(requests.c.id == request_id)
+    ).mappings().first()
+    return rollup_day(values) if values is not None else None
+
+
+def mark_dirty(connection, days):
+    days = {day for day in days if day is not None}
+    if days:
+        connection.execute(DailyStatDirtyDay.__table__.insert(), [{'day': day} for day in days])
+
+
+@event.listens_for(ServiceRequest, 'before_update')
+def request_updating(mapper, connection, target):
+    # Read the stored values: the previous ones are usually not in the
+    # attribute history because committed objects are expired
+    attrs = inspect(target).attrs
+    if not any(attrs[name].history.has_changes() for name in DAY_COLUMNS):
+        return
+    old_day = stored_day(connection, target.id)
+    new_day = rollup_day({name: getattr(target, name) for name in DAY_COLUMNS})
+    if old_day != new_day:
+        mark_dirty(connection, [old_day, new_day])
+
+
+@event.listens_for(ServiceRequest, 'before_delete')
+def request_deleting(mapper, connection, target):
+    mark_dirty(connection, [stored_day(connection, target.id)])
+
+
+def as_date(value):
+    # SQLite returns DATE() results as ISO strings
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def day_bounds(start_day, end_day):
+    """Datetime bounds [start, end) covering the inclusive day range."""
+    return datetime.combine(start_day, datetime.min.time()), \
+        datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+
+
+def refresh_range(start_day, end_day):
+    """Recompute the rollup rows for every day in [start_day, end_day]."""
+    start, end = day_bounds(start_day, end_day)
+    rows = {}
+
+    def row(day, service_id):
+        key = (as_date(day), service_id)
+        if key not in rows:
+            rows[key] = DailyStat(day=key[0], service_id=service_id, completed_count=0,
+                                  revenue=0.0, new_customers=0, new_professionals=0)
+        return rows[key]
+
+    day = completed_day()
+    completed = db.session.query(
+        func.date(day), ServiceRequest.service_id,
+        func.count(ServiceRequest.id), func.sum(Service.base_price)
+    ).join(Service, Service.id == ServiceRequest.service_id).filter(
+        ServiceRequest.status == 'completed',
+        day >= start,
+        day < end
+    ).group_by(func.date(day), ServiceRequest.service_id).all()
+    for day_value, service_id, count, revenue in completed:
+        stat = row(day_value, service_id)
+        stat.completed_count = count
+        stat.revenue = revenue or 0.0
+
+    customers = db.session.query(
+        func.date(User.created_at), func.count(User.id)
+    ).filter(
+        User.user_type == 'customer',
+        User.created_at >= start,
+        User.created_at < end
+    ).group_by(func.date(User.created_at)).all()
+    for day_value, count in customers:
+        row(day_value, None).new_customers = count
+
+    professionals = db.session.query(
+        func.date(ServiceProfessional.created_at), ServiceProfessional.service_type_id,
+        func.count(ServiceProfessional.id)
+    ).filter(
+        ServiceProfessional.created_at >= start,
+        ServiceProfessional.created_at < end
+    ).group_by(func.date(ServiceProfessional.created_at), ServiceProfessional.service_type_id).all()
+    for day_value, service_id, count in professionals:
+        row(day_value, service_id).new_professionals = count
+
+    # Replace the range atomically so readers never see a half-built day
+    DailyStat.query.filter(
+        DailyStat.day >= start_day,
+        DailyStat.day <= end_day
+    ).delete(synchronize_session=False)
+    now = datetime.utcnow()
+    for stat in rows.values():
+        stat.updated_at = now
+    db.session.add_all(rows.values())
+    db.session.commit()
+    return len(rows)
+
+
+def contiguous_ranges(days):
+    """Group a set of days into inclusive (start, end) runs."""
+    ranges = []
+    for day in sorted(days):
+        if ranges and day == ranges[-1][1] + timedelta(days=1):
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [tuple(r) for r in ranges]
+
+
+def update_daily_stats():
+    """
+    Incrementally bring the rollup up to date.
+
+    Recomputes the trailing ``DAILY_STATS_WINDOW_DAYS`` days, every day
+    holding a request completed since the previous run and every day marked
+    dirty. Without any rollup rows yet, falls back to a full backfill.
+    """
+    last_run = db.session.query(func.max(DailyStat.updated_at)).scalar()
+    if last_run is None:
+        return backfill_daily_stats()
+
+    today = datetime.utcnow().date()
+    window = current_app.config.get('DAILY_STATS_WINDOW_DAYS', 2)
+    days = {today - timedelta(days=offset) for offset in range(window)}
+
+    # Requests completed since the last run may belong to any older day
+    touched = db.session.query(func.date(completed_day())).filter(
+        ServiceRequest.status == 'completed',
+        ServiceRequest.completed_on >= last_run
+    ).distinct().all()
+    days.update(as_date(day) for day, in touched if day is not None)
+
+    # Days a request moved out of (or into) by any other change
+    dirty = db.session.query(DailyStatDirtyDay.id, DailyStatDirtyDay.day).all()
+    days.update(as_date(day) for _, day in dirty)
+
+    refreshed = 0
+    for start_day, end_day in contiguous_ranges(days):
+        refreshed += refresh_range(start_day, end_day)
+    if dirty:
+        # Only the markers read above; days marked meanwhile wait for the next run
+        DailyStatDirtyDay.query.filter(
+            DailyStatDirtyDay.id.in_([marker_id for marker_id, _ in dirty])
+        ).delete(synchronize_session=False)
+        db.session.commit()
+    logger.info(f"Daily stats updated for {len(days)} days ({refreshed} rows)")
+    return refreshed
+
+
+def backfill_daily_stats(start_day=None, end_day=None):
+    """Rebuild the rollup for a day range, defaulting to the full history."""
+    if start_day is None:
+        firsts = [
+            db.session.query(func.min(completed_day())).filter(ServiceRequest.status == 'completed').scalar(),
+            db.session.query(func.min(User.created_at)).scalar()
+        ]
+        firsts = [value for value in firsts if value is not None]
+        if not firsts:
+            return 0
+        start_day = min(firsts).date()
+    if end_day is None:
+        latest = db.session.query(func.max(completed_day())).filter(ServiceRequest.status == 'completed').scalar()
+        end_day = max(datetime.utcnow().date(), latest.date() if latest else start_day)
+
+    refreshed = 0
+    chunk_start = start_day
+    while chunk_start <= end_day:
+        chunk_end = min(chunk_start + timedelta(days=BACKFILL_CHUNK_DAYS - 1), end_day)
+        refreshed += refresh_range(chunk_start, chunk_end)
+        chunk_start = chunk_end + timedelta(days=1)
+    logger.info(f"Daily stats backfilled from {start_day} to {end_day} ({refreshed} rows)")
+    return refreshed
@@ -0,0 +1,177 @@
+"""
+Column projections for service request representations.
+
+Listings and detail views of service requests only need about ten columns
+of ``service_requests`` plus a name or two from the service, customer and
+professional rows. Instead of loading full ``ServiceRequest`` objects and
+their relationships, a ``Projection`` selects exactly those columns in one
+statement, outer-joining only the tables its fields read, and builds the
+response dicts from the plain result rows: nothing goes through the
+session's identity map.
+
+The query is a column-only ORM query, so keyset pagination and streaming
+apply to it as to any other query.
+"""
+from sqlalchemy import case
+
+from .fieldsets import requested_fields
+from .models import db, Service, ServiceProfessional, ServiceRequest, User
+
+services = Service.__table__
+customers = User.__table__.alias('customer')
+professionals = User.__table__.alias('professional')
+professional_profiles = ServiceProfessional.__table__.alias('professional_profile')
+
+# Outer joins a field may need, in the order they are applied
+JOINS = {
+    'service': (services, ServiceRequest.service_id == services.c.id),
+    'customer': (customers, ServiceRequest.customer_id == customers.c.id),
+    'professional': (professionals, ServiceRequest.pro_id == professionals.c.id),
+    'professional_profile': (professional_profiles, ServiceRequest.pro_id == professional_profiles.c.id),
+}
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+def day(value):
+    return value.strftime("%Y-%m-%d") if value else "N/A"
+
+
+def or_none(value):
+    return value if value else None
+
+
+def or_unknown(value):
+    return 'Unknown' if value is None else value
+
+
+class Projected:
+    """One output field: the column it is read from, the join it needs and how it is rendered."""
+
+    def __init__(self, column, join=None, render=None):
+        self.column = column
+        self.join = join
+        self.render = render
+
+
+class Projection:
+    """The fields of one service request representation, in their default order."""
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def requested(self):
+        """Field names of the request's ``fields`` argument, or None for all fields."""
+        return requested_fields(self.fields)
+
+    def query(self, names=None):
+        """
+        Column-only query selecting ``names`` (all fields by default), with
+        the request id last so keyset pagination can read it from any row.
+        """
+        names = names or list(self.fields)
+        columns = [self.fields[name].column.label(name) for name in names]
+        if 'id' not in names:
+            columns.append(ServiceRequest.id.label('id'))
+        query = db.session.query(*columns).select_from(ServiceRequest)
+        needed = {self.fields[name].join for name in names}
+        for join, (table, onclause) in JOINS.items():
+            if join in needed:
+                query = query.outerjoin(table, onclause)
+        return query
+
+    def serialize(self, row, names=None):
+        names = names or list(self.fields)
+        data = {}
+        for name, value in zip(names, row):
+            render = self.fields[name].render
+            data[name] = value if render is None else render(value)
+        return data
+
+
+def request_fields(*names, **overrides):
+    """The named fields of ``REQUEST_FIELDS``, with some replaced."""
+    return {name: overrides.get(name, REQUEST_FIELDS[name]) for name in names}
+
+
+# Every field the representations below are built from
+REQUEST_FIELDS = {
+    'id': Projected(ServiceRequest.id),
+    'service_id': Projected(ServiceRequest.service_id),
+    'service_name': Projected(services.c.name, 'service', or_unknown),
+    'service_price': Projected(services.c.base_price, 'service'),
+    'service_duration': Projected(services.c.avg_duration, 'service'),
+    'customer_id': Projected(ServiceRequest.customer_id),
+    'customer_name': Projected(customers.c.username, 'customer', or_unknown),
+    'customer_address': Projected(customers.c.address, 'customer', or_none),
+    'customer_email': Projected(customers.c.email, 'customer', or_none),
+    'customer_phone_number': Projected(customers.c.phone_number, 'customer', or_none),
+    'pro_id': Projected(ServiceRequest.pro_id),
+    'professional_name': Projected(professionals.c.username, 'professional'),
+    'professional_email': Projected(professionals.c.email, 'professional'),
+    'professional_phone': Projected(professional_profiles.c.phone_number, 'professional_profile'),
+    'status': Projected(ServiceRequest.status),
+    'notes': Projected(ServiceRequest.notes, render=or_none),
+    'request_date': Projected(ServiceRequest.request_date, render=isoformat),
+    'assigned_date': Projected(ServiceRequest.assigned_date, render=isoformat),
+    'completed_on': Projected(ServiceRequest.completed_on, render=isoformat),
+    'cancelled_on': Projected(ServiceRequest.cancelled_on, render=isoformat),
+    'cancelled_by': Projected(ServiceRequest.cancelled_by, render=or_none),
+    'completion_date': Projected(ServiceRequest.completion_date, render=isoformat),
+}
+
+CUSTOMER_REQUEST = Projection(request_fields(
+    'id', 'service_id', 'service_name', 'pro_id', 'professional_name', 'status', 'notes',
+    'service_price', 'service_duration', 'request_date', 'assigned_date', 'completed_on',
+    'cancelled_on', 'cancelled_by', 'completion_date'
+))
+
+CUSTOMER_REQUEST_DETAIL = Projection(request_fields(
+    'id', 'service_id', 'service_name', 'pro_id', 'professional_name', 'professional_phone',
+    'professional_email', 'status', 'service_price', 'service_duration', 'request_date',
+    'assigned_date', 'completed_on', 'cancelled_on', 'cancelled_by', 'completion_date', 'notes',
+    notes=Projected(ServiceRequest.notes)
+))
+
+PROFESSIONAL_REQUEST = Projection(request_fields(
+    'id', 'service_id', 'service_name', 'customer_id', 'customer_name', 'status', 'notes',
+    'request_date', 'completion_date', 'completed_on', 'assigned_date', 'cancelled_on',
+    'cancelled_by'
+))
+
+PROFESSIONAL_REQUEST_DETAIL = Projection(request_fields(
+    'id', 'service_id', 'service_name', 'customer_id', 'customer_name', 'status',
+    'customer_address', 'customer_email', 'customer_phone_number', 'request_date',
+    'completion_date', 'assigned_date', 'completed_on', 'notes', 'cancelled_on', 'cancelled_by',
+    notes=Projected(ServiceRequest.notes)
+))
+
+# Rows of the monthly activity report e-mail
+MONTHLY_REPORT_REQUEST = Projection({
+    'service_name': Projected(services.c.name, 'service', or_unknown),
+    'request_date': Projected(ServiceRequest.request_date, render=day),
+    'completion_date': Projected(ServiceRequest.completion_date, render=day),
+    'assigned_date': Projected(ServiceRequest.assigned_date, render=day),
+    'completed_on': Projected(ServiceRequest.completed_on, render=day),
+    'cancelled_on': Projected(ServiceRequest.cancelled_on, render=day),
+    'cancelled_by': Projected(ServiceRequest.cancelled_by, render=lambda value: value or "N/A"),
+    'status': Projected(ServiceRequest.status),
+    'professional_name': Projected(
+        case((professionals.c.id.is_(None), "Not Assigned"), else_=professionals.c.full_name),
+        'professional'
+    ),
+    'customer_id': Projected(ServiceRequest.customer_id),
+})
+
+# Admin export rows, with missing values left empty rather than filled in
+EXPORT_REQUEST = Projection(request_fields(
+    'id', 'service_id', 'service_name', 'customer_id', 'customer_name', 'pro_id',
+    'professional_name', 'status', 'request_date', 'completion_date', 'assigned_date',
+    'completed_on', 'cancelled_on', 'cancelled_by', 'notes',
+    service_name=Projected(services.c.name, 'service'),
+    customer_name=Projected(customers.c.username, 'customer'),
+    cancelled_by=Projected(ServiceRequest.cancelled_by),
+    notes=Projected(ServiceRequest.notes)
+))
@@ -1,7 +1,12 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from .decorators import professional_required
-from .models import db, User, ServiceProfessional, ServiceRequest, Review
+from .models import db, User, ServiceProfessional, ServiceRequest, Service, Review
+from .pagination import InvalidCursor, keyset_page
+from .serializers import PROFESSIONAL_REQUEST, PROFESSIONAL_REQUEST_DETAIL
+from .caching import cached_user_stats, invalidate_request_stats
+from .identity_cache import invalidate_identity
+from sqlalchemy import func, case
 import logging
 from datetime import datetime
 
@@ -33,6 +38,7 @@ def professional_profile():
                 professional.description = data['description']
         
         db.session.commit()
+        invalidate_identity(current_user_id)
         logger.info(f"Professional {current_user_id} profile updated")
         return jsonify({'message': 'Profile updated', 'user': user.to_dict()}), 200
 
@@ -47,34 +53,20 @@ def professional_service_requests():
     professional = ServiceProfessional.query.get(current_user_id)
     # Get open requests that match the professional's service type
     # AND are specifically assigned to this professional
-    available_requests = ServiceRequest.query.filter(
+    query = PROFESSIONAL_REQUEST.query().filter(
         ServiceRequest.service_id == professional.service_type_id,
         (ServiceRequest.pro_id == current_user_id)
-    ).all()
+    )
+    try:
+        page = keyset_page(query, ServiceRequest.id)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    available_requests = page.rows if page else query.all()
     
     logger.debug(f"Found {len(available_requests)} available requests.")
     
-    # Combine and deduplicate
-    all_requests = {}
-    for req in available_requests:
-        if (req.id not in all_requests):
-            all_requests[req.id] = {
-                'id': req.id,
-                'service_id': req.service_id,
-                'service_name': req.service.name if req.service else 'Unknown',
-                'customer_id': req.customer_id,
-                'customer_name': req.customer.username if req.customer else 'Unknown',
-                'status': req.status,
-                'notes': req.notes if req.notes else None,
-                'request_date': req.request_date.isoformat(),
-                'completion_date': req.completion_date.isoformat() if req.completion_date else None,
-                'completed_on': req.completed_on.isoformat() if req.completed_on else None,
-                'assigned_date': req.assigned_date.isoformat() if req.assigned_date else None,
-                'cancelled_on': req.cancelled_on.isoformat() if req.cancelled_on else None,
-                'cancelled_by': req.cancelled_by if req.cancelled_by else None
-            }
-    
-    return jsonify(list(all_requests.values())), 200
+    result = [PROFESSIONAL_REQUEST.serialize(row) for row in available_requests]
+    return jsonify(page.wrap(result) if page else result), 200
 
 @professional_bp.route('/professional/service-requests/<int:request_id>', methods=['GET', 'PUT'])
 @professional_required
@@ -83,6 +75,18 @@ def professional_service_request_detail(request_id):
     current_user_id = get_jwt_identity()
     logger.debug(f"Professional {current_user_id} accessing request {request_id}")
     
+    # GET - Get service request details
+    if request.method == 'GET':
+        logger.debug(f"Professional {current_user_id} getting details for request {request_id}")
+        row = PROFESSIONAL_REQUEST_DETAIL.query().filter(
+            ServiceRequest.id == request_id,
+            ServiceRequest.pro_id == current_user_id
+        ).first()
+        if row is None:
+            logger.warning(f"Service request {request_id} not found")
+            return jsonify({'error': 'Service request not found'}), 404
+        return jsonify(PROFESSIONAL_REQUEST_DETAIL.serialize(row)), 200
+    
     # Find the service request
     service_request = ServiceRequest.query.filter_by(
         id=request_id, pro_id=current_user_id).first()
@@ -90,28 +94,6 @@ def professional_service_request_detail(request_id):
         logger.warning(f"Service request {request_id} not found")
         return jsonify({'error': 'Service request not found'}), 404
     
-    # GET - Get service request details
-    if request.method == 'GET':
-        logger.debug(f"Professional {current_user_id} getting details for request {request_id}")
-        return jsonify({
-            'id': service_request.id,
-            'service_id': service_request.service_id,
-            'service_name': service_request.service.name if service_request.service else 'Unknown',
-            'customer_id': service_request.customer_id,
-            'customer_name': service_request.customer.username if service_request.customer else 'Unknown',
-            'status': service_request.status,
-            'customer_address': service_request.customer.address if service_request.customer.address else None,
-            'customer_email': service_request.customer.email if service_request.customer.email else None,
-            'customer_phone_number': service_request.customer.phone_number if service_request.customer.phone_number else None,
-            'request_date': service_request.request_date.isoformat(),
-            'completion_date': service_request.completion_date.isoformat() if service_request.completion_date else None,
-            'assigned_date': service_request.assigned_date.isoformat() if service_request.assigned_date else None,
-            'completed_on': service_request.completed_on.isoformat() if service_request.completed_on else None,
-            'notes': service_request.notes,
-            'cancelled_on': service_request.cancelled_on.isoformat() if service_request.cancelled_on else None,
-            'cancelled_by': service_request.cancelled_by if service_request.cancelled_by else None
-        }), 200
-    
     # PUT - Update status (accept, reject, complete)
     if request.method == 'PUT':
         data = request.get_json()
@@ -140,6 +122,7 @@ def professional_service_request_detail(request_id):
             return jsonify({'error': 'Invalid action for the current status'}), 400
         
         db.session.commit()
+        invalidate_request_stats(service_request)
         return jsonify({'message': f'Service request {action}ed successfully'}), 200
 
 @professional_bp.route('/professional/stats', methods=['GET'])
@@ -149,42 +132,36 @@ def professional_stats():
     current_user_id = get_jwt_identity()
     logger.debug(f"Professional {current_user_id} requesting statistics")
     
-    # Count completed requests
-    completed_count = ServiceRequest.query.filter_by(
-        pro_id=current_user_id, 
-        status='completed'
-    ).count()
-    
-    # Count active requests
-    active_count = ServiceRequest.query.filter_by(
-        pro_id=current_user_id, 
-        status='assigned'
-    ).count()
-    
-    # Calculate average rating
-    reviews = db.session.query(Review).join(ServiceRequest, ServiceRequest.id == Review.request_id).filter(
-        ServiceRequest.pro_id == current_user_id
-    ).all()
-    total_ratings = sum(review.rating for review in reviews) if reviews else 0
-    avg_rating = round(total_ratings / len(reviews), 1) if reviews else 0
-    
-    # Calculate total earnings (placeholder - would need actual payment data in real system)
-    total_earnings = 0
-    completed_requests = ServiceRequest.query.filter_by(
-        pro_id=current_user_id, 
-        status='completed'
-    ).all()
-    for req in completed_requests:
-        if req.service:
-            total_earnings += req.service.base_price
+    def load_stats():
+        # Completed and active counts plus earnings in one aggregate query
+        # (earnings are a placeholder - would need actual payment data in real system)
+        completed = ServiceRequest.status == 'completed'
+        completed_count, active_count, total_earnings = db.session.query(
+            func.count(case((completed, ServiceRequest.id))),
+            func.count(case((ServiceRequest.status == 'assigned', ServiceRequest.id))),
+            func.sum(case((completed, Service.base_price)))
+        ).outerjoin(Service, Service.id == ServiceRequest.service_id).filter(
+            ServiceRequest.pro_id == current_user_id
+        ).one()
+        total_earnings = total_earnings or 0
+        
+        # Calculate average rating
+        review_count, total_ratings = db.session.query(
+            func.count(Review.id), func.sum(Review.rating)
+        ).join(ServiceRequest, ServiceRequest.id == Review.request_id).filter(
+            ServiceRequest.pro_id == current_user_id
+        ).one()
+        avg_rating = round(total_ratings / review_count, 1) if review_count else 0
+        
+        logger.debug(f"Professional {current_user_id} stats: completed={completed_count}, active={active_count}, rating={avg_rating}, earnings=${total_earnings:.2f}")
+        return {
+            'completed': completed_count,
+            'active': active_count,
+            'rating': avg_rating,
+            'totalEarnings': f'${total_earnings:.2f}'
+        }
     
-    logger.debug(f"Professional {current_user_id} stats: completed={completed_count}, active={active_count}, rating={avg_rating}, earnings=${total_earnings:.2f}")
-    return jsonify({
-        'completed': completed_count,
-        'active': active_count,
-        'rating': avg_rating,
-        'totalEarnings': f'${total_earnings:.2f}'
-    }), 200
+    return jsonify(cached_user_stats('professional', current_user_id, load_stats)), 200
 
 @professional_bp.route('/professional/status/<int:user_id>', methods=['GET'])
 def check_professional_status(user_id):
@@ -0,0 +1,73 @@
+"""
+Streaming JSON arrays for large list endpoints.
+
+With ``stream=true`` a list endpoint returns the same JSON array it always
+returns, but writes it while the rows are read: the query is fetched in
+batches of ``STREAM_BATCH_SIZE`` rows with ``yield_per`` (a server-side
+cursor on PostgreSQL) and each batch is serialized and sent before the next
+one is fetched. Memory stays bounded by one batch whatever the row count.
+
+Rows are streamed in primary key order and streaming cannot be combined
+with pagination. Once the first bytes are sent the status can no longer
+change, so an error while streaming is logged and re-raised: the server
+aborts the response without terminating the chunked body, and the client
+sees a failed transfer instead of a shorter array that still parses.
+"""
+import logging
+
+from flask import current_app, request, stream_with_context
+
+from .pagination import cursor_requested
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidStream(ValueError):
+    """Raised when streaming is requested together with pagination."""
+
+
+def stream_requested():
+    """Whether the current request asked for a streamed response."""
+    if request.args.get('stream', 'false').lower() != 'true':
+        return False
+    if cursor_requested():
+        raise InvalidStream('stream cannot be combined with cursor or limit')
+    return True
+
+
+def row_batches(query, batch_size):
+    """Yield ``query``'s rows in lists of ``batch_size``, fetched with ``yield_per``."""
+    batch = []
+    for row in query.yield_per(batch_size):
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def json_array_chunks(query, serialize, batch_size):
+    """Yield ``query``'s rows as the chunks of one JSON array, a batch at a time."""
+    # Compact separators, as jsonify uses outside debug mode
+    def dumps(item):
+        return current_app.json.dumps(item, separators=(',', ':'))
+
+    yield '['
+    separator = ''
+    try:
+        for batch in row_batches(query, batch_size):
+            yield separator + ','.join(dumps(serialize(row)) for row in batch)
+            separator = ','
+    except Exception as e:
+        logger.error(f"Error streaming {request.path}: {str(e)}")
+        raise
+    # jsonify ends its body with a newline too
+    yield ']\n'
+
+
+def stream_json_array(query, key_column, serialize):
+    """Stream ``query``'s rows, serialized one by one, as a JSON array response."""
+    batch_size = current_app.config['STREAM_BATCH_SIZE']
+    chunks = json_array_chunks(query.order_by(key_column), serialize, batch_size)
+    return current_app.response_class(stream_with_context(chunks), mimetype='application/json')
@@ -0,0 +1,87 @@
+"""
+Cache warming for the public catalog endpoints.
+
+After a deploy, a cache flush or an admin catalog change, the first visitors
+of ``/api/services``, ``/api/services/popular`` and
+``/api/services/<id>/professionals`` would otherwise pay for the cold path.
+``warm_public_caches`` requests those endpoints inside the application, so
+their cache entries are built under exactly the keys real requests use. It
+runs from the ``warm-public-caches`` Celery task: on a beat schedule, when a
+worker starts, and for the affected services after admin service changes
+(``schedule_rewarm``).
+
+Warming runs right after a catalog write, so its reads go to the primary:
+a lagging replica would otherwise get its outdated catalog cached under the
+new catalog version. The views are dispatched without the first-request
+hooks, which would run migrations and create the admin user in the worker.
+"""
+import logging
+import threading
+
+from flask import current_app, url_for
+
+from .db_routing import use_primary
+from .models import Service
+
+logger = logging.getLogger(__name__)
+
+
+def warm_paths(service_ids=None):
+    """Paths to warm: the catalog, popular services and each active service's professionals."""
+    query = Service.query.with_entities(Service.id).filter(Service.status == 'active')
+    if service_ids is not None:
+        query = query.filter(Service.id.in_(service_ids))
+    with current_app.test_request_context():
+        paths = [url_for('public.get_services')]
+        if service_ids is None:
+            paths.append(url_for('public.get_popular_services'))
+        paths.extend(url_for('public.get_service_professionals', service_id=service_id)
+                     for service_id, in query.order_by(Service.id).all())
+    return paths
+
+
+def warm_path(path):
+    """Run the GET view of ``path`` inside the app and return its response."""
+    app = current_app._get_current_object()
+    with app.test_request_context(path, method='GET'):
+        use_primary()
+        # full_dispatch_request without the before_first_request functions
+        rv = app.preprocess_request()
+        if rv is None:
+            rv = app.dispatch_request()
+        return app.finalize_request(rv)
+
+
+def warm_public_caches(service_ids=None):
+    """
+    Build the cache entries of the public catalog endpoints, or only of the
+    catalog and the given services' professionals. Returns the number of
+    paths warmed successfully.
+    """
+    warmed = 0
+    for path in warm_paths(service_ids):
+        try:
+            response = warm_path(path)
+            if response.status_code == 200:
+                warmed += 1
+            else:
+                logger.warning(f"Warming {path} returned {response.status_code}")
+        except Exception as e:
+            logger.error(f"Could not warm {path}: {str(e)}")
+    logger.info(f"Warmed {warmed} public cache entries")
+    return warmed
+
+
+def schedule_rewarm(*service_ids):
+    """Queue a re-warm of the catalog and the given services. Call after invalidating them."""
+    from .celery.tasks import warm_public_caches as warm_task
+
+    def send():
+        try:
+            warm_task.apply_async(args=[list(service_ids)], retry=False)
+        except Exception as e:
+            logger.warning(f"Could not schedule cache warming: {str(e)}")
+
+    # Publishing retries its broker connection for seconds when the broker
+    # is down; never hold up the admin request on it
+    threading.Thread(target=send, name='cache-rewarm', daemon=True).start()
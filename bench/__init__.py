@@ -0,0 +1,11 @@
+"""
+Benchmarks for the performance work in ``backend``.
+
+Run each one from the repository root, e.g. ``python -m bench.json_provider``.
+Unless ``DATABASE_URL`` is set they run against a fresh SQLite database in a
+temporary directory, never against ``backend/housecare.db``.
+"""
+import os
+import tempfile
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='housecare-bench-'), 'bench.db'))
@@ -0,0 +1,219 @@
+"""
+Admin dashboard analytics over 1k services and 1M service requests.
+
+    python -m bench.analytics [--services 1000] [--requests 1000000]
+                              [--users 20000] [--repeat 3]
+
+One dashboard load is the services usage, revenue, services stats and users
+stats analytics. It is timed three ways: the original per-row COUNT loops,
+the set-based GROUP BY / conditional aggregates over ``service_requests``,
+and the endpoints themselves, which read the ``daily_stats`` rollup. Each is
+reported with its statement count, after checking all three agree.
+"""
+import argparse
+import contextlib
+from datetime import datetime, timedelta
+import io
+import random
+import time
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import and_, case, event, func
+
+from backend.app import app
+from backend.extensions import cache
+from backend.models import db, Admin, Service, ServiceRequest, User
+from backend.rollups import backfill_daily_stats
+
+STATUSES = ['requested', 'assigned', 'completed', 'cancelled']
+CHUNK = 50000
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self.counted)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self.counted)
+
+    def counted(self, *args):
+        self.count += 1
+
+
+def seed(services, requests, users):
+    now = datetime.utcnow()
+    conn = db.session.connection()
+    conn.execute(Service.__table__.insert(), [
+        {'name': f'Service {i}', 'base_price': 50.0 + i % 200, 'avg_duration': 60,
+         'status': 'active' if i % 10 else 'inactive', 'created_at': now - timedelta(days=i % 90)}
+        for i in range(services)
+    ])
+    service_ids = [row[0] for row in conn.execute(db.select(Service.id))]
+    conn.execute(User.__table__.insert(), [
+        {'username': f'bench-user-{i}', 'email': f'bench-user-{i}@example.com',
+         'user_type': 'professional' if i % 5 == 0 else 'customer',
+         'is_approved': True, 'is_active': True, 'created_at': now - timedelta(days=i % 90)}
+        for i in range(users)
+    ])
+    customer_ids = [row[0] for row in conn.execute(db.select(User.id).where(User.user_type == 'customer'))]
+    for offset in range(0, requests, CHUNK):
+        rows = []
+        for _ in range(min(CHUNK, requests - offset)):
+            status = random.choice(STATUSES)
+            day = now - timedelta(days=random.randrange(400), minutes=random.randrange(1440))
+            rows.append({
+                'service_id': random.choice(service_ids), 'customer_id': random.choice(customer_ids),
+                'status': status, 'request_date': day - timedelta(days=3), 'completion_date': day,
+                'completed_on': day if status == 'completed' else None,
+            })
+        conn.execute(ServiceRequest.__table__.insert(), rows)
+    db.session.commit()
+
+
+def month_bounds():
+    current_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last_month = (current_month - timedelta(days=1)).replace(day=1)
+    return current_month, last_month
+
+
+def per_row_dashboard():
+    """The analytics as first written: a COUNT or SUM query per figure, and per service."""
+    current_month, last_month = month_bounds()
+    usage = [
+        (service.name, ServiceRequest.query.filter(
+            ServiceRequest.service_id == service.id, ServiceRequest.status == 'completed'
+        ).count())
+        for service in Service.query.all()
+    ]
+    revenue = db.session.query(func.sum(Service.base_price)).join(ServiceRequest)
+    completed = revenue.filter(ServiceRequest.status == 'completed')
+    revenues = (
+        completed.scalar() or 0.0,
+        completed.filter(ServiceRequest.completion_date >= current_month).scalar() or 0.0,
+        completed.filter(ServiceRequest.completion_date >= last_month,
+                         ServiceRequest.completion_date < current_month).scalar() or 0.0,
+    )
+    services = (
+        Service.query.filter_by(status='active').count(),
+        Service.query.filter(Service.created_at >= current_month).count(),
+        Service.query.filter(Service.created_at >= last_month, Service.created_at < current_month).count(),
+    )
+    users = []
+    for user_type in ('professional', 'customer'):
+        of_type = User.query.filter(User.user_type == user_type)
+        users += [
+            of_type.count(),
+            of_type.filter(User.created_at >= current_month).count(),
+            of_type.filter(User.created_at >= last_month, User.created_at < current_month).count(),
+        ]
+    return usage, revenues, services, tuple(users)
+
+
+def aggregate_dashboard():
+    """The same figures from one GROUP BY or conditional aggregate query each."""
+    current_month, last_month = month_bounds()
+    usage = db.session.query(Service.name, func.count(ServiceRequest.id)).outerjoin(
+        ServiceRequest, and_(ServiceRequest.service_id == Service.id, ServiceRequest.status == 'completed')
+    ).group_by(Service.id, Service.name).order_by(Service.id).all()
+    revenues = db.session.query(
+        func.sum(Service.base_price),
+        func.sum(case((ServiceRequest.completion_date >= current_month, Service.base_price))),
+        func.sum(case((and_(ServiceRequest.completion_date >= last_month,
+                            ServiceRequest.completion_date < current_month), Service.base_price))),
+    ).join(ServiceRequest).filter(ServiceRequest.status == 'completed').one()
+    services = db.session.query(
+        func.count(case((Service.status == 'active', 1))),
+        func.count(case((Service.created_at >= current_month, 1))),
+        func.count(case((and_(Service.created_at >= last_month, Service.created_at < current_month), 1))),
+    ).one()
+    this_month = User.created_at >= current_month
+    previous_month = and_(User.created_at >= last_month, User.created_at < current_month)
+    users = []
+    for user_type in ('professional', 'customer'):
+        of_type = User.user_type == user_type
+        users += [of_type, and_(of_type, this_month), and_(of_type, previous_month)]
+    users = db.session.query(*[func.count(case((condition, 1))) for condition in users]).select_from(User).one()
+    return ([tuple(row) for row in usage], tuple(value or 0.0 for value in revenues),
+            tuple(services), tuple(users))
+
+
+def endpoint_dashboard(client, headers):
+    """The dashboard's analytics requests, with the response cache emptied first."""
+    cache.clear()
+    responses = {}
+    for path in ('analytics/services-usage', 'analytics/revenue', 'services/stats', 'users/stats'):
+        # The JWT callbacks print a DEBUG line per request
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = client.get(f'/api/admin/{path}', headers=headers)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        responses[path] = response.get_json()
+    return responses
+
+
+def timed(load, repeat, engine):
+    with StatementCounter(engine) as counter:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = load()
+        elapsed = (time.perf_counter() - start) / repeat
+    return result, elapsed, counter.count // repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--services', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    random.seed(1)
+
+    # Every endpoint load computes its figures instead of hitting the response cache
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    client = app.test_client()
+    # The first request creates the schema and the admin
+    client.get('/api')
+
+    with app.app_context():
+        start = time.perf_counter()
+        seed(args.services, args.requests, args.users)
+        print(f"{args.services} services, {args.requests} requests, {args.users} users "
+              f"seeded in {time.perf_counter() - start:.1f} s")
+        start = time.perf_counter()
+        backfill_daily_stats()
+        print(f"daily_stats backfill {time.perf_counter() - start:8.3f} s")
+
+        admin = Admin.query.first()
+        headers = {'Authorization': 'Bearer ' + create_access_token(
+            identity=str(admin.id),
+            additional_claims={'role': 'admin', 'is_approved': True, 'is_active': True, 'username': admin.username}
+        )}
+        engine = db.engine
+
+        per_row, per_row_s, per_row_statements = timed(per_row_dashboard, args.repeat, engine)
+        grouped, grouped_s, grouped_statements = timed(aggregate_dashboard, args.repeat, engine)
+        responses, endpoint_s, endpoint_statements = timed(
+            lambda: endpoint_dashboard(client, headers), args.repeat, engine)
+
+    usage, revenues, services, users = per_row
+    if grouped[0] != usage or grouped[2:] != per_row[2:] or any(
+            round(a, 2) != round(b, 2) for a, b in zip(grouped[1], revenues)):
+        raise SystemExit('aggregate queries disagree with the per-row counts')
+    if (responses['analytics/services-usage']['data'] != [count for _, count in usage]
+            or round(responses['analytics/revenue']['total_revenue'], 2) != round(revenues[0], 2)
+            or responses['services/stats']['total_active_services'] != services[0]
+            or responses['users/stats']['total_customers'] != users[3]):
+        raise SystemExit('endpoints disagree with the per-row counts')
+
+    print(f"per-row loops      {per_row_s * 1000:10.1f} ms {per_row_statements:6} statements")
+    print(f"aggregate queries  {grouped_s * 1000:10.1f} ms {grouped_statements:6} statements")
+    print(f"endpoints (rollup) {endpoint_s * 1000:10.1f} ms {endpoint_statements:6} statements")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Pin code search across 10k pin codes: the ``service_availability`` index
+against counting professionals per service, and the cost of keeping the
+index current.
+
+    python -m bench.availability [--pins 10000] [--professionals 30000]
+                                 [--services 20] [--searches 300] [--threads 8]
+
+Ends with concurrent refreshes of overlapping (pin code, service) pairs
+from several threads and checks that the index still matches a full
+recount.
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+
+from backend.app import app
+from backend.availability import (
+    available_services, counted_professionals, rebuild_availability, refresh_availability
+)
+from backend.migrations import upgrade_database
+from backend.models import db, Service, ServiceAvailability, ServiceProfessional, User
+
+
+class ErrorCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def seed(pins, professionals, services):
+    upgrade_database()
+    conn = db.session.connection()
+    conn.execute(Service.__table__.insert(), [
+        {'name': f'Service {i}', 'base_price': 100.0, 'avg_duration': 60, 'status': 'active'}
+        for i in range(services)
+    ])
+    service_ids = [row[0] for row in conn.execute(db.select(Service.id))]
+    conn.execute(User.__table__.insert(), [
+        {'username': f'bench-pro-{i}', 'email': f'bench-pro-{i}@example.com',
+         'user_type': 'professional', 'is_approved': True, 'is_active': True}
+        for i in range(professionals)
+    ])
+    ids = [row[0] for row in conn.execute(db.select(User.id).where(User.username.like('bench-pro-%')))]
+    conn.execute(ServiceProfessional.__table__.insert(), [
+        {'id': id, 'pin_code': str(100000 + random.randrange(pins)), 'service_type_id': random.choice(service_ids)}
+        for id in ids
+    ])
+    db.session.commit()
+    return ids
+
+
+def per_service_counts(pin_code):
+    """The search before the index: one professional query per active service."""
+    result = {}
+    for service in Service.query.filter_by(status='active').all():
+        professionals = ServiceProfessional.query.filter(
+            ServiceProfessional.service_type_id == service.id,
+            ServiceProfessional.is_approved == True,
+            ServiceProfessional.is_active == True,
+            ServiceProfessional.pin_code == pin_code
+        ).all()
+        if professionals:
+            result[service.id] = len(professionals)
+    return result
+
+
+def per_search_ms(search, pins):
+    start = time.perf_counter()
+    for pin_code in pins:
+        search(pin_code)
+    return (time.perf_counter() - start) / len(pins) * 1000
+
+
+def toggle_and_refresh(professional_id):
+    professional = db.session.get(ServiceProfessional, professional_id)
+    professional.is_active = not professional.is_active
+    db.session.commit()
+    refresh_availability(professional_id)
+
+
+def concurrent_refreshes(ids, threads):
+    def work(chunk):
+        with app.app_context():
+            for professional_id in chunk:
+                toggle_and_refresh(professional_id)
+
+    workers = [threading.Thread(target=work, args=(ids[i::threads],)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pins', type=int, default=10000)
+    parser.add_argument('--professionals', type=int, default=30000)
+    parser.add_argument('--services', type=int, default=20)
+    parser.add_argument('--searches', type=int, default=300)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+    random.seed(1)
+    errors = ErrorCounter()
+    logging.getLogger('backend.availability').addHandler(errors)
+
+    with app.app_context():
+        ids = seed(args.pins, args.professionals, args.services)
+        start = time.perf_counter()
+        rows = rebuild_availability()
+        print(f"{args.professionals} professionals, {args.pins} pin codes, {args.services} services")
+        print(f"rebuild            {rows} rows in {time.perf_counter() - start:.3f} s")
+
+        pins = [str(100000 + random.randrange(args.pins)) for _ in range(args.searches)]
+        assert all(per_service_counts(pin_code) == available_services(pin_code) for pin_code in pins[:20])
+        print(f"search per service {per_search_ms(per_service_counts, pins):8.3f} ms")
+        print(f"search with index  {per_search_ms(available_services, pins):8.3f} ms")
+
+        sample = random.sample(ids, 200)
+        start = time.perf_counter()
+        for professional_id in sample:
+            toggle_and_refresh(professional_id)
+        print(f"toggle + refresh   {(time.perf_counter() - start) / len(sample) * 1000:8.3f} ms")
+
+    # Professionals sharing a few pairs, refreshed from several threads at once
+    with app.app_context():
+        pairs = {}
+        for professional in ServiceProfessional.query.filter(ServiceProfessional.id.in_(ids)):
+            pairs.setdefault((professional.pin_code, professional.service_type_id), []).append(professional.id)
+        shared = [members for members in pairs.values() if len(members) > 1][:50]
+    contended = [professional_id for members in shared for professional_id in members]
+    start = time.perf_counter()
+    concurrent_refreshes(contended, args.threads)
+    print(f"concurrent         {len(contended)} refreshes of {len(shared)} shared pairs "
+          f"on {args.threads} threads in {time.perf_counter() - start:.3f} s, {errors.count} errors")
+
+    with app.app_context():
+        index = {(row.pin_code, row.service_type_id): row.professional_count
+                 for row in ServiceAvailability.query.filter(ServiceAvailability.professional_count > 0)}
+        recount = {(pin_code, service_type_id): count
+                   for pin_code, service_type_id, count in counted_professionals()}
+        print(f"index matches a full recount: {index == recount}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Compressed size and CPU time of listing responses, per encoding and level.
+
+    python -m bench.compression [--rows 100 1000 10000] [--repeat 5]
+
+Runs ``backend.compression.compress`` on a request listing's JSON body at
+gzip levels 1, 6 (the default) and 9 and brotli qualities 1, 4 (the
+default), 6 and 11, when ``brotli`` is installed. Reports the compressed
+size, the ratio to the original body and the milliseconds spent per
+response, and checks that every body decompresses to the original.
+"""
+import argparse
+import gzip
+import json
+import time
+
+from flask import Flask
+
+from backend.compression import brotli, compress
+from bench.json_provider import listing
+
+SETTINGS = [('gzip', 'COMPRESSION_GZIP_LEVEL', level) for level in (1, 6, 9)]
+if brotli is not None:
+    SETTINGS += [('br', 'COMPRESSION_BROTLI_QUALITY', quality) for quality in (1, 4, 6, 11)]
+
+DECOMPRESS = {'gzip': gzip.decompress, 'br': brotli.decompress if brotli is not None else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    with app.app_context():
+        for rows in args.rows:
+            # Compact separators, as jsonify uses outside debug mode
+            body = json.dumps(listing(rows), separators=(',', ':')).encode()
+            print(f"{rows} rows, {len(body)} bytes")
+            for encoding, setting, level in SETTINGS:
+                app.config[setting] = level
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    compressed = compress(body, encoding)
+                elapsed = (time.perf_counter() - start) / args.repeat * 1000
+                if DECOMPRESS[encoding](compressed) != body:
+                    raise SystemExit(f'{encoding} {level} does not round-trip')
+                print(f"  {encoding:4} {level:2} {len(compressed):9} bytes "
+                      f"{len(compressed) / len(body):6.1%} {elapsed:9.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+JSON encoding time of a listing-sized response, stdlib provider vs orjson.
+
+    python -m bench.json_provider [--rows 10000] [--repeat 20]
+
+Checks first that both providers produce identical bytes, including for a
+payload holding NaN, which the orjson provider hands to the stdlib.
+"""
+import argparse
+from datetime import datetime
+import random
+import time
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from backend.json_provider import OrjsonProvider
+
+
+def listing(count):
+    random.seed(0)
+    return [{
+        'id': i,
+        'service_name': f'Service {i % 20}',
+        'customer_name': f'Customer {i}',
+        'status': random.choice(['requested', 'assigned', 'completed', 'cancelled']),
+        'request_date': datetime(2024, 1, 1, 10, i % 60).isoformat(),
+        'completion_date': None if i % 3 else datetime(2024, 2, 1).isoformat(),
+        'service_price': 100.0 + (i % 50) * 1.25,
+        'rating': random.choice([None, 4, 5]),
+        'notes': 'call before arriving',
+        'is_active': True,
+    } for i in range(count)]
+
+
+def timed(provider, payload, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        provider.response(payload)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    stdlib, fast = DefaultJSONProvider(app), OrjsonProvider(app)
+    rows = listing(args.rows)
+    with_nan = rows[:100] + [{'id': -1, 'service_price': float('nan')}]
+
+    with app.test_request_context():
+        for payload in (rows, with_nan):
+            if fast.response(payload).get_data() != stdlib.response(payload).get_data():
+                raise SystemExit('orjson output differs from the stdlib')
+        size = len(stdlib.response(rows).get_data())
+        print(f"{args.rows} rows, {size} bytes")
+        for name, provider in (('stdlib', stdlib), ('orjson', fast)):
+            print(f"{name:8} {timed(provider, rows, args.repeat):8.2f} ms per response")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Query plans of the dashboard filters on ``service_requests`` and ``reviews``.
+
+    python -m bench.query_plans [--requests 300000] [--customers 5000]
+                                [--professionals 1000] [--services 50]
+
+Seeds the tables, runs each dashboard path (the customer and professional
+listings and stats, the revenue analytics and the daily rollup they read,
+the review lookup) and records the statements it executes. Every statement
+reading ``service_requests`` or ``reviews`` is then explained with its
+parameters: ``EXPLAIN QUERY PLAN`` on SQLite, ``EXPLAIN`` on PostgreSQL.
+Exits with an error if any plan scans either table instead of searching
+one of its indexes.
+"""
+import argparse
+import contextlib
+from datetime import datetime, timedelta
+import io
+import random
+import re
+import time
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from backend.app import app
+from backend.extensions import cache
+from backend.models import db, Admin, Review, Service, ServiceProfessional, ServiceRequest, User
+from backend.rollups import backfill_daily_stats
+
+STATUSES = ['requested', 'assigned', 'completed', 'cancelled']
+CHUNK = 50000
+TABLES = ('service_requests', 'reviews')
+# Full table scans as each dialect reports them
+SCANS = {
+    'sqlite': re.compile(r'\bSCAN (service_requests|reviews)\b'),
+    'postgresql': re.compile(r'\bSeq Scan on (service_requests|reviews)\b'),
+}
+
+
+def seed(requests, customers, professionals, services):
+    now = datetime.utcnow()
+    conn = db.session.connection()
+    conn.execute(Service.__table__.insert(), [
+        {'name': f'Service {i}', 'base_price': 50.0 + i, 'avg_duration': 60} for i in range(services)
+    ])
+    service_ids = [row[0] for row in conn.execute(db.select(Service.id))]
+    conn.execute(User.__table__.insert(), [
+        {'username': f'bench-user-{i}', 'email': f'bench-user-{i}@example.com',
+         'user_type': 'professional' if i < professionals else 'customer',
+         'is_approved': True, 'is_active': True}
+        for i in range(customers + professionals)
+    ])
+    users = conn.execute(db.select(User.id, User.user_type).where(User.username.like('bench-user-%'))).all()
+    customer_ids = [id for id, user_type in users if user_type == 'customer']
+    professional_ids = [id for id, user_type in users if user_type == 'professional']
+    conn.execute(ServiceProfessional.__table__.insert(), [
+        {'id': id, 'service_type_id': random.choice(service_ids), 'pin_code': '500001'}
+        for id in professional_ids
+    ])
+    for offset in range(0, requests, CHUNK):
+        rows = []
+        for _ in range(min(CHUNK, requests - offset)):
+            status = random.choice(STATUSES)
+            day = now - timedelta(days=random.randrange(400), minutes=random.randrange(1440))
+            rows.append({
+                'service_id': random.choice(service_ids), 'customer_id': random.choice(customer_ids),
+                'pro_id': random.choice(professional_ids), 'status': status,
+                'request_date': day - timedelta(days=3), 'completion_date': day,
+                'completed_on': day if status == 'completed' else None,
+            })
+        conn.execute(ServiceRequest.__table__.insert(), rows)
+    completed = conn.execute(db.select(ServiceRequest.id).where(ServiceRequest.status == 'completed')).scalars().all()
+    for offset in range(0, len(completed), CHUNK):
+        conn.execute(Review.__table__.insert(), [
+            {'request_id': id, 'rating': random.randint(1, 5), 'comment': 'ok', 'created_at': now}
+            for id in completed[offset:offset + CHUNK] if id % 2
+        ])
+    db.session.commit()
+    # Planner statistics, and on PostgreSQL the visibility map that index-only
+    # scans rely on, as autovacuum leaves them after a bulk load
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.exec_driver_sql('VACUUM ANALYZE' if conn.dialect.name == 'postgresql' else 'ANALYZE')
+    return customer_ids[0], professional_ids[0]
+
+
+@contextlib.contextmanager
+def recorded(engine):
+    """Collect the (statement, parameters) pairs executed inside the block."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def token(user):
+    return {'Authorization': 'Bearer ' + create_access_token(identity=str(user.id), additional_claims={
+        'role': user.user_type, 'is_approved': True, 'is_active': True, 'username': user.username
+    })}
+
+
+def explain(conn, dialect, statement, parameters):
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect == 'sqlite' else 'EXPLAIN '
+    rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+    # SQLite rows are (id, parent, notused, detail), PostgreSQL rows a single line
+    return [row[-1] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300000)
+    parser.add_argument('--customers', type=int, default=5000)
+    parser.add_argument('--professionals', type=int, default=1000)
+    parser.add_argument('--services', type=int, default=50)
+    args = parser.parse_args()
+    random.seed(1)
+
+    # Every stats endpoint computes its figures instead of hitting the cache
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    client = app.test_client()
+    # The first request creates the schema and the admin
+    client.get('/api')
+
+    with app.app_context():
+        start = time.perf_counter()
+        customer_id, professional_id = seed(args.requests, args.customers, args.professionals, args.services)
+        print(f"{args.requests} requests seeded in {time.perf_counter() - start:.1f} s")
+        customer = db.session.get(User, customer_id)
+        professional = db.session.get(User, professional_id)
+        reviewed = db.session.query(ServiceRequest.id).join(Review).filter(
+            ServiceRequest.customer_id == customer_id
+        ).first()
+        if reviewed is None:
+            raise SystemExit('No reviewed request for the sampled customer; seed more requests')
+        customer_headers, professional_headers = token(customer), token(professional)
+        admin_headers = token(Admin.query.first())
+        engine = db.engine
+        dialect = engine.dialect.name
+
+    paths = [
+        ('customer_service_requests', '/api/customer/service-requests', customer_headers),
+        ('customer_service_stats', '/api/customer/service-stats', customer_headers),
+        ('professional_service_requests', '/api/professional/service-requests', professional_headers),
+        ('professional_stats', '/api/professional/stats', professional_headers),
+        ('revenue analytics', '/api/admin/analytics/revenue', admin_headers),
+        ('revenue analytics (month)', '/api/admin/analytics/revenue/month', admin_headers),
+        ('review lookup', f'/api/customer/service-requests/{reviewed.id}/review', customer_headers),
+    ]
+    cases = []
+    for name, path, headers in paths:
+        with recorded(engine) as statements:
+            # The JWT callbacks print a DEBUG line per request
+            with contextlib.redirect_stdout(io.StringIO()):
+                response = client.get(path, headers=headers)
+        if response.status_code != 200:
+            raise SystemExit(f'{path} returned {response.status_code}')
+        cases.append((name, statements))
+    with app.app_context():
+        day = datetime.utcnow().date() - timedelta(days=1)
+        with recorded(engine) as statements:
+            backfill_daily_stats(day, day)
+        cases.append(('revenue rollup refresh', statements))
+
+    scans = []
+    with engine.connect() as conn:
+        for name, statements in cases:
+            relevant = [(statement, parameters) for statement, parameters in statements
+                        if statement.lstrip().upper().startswith('SELECT')
+                        and any(re.search(rf'\b{table}\b', statement) for table in TABLES)]
+            print(f"\n{name}: {len(relevant)} of {len(statements)} statements read {' or '.join(TABLES)}")
+            for statement, parameters in relevant:
+                plan = explain(conn, dialect, statement, parameters)
+                print('  ' + ' '.join(statement.split())[:100])
+                for line in plan:
+                    print('    ' + line)
+                if any(SCANS[dialect].search(line) for line in plan):
+                    scans.append(name)
+
+    if scans:
+        raise SystemExit(f"\nTable scans in: {', '.join(dict.fromkeys(scans))}")
+    print('\nNo table scans of service_requests or reviews')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+Service request serialization: ORM objects and hand-built dicts against
+column projections.
+
+    python -m bench.serializers [--rows 20000] [--customers 200] [--repeat 5]
+
+Seeds ``--rows`` service requests from the previous month, spread over
+``--customers`` customers, and times two representations both ways:
+
+- the customer listing over every request: ``ServiceRequest.query`` with the
+  service and professional joined eagerly plus the dict the listing used to
+  build, against ``CUSTOMER_REQUEST.query()`` and its ``serialize``;
+- the monthly activity report rows: one ``ServiceRequest.query`` per
+  customer plus the report's dict, against one ``MONTHLY_REPORT_REQUEST``
+  query for every customer.
+
+Each load starts from an empty session and is checked to produce the same
+dicts as the other path.
+"""
+import argparse
+from datetime import datetime, timedelta
+from operator import itemgetter
+import random
+import time
+
+from backend.app import app
+from backend.models import db, Customer, Service, ServiceProfessional, ServiceRequest, User
+from backend.serializers import CUSTOMER_REQUEST, MONTHLY_REPORT_REQUEST
+
+STATUSES = ['requested', 'assigned', 'completed', 'cancelled']
+CHUNK = 50000
+
+
+def previous_month():
+    first_day_of_current = datetime(datetime.utcnow().year, datetime.utcnow().month, 1)
+    last_day_previous = first_day_of_current - timedelta(microseconds=1)
+    return datetime(last_day_previous.year, last_day_previous.month, 1), last_day_previous
+
+
+def seed(rows, customers, professionals=50, services=20):
+    conn = db.session.connection()
+    conn.execute(Service.__table__.insert(), [
+        {'name': f'Service {i}', 'base_price': 50.0 + i, 'avg_duration': 60} for i in range(services)
+    ])
+    service_ids = [row[0] for row in conn.execute(db.select(Service.id))]
+    conn.execute(User.__table__.insert(), [
+        {'username': f'bench-user-{i}', 'email': f'bench-user-{i}@example.com', 'full_name': f'Bench User {i}',
+         'user_type': 'professional' if i < professionals else 'customer',
+         'is_approved': True, 'is_active': True}
+        for i in range(customers + professionals)
+    ])
+    users = conn.execute(db.select(User.id, User.user_type).where(User.username.like('bench-user-%'))).all()
+    customer_ids = [id for id, user_type in users if user_type == 'customer']
+    professional_ids = [id for id, user_type in users if user_type == 'professional']
+    conn.execute(ServiceProfessional.__table__.insert(), [
+        {'id': id, 'service_type_id': random.choice(service_ids), 'pin_code': '500001'}
+        for id in professional_ids
+    ])
+    start, end = previous_month()
+    span = int((end - start).total_seconds())
+    for offset in range(0, rows, CHUNK):
+        batch = []
+        for _ in range(min(CHUNK, rows - offset)):
+            status = random.choice(STATUSES)
+            requested = start + timedelta(seconds=random.randrange(span))
+            assigned = requested + timedelta(hours=2) if status != 'requested' else None
+            batch.append({
+                'service_id': random.choice(service_ids), 'customer_id': random.choice(customer_ids),
+                'pro_id': random.choice(professional_ids) if assigned else None, 'status': status,
+                'request_date': requested, 'completion_date': requested + timedelta(days=2),
+                'assigned_date': assigned,
+                'completed_on': requested + timedelta(days=2) if status == 'completed' else None,
+                'cancelled_on': requested + timedelta(days=1) if status == 'cancelled' else None,
+                'cancelled_by': 'customer' if status == 'cancelled' else None,
+                'notes': random.choice([None, 'Ring the bell']),
+            })
+        conn.execute(ServiceRequest.__table__.insert(), batch)
+    db.session.commit()
+
+
+def orm_listing():
+    """The customer listing before projections, over every request."""
+    requests = ServiceRequest.query.options(
+        db.joinedload(ServiceRequest.service),
+        db.joinedload(ServiceRequest.professional)
+    ).all()
+    return [{
+        'id': req.id,
+        'service_id': req.service_id,
+        'service_name': req.service.name if req.service else 'Unknown',
+        'pro_id': req.pro_id,
+        'professional_name': req.professional.username if req.professional else None,
+        'status': req.status,
+        'notes': req.notes if req.notes else None,
+        'service_price': req.service.base_price,
+        'service_duration': req.service.avg_duration,
+        'request_date': req.request_date.isoformat(),
+        'assigned_date': req.assigned_date.isoformat() if req.assigned_date else None,
+        'completed_on': req.completed_on.isoformat() if req.completed_on else None,
+        'cancelled_on': req.cancelled_on.isoformat() if req.cancelled_on else None,
+        'cancelled_by': req.cancelled_by if req.cancelled_by else None,
+        'completion_date': req.completion_date.isoformat() if req.completion_date else None
+    } for req in requests]
+
+
+def projected_listing():
+    return [CUSTOMER_REQUEST.serialize(row) for row in CUSTOMER_REQUEST.query().all()]
+
+
+def orm_report():
+    """The monthly report rows before projections: one query per customer."""
+    first_day, last_day = previous_month()
+    details_by_customer = {}
+    for customer in Customer.query.all():
+        requests = ServiceRequest.query.filter(
+            ServiceRequest.customer_id == customer.id,
+            ServiceRequest.request_date >= first_day,
+            ServiceRequest.request_date <= last_day
+        ).all()
+        service_details = []
+        for r in requests:
+            service_name = r.service.name if r.service and hasattr(r.service, 'name') else "Unknown"
+            professional_name = r.professional.full_name if r.professional else "Not Assigned"
+            request_date = r.request_date.strftime("%Y-%m-%d") if r.request_date else "N/A"
+            completion_date = r.completion_date.strftime("%Y-%m-%d") if r.completion_date else "N/A"
+            assigned_date = r.assigned_date.strftime("%Y-%m-%d") if r.assigned_date else "N/A"
+            completed_on = r.completed_on.strftime("%Y-%m-%d") if r.completed_on else "N/A"
+            cancelled_on = r.cancelled_on.strftime("%Y-%m-%d") if r.cancelled_on else "N/A"
+            service_details.append({
+                'service_name': service_name,
+                'request_date': request_date,
+                'completion_date': completion_date,
+                'assigned_date': assigned_date,
+                'completed_on': completed_on,
+                'cancelled_on': cancelled_on,
+                'cancelled_by': r.cancelled_by or "N/A",
+                'status': r.status,
+                'professional_name': professional_name
+            })
+        details_by_customer[customer.id] = service_details
+    return details_by_customer
+
+
+def projected_report():
+    """The report rows as send_monthly_activity_report reads them."""
+    first_day, last_day = previous_month()
+    details_by_customer = {id: [] for id, in db.session.query(Customer.id)}
+    rows = MONTHLY_REPORT_REQUEST.query().filter(
+        ServiceRequest.request_date >= first_day,
+        ServiceRequest.request_date <= last_day
+    ).order_by(ServiceRequest.id)
+    for row in rows:
+        details_by_customer[row.customer_id].append(MONTHLY_REPORT_REQUEST.serialize(row))
+    return details_by_customer
+
+
+def timed(load, repeat):
+    elapsed = 0.0
+    for _ in range(repeat):
+        # No objects left in the identity map from the previous load
+        db.session.expunge_all()
+        start = time.perf_counter()
+        result = load()
+        elapsed += time.perf_counter() - start
+    return result, elapsed / repeat
+
+
+def same_report(orm, projected):
+    """Whether both report loads hold the same rows per customer, in any order."""
+    def rows(details):
+        return sorted(sorted((key, value) for key, value in row.items() if key != 'customer_id') for row in details)
+    return orm.keys() == projected.keys() and all(rows(orm[id]) == rows(projected[id]) for id in orm)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--customers', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    random.seed(1)
+
+    client = app.test_client()
+    # The first request creates the schema and the admin
+    client.get('/api')
+
+    with app.app_context():
+        start = time.perf_counter()
+        seed(args.rows, args.customers)
+        print(f"{args.rows} requests, {args.customers} customers seeded in {time.perf_counter() - start:.1f} s")
+
+        orm, orm_s = timed(orm_listing, args.repeat)
+        projected, projected_s = timed(projected_listing, args.repeat)
+        if sorted(orm, key=itemgetter('id')) != sorted(projected, key=itemgetter('id')):
+            raise SystemExit('customer listing: the projection disagrees with the ORM dicts')
+        print(f"customer listing  ORM {orm_s * 1000:9.1f} ms  projection {projected_s * 1000:9.1f} ms"
+              f"  {orm_s / projected_s:4.1f}x")
+
+        orm, orm_s = timed(orm_report, args.repeat)
+        projected, projected_s = timed(projected_report, args.repeat)
+        if not same_report(orm, projected):
+            raise SystemExit('monthly report: the projection disagrees with the ORM dicts')
+        print(f"monthly report    ORM {orm_s * 1000:9.1f} ms  projection {projected_s * 1000:9.1f} ms"
+              f"  {orm_s / projected_s:4.1f}x")
+
+
+if __name__ == '__main__':
+    main()
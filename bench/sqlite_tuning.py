@@ -0,0 +1,111 @@
+"""
+Concurrent booking throughput on SQLite, default engine vs the tuned profile.
+
+    python -m bench.sqlite_tuning [--threads 8] [--bookings 40]
+
+Each mode runs in its own process against its own fresh database file
+(``SQLITE_TUNING`` is read when the config is imported): ``--threads``
+customers each post ``--bookings`` service requests through
+``POST /api/customer/service-requests`` at the same time. Reports bookings
+per second and how many requests failed, e.g. with "database is locked".
+"""
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def seed(customers):
+    from backend.app import app
+    from backend.models import db, Customer, Service
+
+    with app.app_context():
+        db.session.add(Service(name='Bench service', base_price=100.0, avg_duration=60))
+        db.session.add_all(
+            Customer(username=f'bench-customer-{i}', email=f'bench-customer-{i}@example.com',
+                     is_approved=True, is_active=True)
+            for i in range(customers)
+        )
+        db.session.commit()
+        return Service.query.one().id, [customer.id for customer in Customer.query.all()]
+
+
+def headers(customer_id):
+    from flask_jwt_extended import create_access_token
+
+    from backend.app import app
+
+    with app.app_context():
+        token = create_access_token(identity=str(customer_id), additional_claims={
+            'role': 'customer', 'is_approved': True, 'is_active': True
+        })
+    return {'Authorization': f'Bearer {token}'}
+
+
+def run(threads, bookings):
+    from backend.app import app
+    from backend.models import db
+
+    client = app.test_client()
+    # The first request creates the schema
+    client.get('/api')
+    service_id, customer_ids = seed(threads)
+    with app.app_context():
+        pragmas = {name: db.session.execute(db.text(f'PRAGMA {name}')).scalar()
+                   for name in ('journal_mode', 'synchronous', 'busy_timeout')}
+
+    failures = []
+
+    def book(customer_id):
+        worker = app.test_client()
+        auth = headers(customer_id)
+        for _ in range(bookings):
+            response = worker.post('/api/customer/service-requests', json={'service_id': service_id}, headers=auth)
+            if response.status_code != 201:
+                failures.append(response.status_code)
+
+    workers = [threading.Thread(target=book, args=(customer_id,)) for customer_id in customer_ids]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    total = threads * bookings
+    mode = 'tuned' if app.config['SQLITE_TUNING'] else 'default'
+    settings = ', '.join(f'{name}={value}' for name, value in pragmas.items())
+    return f"{mode:8} {total / elapsed:8.1f} bookings/s, {len(failures)} of {total} failed ({settings})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--bookings', type=int, default=40)
+    parser.add_argument('--mode', choices=['default', 'tuned'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        # The JWT callbacks print a DEBUG line per request
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run(args.threads, args.bookings)
+        print(result)
+        return
+
+    print(f"{args.threads} customers booking {args.bookings} requests each")
+    for mode in ('default', 'tuned'):
+        env = dict(os.environ,
+                   SQLITE_TUNING='true' if mode == 'tuned' else 'false',
+                   DATABASE_URL='sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='housecare-bench-'), 'bench.db'))
+        subprocess.run([sys.executable, '-m', 'bench.sqlite_tuning', '--mode', mode,
+                        '--threads', str(args.threads), '--bookings', str(args.bookings)],
+                       env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Peak memory of the admin users listing, buffered and streamed.
+
+    python -m bench.streaming [--users 1000 10000 50000]
+
+For each user count, requests ``GET /api/admin/users`` without and with
+``stream=true`` through the test client and consumes the body by iterating
+``response.response``. The peak of ``tracemalloc.get_traced_memory()`` over
+the request and the read is reported for both, with the body size and the
+elapsed time, after checking both bodies are the same bytes. The buffered
+peak grows with the user count; the streamed one stays near one batch of
+``STREAM_BATCH_SIZE`` rows.
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import random
+import time
+import tracemalloc
+
+from flask_jwt_extended import create_access_token
+
+from backend.app import app
+from backend.models import db, Admin, Service, ServiceProfessional, User
+
+# One user in PROFESSIONAL_EVERY is a professional, with the extra details row
+PROFESSIONAL_EVERY = 5
+
+
+def seed(start, end, service_ids):
+    """Add users numbered [start, end) to the table."""
+    conn = db.session.connection()
+    conn.execute(User.__table__.insert(), [
+        {'username': f'bench-user-{i}', 'email': f'bench-user-{i}@example.com',
+         'full_name': f'Bench User {i}', 'address': f'{i} Bench Street', 'phone_number': f'{9000000000 + i}',
+         'user_type': 'professional' if i % PROFESSIONAL_EVERY == 0 else 'customer',
+         'is_approved': True, 'is_active': True}
+        for i in range(start, end)
+    ])
+    ids = conn.execute(db.select(User.id).where(
+        User.username.in_([f'bench-user-{i}' for i in range(start, end) if i % PROFESSIONAL_EVERY == 0])
+    )).scalars().all()
+    if ids:
+        conn.execute(ServiceProfessional.__table__.insert(), [
+            {'id': id, 'service_type_id': random.choice(service_ids), 'pin_code': '500001',
+             'experience_years': random.randrange(20)}
+            for id in ids
+        ])
+    db.session.commit()
+
+
+def measure(client, path, headers):
+    """Body digest, size, peak traced bytes and seconds of one request read to the end."""
+    digest, size = hashlib.sha256(), 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        # The JWT callbacks print a DEBUG line per request
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = client.get(path, headers=headers)
+            if response.status_code != 200:
+                raise SystemExit(f'{path} returned {response.status_code}')
+            for chunk in response.response:
+                chunk = chunk.encode() if isinstance(chunk, str) else chunk
+                digest.update(chunk)
+                size += len(chunk)
+            response.close()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return digest.hexdigest(), size, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000, 50000])
+    args = parser.parse_args()
+    random.seed(1)
+
+    client = app.test_client()
+    # The first request creates the schema and the admin
+    client.get('/api')
+
+    with app.app_context():
+        db.session.connection().execute(Service.__table__.insert(), [
+            {'name': f'Service {i}', 'base_price': 100.0, 'avg_duration': 60} for i in range(10)
+        ])
+        db.session.commit()
+        service_ids = db.session.execute(db.select(Service.id)).scalars().all()
+        admin = Admin.query.first()
+        headers = {'Authorization': 'Bearer ' + create_access_token(
+            identity=str(admin.id),
+            additional_claims={'role': 'admin', 'is_approved': True, 'is_active': True, 'username': admin.username}
+        )}
+        print(f"STREAM_BATCH_SIZE {app.config['STREAM_BATCH_SIZE']}")
+
+    seeded = 0
+    for users in sorted(args.users):
+        with app.app_context():
+            seed(seeded, users, service_ids)
+        seeded = users
+        buffered = measure(client, '/api/admin/users', headers)
+        streamed = measure(client, '/api/admin/users?stream=true', headers)
+        if buffered[0] != streamed[0]:
+            raise SystemExit(f'{users} users: the streamed body differs from the buffered one')
+        print(f"{users} users, {buffered[1]} bytes")
+        for name, (_, _, peak, elapsed) in (('buffered', buffered), ('streamed', streamed)):
+            print(f"  {name:8} peak {peak / 2 ** 20:8.1f} MiB {elapsed * 1000:10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Shared fixtures.
+
+The app is pointed at a throwaway SQLite database before ``backend`` is
+imported, and its cache is replaced with an in-process one, so the suite
+needs neither Redis nor ``backend/housecare.db``.
+
+``TEST_DATABASE_URL`` runs the suite against another database instead,
+e.g. ``postgresql://postgres@localhost/housecare_test``. The suite drops
+every table of that database first, so point it at a throwaway one. When it
+cannot be reached the tests are skipped.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import os
+import tempfile
+
+os.environ['DATABASE_URL'] = (os.environ.get('TEST_DATABASE_URL')
+                             or 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='housecare-tests-'), 'test.db'))
+os.environ.pop('DATABASE_REPLICA_URL', None)
+# Checked by the app fixture instead, which skips the tests when it fails
+os.environ['DB_STARTUP_CHECK'] = 'false'
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from backend.app import app as flask_app
+from backend.database import check_database
+from backend.extensions import cache
+from backend.migrations import schema_version
+from backend.models import db, Admin, Customer, Document, Service, ServiceProfessional, ServiceRequest
+
+
+@pytest.fixture(scope='session')
+def app():
+    try:
+        check_database(flask_app)
+    except RuntimeError as e:
+        pytest.skip(str(e))
+    cache.init_app(flask_app, config={'CACHE_TYPE': 'SimpleCache'})
+    flask_app.config.update(TESTING=True, IDENTITY_CACHE_ENABLED=False)
+    if os.environ.get('TEST_DATABASE_URL'):
+        # Left over from the previous run
+        with flask_app.app_context():
+            db.drop_all()
+            schema_version.drop(db.engine, checkfirst=True)
+    # First request: migrations and the default admin
+    flask_app.test_client().get('/api')
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app):
+    """Authorization headers carrying a JWT for ``user``."""
+    def make(user):
+        with app.app_context():
+            token = create_access_token(identity=str(user.id), additional_claims={
+                'role': user.user_type,
+                'is_approved': user.is_approved,
+                'is_active': user.is_active,
+                'username': user.username,
+            })
+        return {'Authorization': f'Bearer {token}'}
+    return make
+
+
+def detached(model, id):
+    # Loaded and detached, so it stays readable outside the app context
+    user = db.session.get(model, id)
+    db.session.expunge(user)
+    return user
+
+
+@pytest.fixture
+def admin(app):
+    with app.app_context():
+        return detached(Admin, Admin.query.first().id)
+
+
+@pytest.fixture
+def marketplace(app):
+    """
+    A service with one customer and one professional. ``add_requests(n)``
+    books ``n`` more requests between them, ``add_professionals(n)`` adds
+    ``n`` professionals with a verified document and ``add_customers(n)``
+    ``n`` customers.
+    """
+    suffix = os.urandom(4).hex()
+    with app.app_context():
+        service = Service(name=f'Cleaning {suffix}', description='d', base_price=100.0, avg_duration=60)
+        db.session.add(service)
+        db.session.flush()
+        customer = Customer(username=f'customer-{suffix}', email=f'customer-{suffix}@example.com',
+                            full_name='Customer', is_approved=True, address='Street 1', phone_number='1')
+        professional = ServiceProfessional(username=f'pro-{suffix}', email=f'pro-{suffix}@example.com',
+                                           full_name='Professional', is_approved=True,
+                                           service_type_id=service.id, pin_code='500001')
+        customer.set_password('secret')
+        professional.set_password('secret')
+        db.session.add_all([customer, professional])
+        db.session.commit()
+        service_id, customer_id, professional_id = service.id, customer.id, professional.id
+        customer = detached(Customer, customer_id)
+        professional = detached(ServiceProfessional, professional_id)
+
+    def add_requests(count):
+        with app.app_context():
+            statuses = ['requested', 'assigned', 'completed', 'cancelled']
+            db.session.add_all(ServiceRequest(
+                service_id=service_id, customer_id=customer_id, pro_id=professional_id,
+                status=statuses[i % 4], completion_date=datetime.utcnow() - timedelta(days=i)
+            ) for i in range(count))
+            db.session.commit()
+
+    def add_professionals(count):
+        with app.app_context():
+            for _ in range(count):
+                name = f'pro-{os.urandom(4).hex()}'
+                added = ServiceProfessional(username=name, email=f'{name}@example.com', full_name='Professional',
+                                            is_approved=True, service_type_id=service_id, pin_code='500001')
+                db.session.add(added)
+                db.session.flush()
+                db.session.add(Document(professional_id=added.id, document_type='idProof',
+                                        filename='id.pdf', file_path='id.pdf', verified=True))
+            db.session.commit()
+
+    def add_customers(count):
+        with app.app_context():
+            for _ in range(count):
+                name = f'customer-{os.urandom(4).hex()}'
+                db.session.add(Customer(username=name, email=f'{name}@example.com', full_name='Customer',
+                                        is_approved=True, address='Street 1', phone_number='1'))
+            db.session.commit()
+
+    return {
+        'customer': customer,
+        'professional': professional,
+        'add_requests': add_requests,
+        'add_professionals': add_professionals,
+        'add_customers': add_customers,
+    }
+
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager collecting the SQL statements executed inside it."""
+    @contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+    return counting
@@ -0,0 +1,121 @@
+"""
+Redis outages: the two-tier cache keeps answering from its per-process
+fallback, and the keys written meanwhile are invalidated once Redis is back.
+A fakeredis server stands in for Redis; ``server.connected = False`` makes
+every command raise ``ConnectionError``, as a dead server would.
+"""
+import time
+
+import fakeredis
+import pytest
+
+from backend.cache_backend import TwoTierRedisCache
+
+PREFIX = 'test:'
+
+
+@pytest.fixture
+def server():
+    server = fakeredis.FakeServer()
+    yield server
+    # Let the background threads of the test's caches settle instead of
+    # retrying a dead server until the interpreter exits
+    server.connected = True
+
+
+def worker_cache(server):
+    """The cache of one worker process, connected to ``server``."""
+    return TwoTierRedisCache(host=fakeredis.FakeStrictRedis(server=server), key_prefix=PREFIX,
+                             probe_interval=0.05)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_serves_from_fallback_when_redis_dies_mid_load(server):
+    cache = worker_cache(server)
+    values = []
+    for i in range(200):
+        if i == 100:
+            server.connected = False
+        cache.set(f'key:{i}', i)
+        values.append(cache.get(f'key:{i}'))
+
+    assert values == list(range(200))
+    stats = cache.tier_stats()
+    assert stats['breaker_open']
+    assert stats['breaker_trips'] == 1
+    assert stats['fallback_entries'] == 100
+    assert stats['dirty_keys'] == 100
+    # Versions keep moving forward locally
+    assert cache.inc('version', 5) == 5
+    assert cache.inc('version') == 6
+
+
+def test_keys_written_during_outage_are_invalidated_on_recovery(server):
+    cache, other = worker_cache(server), worker_cache(server)
+    redis = fakeredis.FakeStrictRedis(server=server)
+    cache.set('catalog', 'v1')
+    # The first lookup starts the worker's invalidation subscriber
+    other.get('catalog')
+    assert wait_for(other._subscribed.is_set)
+    assert other.get('catalog') == 'v1'
+
+    server.connected = False
+    assert cache.set('catalog', 'v2')
+    assert cache.get('catalog') == 'v2'
+    assert cache.breaker_open
+
+    server.connected = True
+    assert wait_for(lambda: not cache.breaker_open)
+    # Redis still held v1, which missed the outage's write: it is deleted,
+    # here and in the other worker's L1, instead of being served again
+    assert redis.get(f'{PREFIX}catalog') is None
+    assert cache.get('catalog') is None
+    # The other worker hears of it through pub/sub, asynchronously
+    assert wait_for(lambda: other.get('catalog') is None)
+    assert cache.tier_stats()['dirty_keys'] == 0
+
+
+def test_lock_is_released_only_by_its_owner(server):
+    cache = worker_cache(server)
+    assert cache.add('lock:entry', 'mine')
+    assert not cache.delete_if_equals('lock:entry', 'theirs')
+    assert cache.delete_if_equals('lock:entry', 'mine')
+    assert cache.get('lock:entry') is None
+
+    server.connected = False
+    assert cache.add('lock:entry', 'mine')
+    assert not cache.delete_if_equals('lock:entry', 'theirs')
+    assert cache.delete_if_equals('lock:entry', 'mine')
+    assert cache.get('lock:entry') is None
+
+
+def test_lock_taken_over_during_release_is_kept(server, monkeypatch):
+    cache = worker_cache(server)
+    redis = fakeredis.FakeStrictRedis(server=server)
+    assert cache.add('lock:entry', 'mine')
+    pipeline = cache._write_client.pipeline
+
+    def racing_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        get = pipe.get
+
+        def get_then_take_over(name):
+            # The lock expires and another worker takes it right after the check
+            value = get(name)
+            redis.set(name, cache.serializer.dumps('theirs'))
+            return value
+
+        pipe.get = get_then_take_over
+        return pipe
+
+    monkeypatch.setattr(cache._write_client, 'pipeline', racing_pipeline)
+    assert not cache.delete_if_equals('lock:entry', 'mine')
+    assert cache.get('lock:entry') == 'theirs'
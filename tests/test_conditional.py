@@ -0,0 +1,56 @@
+"""
+Conditional GETs on the public catalog: a matching ETag gets a 304, and a
+representation that shrank is never answered 304 from a date alone.
+"""
+from datetime import datetime, timedelta
+
+from werkzeug.http import http_date
+
+from backend.models import db, Service, ServiceProfessional
+
+
+def add_service(app, name):
+    with app.app_context():
+        service = Service(name=name, description='d', base_price=80.0, avg_duration=30)
+        db.session.add(service)
+        db.session.commit()
+        return service.id
+
+
+def later():
+    return http_date(datetime.utcnow() + timedelta(days=1))
+
+
+def test_deleted_service_is_not_answered_from_if_modified_since(app, client, admin, auth_headers):
+    service_id = add_service(app, f'Painting {datetime.utcnow().timestamp()}')
+    response = client.get('/api/services')
+    assert response.status_code == 200
+    assert 'Last-Modified' not in response.headers
+    etag = response.headers['ETag']
+    assert client.get('/api/services', headers={'If-None-Match': etag}).status_code == 304
+
+    response = client.delete(f'/api/admin/services/{service_id}', headers=auth_headers(admin))
+    assert response.status_code == 200
+
+    response = client.get('/api/services', headers={'If-Modified-Since': later()})
+    assert response.status_code == 200
+    assert service_id not in [service['id'] for service in response.get_json()]
+    assert client.get('/api/services', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_professional_leaving_a_service_is_not_answered_from_if_modified_since(app, client, marketplace):
+    professional = marketplace['professional']
+    path = f'/api/services/{professional.service_type_id}/professionals'
+    response = client.get(path)
+    assert [pro['id'] for pro in response.get_json()] == [professional.id]
+    etag = response.headers['ETag']
+
+    other_service_id = add_service(app, f'Gardening {datetime.utcnow().timestamp()}')
+    with app.app_context():
+        db.session.get(ServiceProfessional, professional.id).service_type_id = other_service_id
+        db.session.commit()
+
+    response = client.get(path, headers={'If-Modified-Since': later()})
+    assert response.status_code == 200
+    assert response.get_json() == []
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 200
@@ -0,0 +1,119 @@
+"""
+Engine setup, migrations and the queries whose SQL differs between
+dialects (date bucketing, ON CONFLICT and FOR UPDATE, advisory locks,
+statement timeouts), on whichever database the suite runs against: SQLite
+by default, ``TEST_DATABASE_URL`` when set.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from sqlalchemy import func, text
+
+from backend.availability import available_services, refresh_availability
+from backend.database import check_database
+from backend.extensions import cache
+from backend.migrations import MIGRATIONS, migration_lock, schema_version, upgrade_database
+from backend.models import db, DailyStat, Service, ServiceProfessional, ServiceRequest
+from backend.rollups import backfill_daily_stats
+
+
+def test_check_database_accepts_the_test_database(app):
+    check_database(app)
+
+
+def test_check_database_rejects_an_unreachable_database(tmp_path):
+    broken = Flask('broken')
+    broken.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'missing' / 'housecare.db'}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(broken)
+    with pytest.raises(RuntimeError):
+        check_database(broken)
+
+
+def test_upgrade_database_is_current_and_idempotent(app):
+    with app.app_context():
+        with migration_lock():
+            assert upgrade_database() == MIGRATIONS[-1][0]
+        applied = db.session.query(func.count()).select_from(schema_version).scalar()
+        with migration_lock():
+            assert upgrade_database() == MIGRATIONS[-1][0]
+        assert db.session.query(func.count()).select_from(schema_version).scalar() == applied
+
+
+def test_engine_profile_is_applied_to_connections(app):
+    config = app.config
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            timeout = db.session.execute(text(
+                "SELECT setting FROM pg_settings WHERE name = 'statement_timeout'"
+            )).scalar()
+            assert int(timeout) == config['DB_STATEMENT_TIMEOUT_MS']
+        elif dialect == 'sqlite':
+            assert db.session.execute(text('PRAGMA journal_mode')).scalar() == config['SQLITE_JOURNAL_MODE'].lower()
+            assert db.session.execute(text('PRAGMA busy_timeout')).scalar() == config['SQLITE_BUSY_TIMEOUT_MS']
+        else:
+            pytest.skip(f'No engine profile for {dialect}')
+
+
+def complete_request(app, marketplace, completion_date):
+    customer, professional = marketplace['customer'], marketplace['professional']
+    with app.app_context():
+        db.session.add(ServiceRequest(
+            service_id=professional.service_type_id, customer_id=customer.id, pro_id=professional.id,
+            status='completed', completion_date=completion_date, completed_on=completion_date
+        ))
+        db.session.commit()
+
+
+def test_rollup_buckets_completions_by_day(app, marketplace):
+    day = datetime.utcnow().date() - timedelta(days=3)
+    complete_request(app, marketplace, datetime.combine(day, datetime.min.time()) + timedelta(hours=15))
+    service_id = marketplace['professional'].service_type_id
+    with app.app_context():
+        backfill_daily_stats(day, day)
+        row = DailyStat.query.filter_by(day=day, service_id=service_id).one()
+        assert (row.completed_count, row.revenue) == (1, 100.0)
+
+
+def test_availability_refresh_counts_professionals(app, marketplace):
+    professional = marketplace['professional']
+    with app.app_context():
+        refresh_availability(professional.id)
+        assert available_services('500001')[professional.service_type_id] == 1
+
+        db.session.add(ServiceProfessional(
+            username=f'{professional.username}-2', email=f'2-{professional.email}', full_name='Professional',
+            is_approved=True, service_type_id=professional.service_type_id, pin_code='500001'
+        ))
+        db.session.commit()
+        added = ServiceProfessional.query.filter_by(username=f'{professional.username}-2').one().id
+        refresh_availability(added)
+        assert available_services('500001')[professional.service_type_id] == 2
+
+
+@pytest.mark.parametrize('path', [
+    '/api/admin/analytics/revenue',
+    '/api/admin/analytics/revenue/year',
+    '/api/admin/analytics/user-growth',
+    '/api/admin/services/stats',
+    '/api/admin/users/stats',
+])
+def test_analytics_endpoints_answer(client, admin, auth_headers, path):
+    cache.clear()
+    assert client.get(path, headers=auth_headers(admin)).status_code == 200
+
+
+def test_services_usage_counts_rolled_up_completions(app, client, admin, marketplace, auth_headers):
+    complete_request(app, marketplace, datetime.utcnow() - timedelta(days=1))
+    with app.app_context():
+        backfill_daily_stats()
+        name = db.session.get(Service, marketplace['professional'].service_type_id).name
+    cache.clear()
+    response = client.get('/api/admin/analytics/services-usage', headers=auth_headers(admin))
+    assert response.status_code == 200
+    usage = dict(zip(response.get_json()['labels'], response.get_json()['data']))
+    assert usage[name] == 1
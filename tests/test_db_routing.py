@@ -0,0 +1,143 @@
+"""
+Read-replica routing against two SQLite files: the primary and the replica
+hold the same customer and service but differently labelled requests, so
+every response shows which database it was read from.
+"""
+import pytest
+from flask import jsonify
+from flask_sqlalchemy import get_state
+from sqlalchemy import orm, update
+
+from backend.database import engine_options
+from backend.db_routing import read_only, recent_write_key, use_primary
+from backend.extensions import cache
+from backend.models import db, Customer, Service, ServiceRequest
+
+CUSTOMER_ID = 1
+SERVICE_ID = 1
+# A POST and a GET endpoint whose views the tests replace
+POST_ENDPOINT = 'customer.customer_service_requests'
+GET_ENDPOINT = 'public.get_services'
+
+
+def seed(engine, label):
+    db.metadata.create_all(bind=engine)
+    with orm.Session(bind=engine) as session:
+        customer = Customer(id=CUSTOMER_ID, username='routed', email='routed@example.com',
+                            full_name='Routed', is_approved=True, address='Street 1', phone_number='1')
+        customer.set_password('secret')
+        session.add_all([
+            Service(id=SERVICE_ID, name='Cleaning', description='d', base_price=100.0, avg_duration=60),
+            customer,
+            ServiceRequest(service_id=SERVICE_ID, customer_id=CUSTOMER_ID, status='requested', notes=label),
+        ])
+        session.commit()
+
+
+def notes():
+    return [service_request.notes for service_request in ServiceRequest.query.order_by(ServiceRequest.id)]
+
+
+@pytest.fixture
+def routed(app, tmp_path):
+    """Point the app at a primary and a replica file, restoring its own engines afterwards."""
+    state = get_state(app)
+    connectors = dict(state.connectors)
+    config = {name: app.config[name]
+              for name in ('SQLALCHEMY_DATABASE_URI', 'SQLALCHEMY_BINDS', 'SQLALCHEMY_ENGINE_OPTIONS')}
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}",
+        SQLALCHEMY_BINDS={'replica': f"sqlite:///{tmp_path / 'replica.db'}"},
+    )
+    # The suite's own database may be PostgreSQL, with server pool options
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    with app.app_context():
+        engines = [db.get_engine(app), db.get_engine(app, bind='replica')]
+        seed(engines[0], 'primary')
+        seed(engines[1], 'replica')
+    cache.delete(recent_write_key(str(CUSTOMER_ID)))
+    yield
+    cache.delete(recent_write_key(str(CUSTOMER_ID)))
+    app.config.update(config)
+    state.connectors.clear()
+    state.connectors.update(connectors)
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def customer_headers(app, routed, auth_headers):
+    with app.app_context():
+        customer = db.session.get(Customer, CUSTOMER_ID)
+        db.session.expunge(customer)
+    return auth_headers(customer)
+
+
+def listed_notes(client, headers):
+    response = client.get('/api/customer/service-requests', headers=headers)
+    assert response.status_code == 200
+    return [item['notes'] for item in response.get_json()]
+
+
+def test_get_reads_the_replica(client, customer_headers):
+    assert listed_notes(client, customer_headers) == ['replica']
+
+
+def test_writer_reads_the_primary_within_the_lag_tolerance(app, client, customer_headers):
+    assert app.config['REPLICA_LAG_TOLERANCE'] > 0
+    response = client.post('/api/customer/service-requests', headers=customer_headers,
+                           json={'service_id': SERVICE_ID, 'notes': 'booked'})
+    assert response.status_code == 201
+    assert listed_notes(client, customer_headers) == ['primary', 'booked']
+
+    # Once the marker expires the replica serves the user again
+    cache.delete(recent_write_key(str(CUSTOMER_ID)))
+    assert listed_notes(client, customer_headers) == ['replica']
+
+
+def test_reads_after_a_flush_go_to_the_primary(app, client, routed, monkeypatch):
+    def view():
+        before = notes()
+        db.session.add(ServiceRequest(service_id=SERVICE_ID, customer_id=CUSTOMER_ID, notes='flushed'))
+        db.session.flush()
+        after = notes()
+        db.session.commit()
+        return jsonify(before=before, after=after)
+
+    monkeypatch.setitem(app.view_functions, GET_ENDPOINT, view)
+    assert client.get('/api/services').get_json() == {
+        'before': ['replica'], 'after': ['primary', 'flushed']
+    }
+
+
+def test_executed_update_pins_the_primary(app, client, routed, monkeypatch):
+    def view():
+        db.session.execute(update(ServiceRequest).values(notes='updated'))
+        db.session.commit()
+        return jsonify(notes())
+
+    monkeypatch.setitem(app.view_functions, GET_ENDPOINT, view)
+    assert client.get('/api/services').get_json() == ['updated']
+    with app.app_context():
+        replica = orm.Session(bind=db.get_engine(app, bind='replica'))
+        assert [row.notes for row in replica.query(ServiceRequest)] == ['replica']
+        replica.close()
+
+
+def test_use_primary_pins_a_get(app, client, routed, monkeypatch):
+    def view():
+        use_primary()
+        return jsonify(notes())
+
+    monkeypatch.setitem(app.view_functions, GET_ENDPOINT, view)
+    assert client.get('/api/services').get_json() == ['primary']
+
+
+def test_read_only_view_reads_the_replica(app, client, routed, monkeypatch):
+    def view():
+        return jsonify(notes())
+
+    monkeypatch.setitem(app.view_functions, POST_ENDPOINT, view)
+    assert client.post('/api/customer/service-requests').get_json() == ['primary']
+    monkeypatch.setitem(app.view_functions, POST_ENDPOINT, read_only(view))
+    assert client.post('/api/customer/service-requests').get_json() == ['replica']
@@ -0,0 +1,84 @@
+"""
+Service request exports: the CSV header and rows, gzip on request, and one
+NDJSON line per request. Batches are kept small so every export spans
+several of them.
+"""
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from backend.serializers import EXPORT_REQUEST
+
+REQUESTS = 5
+
+
+@pytest.fixture
+def export(app, client, admin, marketplace, auth_headers, monkeypatch):
+    monkeypatch.setitem(app.config, 'STREAM_BATCH_SIZE', 2)
+    marketplace['add_requests'](REQUESTS)
+    service_id = marketplace['professional'].service_type_id
+
+    def get(export_format, headers=None):
+        return client.get(
+            f'/api/admin/service-requests/export?format={export_format}&service_id={service_id}',
+            headers={**auth_headers(admin), **(headers or {})}
+        )
+    return get
+
+
+def test_csv_has_the_header_and_one_row_per_request(export, marketplace):
+    response = export('csv')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'].endswith('.csv"')
+
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == list(EXPORT_REQUEST.fields)
+    records = [dict(zip(rows[0], row)) for row in rows[1:]]
+    assert len(records) == REQUESTS
+    assert [int(record['id']) for record in records] == sorted(int(record['id']) for record in records)
+    assert {record['customer_name'] for record in records} == {marketplace['customer'].username}
+    assert [record['status'] for record in records] == ['requested', 'assigned', 'completed', 'cancelled', 'requested']
+
+
+def test_export_is_gzipped_when_accepted(app, export, monkeypatch):
+    monkeypatch.setitem(app.config, 'COMPRESSION_ENABLED', True)
+    plain = export('csv')
+    assert 'Content-Encoding' not in plain.headers
+    # Read before the next request: both would share this thread's session,
+    # and the next request's teardown would close the streaming cursor
+    body = plain.get_data()
+
+    compressed = export('csv', {'Accept-Encoding': 'gzip'})
+    assert compressed.status_code == 200
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert gzip.decompress(compressed.get_data()) == body
+
+
+def test_export_is_not_gzipped_with_compression_disabled(app, export, monkeypatch):
+    monkeypatch.setitem(app.config, 'COMPRESSION_ENABLED', False)
+    response = export('csv', {'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data(as_text=True).startswith('id,')
+
+
+def test_ndjson_has_one_line_per_request(export):
+    response = export('ndjson')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+
+    body = response.get_data(as_text=True)
+    assert body.endswith('\n')
+    records = [json.loads(line) for line in body.splitlines()]
+    assert len(records) == REQUESTS
+    assert all(set(record) == set(EXPORT_REQUEST.fields) for record in records)
+
+
+def test_unknown_format_returns_400(export):
+    response = export('xml')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Unknown format: xml'}
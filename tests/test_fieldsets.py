@@ -0,0 +1,58 @@
+"""
+Sparse fieldsets: unknown ``fields`` are rejected with 400, and a narrowed
+listing issues one SELECT naming only the columns of the requested fields.
+"""
+import re
+
+import pytest
+
+
+def selected_columns(statement):
+    """The (table, column) pairs in a statement's select list."""
+    select_list = re.match(r'SELECT\s(.*?)\sFROM\s', statement, re.DOTALL).group(1)
+    return set(re.findall(r'(\w+)\.(\w+)', select_list))
+
+
+@pytest.mark.parametrize('user, path', [
+    ('admin', '/api/admin/users?fields=id,password_hash'),
+    ('customer', '/api/customer/service-requests?fields=id,nope'),
+    ('customer', '/api/customer/service-requests?fields=,'),
+    (None, '/api/services/{service_id}/professionals?fields=id,secret'),
+])
+def test_unknown_fields_return_400(client, admin, marketplace, auth_headers, user, path):
+    headers = {} if user is None else auth_headers(admin if user == 'admin' else marketplace[user])
+    path = path.format(service_id=marketplace['professional'].service_type_id)
+    assert client.get(path, headers=headers).status_code == 400
+
+
+def narrowed_listing(client, count_queries, headers, path):
+    with count_queries() as executed:
+        response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    # Everything but the JWT user lookups, which run first (once per decorator)
+    listing = [statement for statement in executed if statement != executed[0]]
+    assert len(listing) == 1
+    return response.get_json(), listing[0]
+
+
+def test_narrowed_user_listing_selects_only_the_requested_columns(client, admin, marketplace,
+                                                                  auth_headers, count_queries):
+    marketplace['add_professionals'](3)
+    users, statement = narrowed_listing(client, count_queries, auth_headers(admin),
+                                        '/api/admin/users?fields=id,username,is_active')
+    assert users and all(set(user) == {'id', 'username', 'is_active'} for user in users)
+    # The discriminator is always loaded, it decides each row's class
+    assert selected_columns(statement) == {
+        ('users', 'id'), ('users', 'username'), ('users', 'is_active'), ('users', 'user_type')
+    }
+    assert ' JOIN ' not in statement
+
+
+def test_narrowed_request_listing_selects_only_the_requested_columns(client, marketplace,
+                                                                     auth_headers, count_queries):
+    marketplace['add_requests'](3)
+    requests, statement = narrowed_listing(client, count_queries, auth_headers(marketplace['customer']),
+                                           '/api/customer/service-requests?fields=id,status')
+    assert [set(item) for item in requests] == [{'id', 'status'}] * 3
+    assert selected_columns(statement) == {('service_requests', 'id'), ('service_requests', 'status')}
+    assert ' JOIN ' not in statement
@@ -0,0 +1,60 @@
+"""
+The JWT identity cache: a request made with the same token after a profile
+update or an admin action sees the change, because the handlers call
+``invalidate_identity`` once they have committed.
+"""
+import pytest
+
+from backend.identity_cache import identity_cache_stats, invalidate_identity
+
+
+@pytest.fixture
+def identity_cache(app, monkeypatch, marketplace):
+    # The suite runs with the cache off; these tests are about it
+    monkeypatch.setitem(app.config, 'IDENTITY_CACHE_ENABLED', True)
+    yield
+    with app.app_context():
+        invalidate_identity(marketplace['customer'].id)
+
+
+def login(client, user):
+    response = client.post('/api/auth/login', json={'userInput': user.username, 'password': 'secret'})
+    assert response.status_code == 200
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+def profile(client, headers):
+    response = client.get('/api/auth/profile', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_repeated_requests_are_served_from_the_cache(client, marketplace, identity_cache):
+    headers = login(client, marketplace['customer'])
+    profile(client, headers)
+    hits = identity_cache_stats()['local_hits']
+    profile(client, headers)
+    assert identity_cache_stats()['local_hits'] == hits + 1
+
+
+def test_profile_update_is_seen_with_the_same_token(client, marketplace, identity_cache):
+    headers = login(client, marketplace['customer'])
+    assert profile(client, headers)['address'] == 'Street 1'
+
+    response = client.put('/api/customer/profile', headers=headers,
+                          json={'address': 'Street 2', 'phone_number': '2'})
+    assert response.status_code == 200
+
+    updated = profile(client, headers)
+    assert (updated['address'], updated['phone_number']) == ('Street 2', '2')
+
+
+def test_block_is_seen_with_the_same_token(client, admin, auth_headers, marketplace, identity_cache):
+    customer = marketplace['customer']
+    headers = login(client, customer)
+    assert profile(client, headers)['is_active'] is True
+
+    response = client.put(f'/api/admin/block/{customer.id}', headers=auth_headers(admin))
+    assert response.status_code == 200
+
+    assert profile(client, headers)['is_active'] is False
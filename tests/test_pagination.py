@@ -0,0 +1,46 @@
+"""
+Keyset pagination: pages follow each other without gaps or repeats, and
+cursors that cannot be used are rejected with 400.
+"""
+import base64
+import json
+
+import pytest
+
+
+def cursor_of(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def test_pages_cover_every_request_once(client, marketplace, auth_headers):
+    marketplace['add_requests'](7)
+    headers = auth_headers(marketplace['customer'])
+    ids, cursor = [], ''
+    while True:
+        response = client.get(f'/api/customer/service-requests?limit=3&cursor={cursor}', headers=headers)
+        assert response.status_code == 200
+        body = response.get_json()
+        assert len(body['items']) <= 3
+        ids += [item['id'] for item in body['items']]
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert ids == sorted(ids)
+    assert len(ids) == 7
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-a-cursor',
+    cursor_of(['k', 1]),
+    cursor_of({'key': 1}),
+    # Valid JSON, but not an integer key
+    cursor_of({'k': 'a'}),
+    cursor_of({'k': 1.5}),
+    cursor_of({'k': True}),
+    cursor_of({'k': None}),
+])
+def test_unusable_cursor_returns_400(client, marketplace, auth_headers, cursor):
+    response = client.get(f'/api/customer/service-requests?cursor={cursor}',
+                          headers=auth_headers(marketplace['customer']))
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor'}
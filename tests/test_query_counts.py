@@ -0,0 +1,36 @@
+"""
+Listings must issue a fixed number of statements whatever the number of
+rows: relationships are loaded with joins or one batched query each, never
+one query per row. Each case counts the statements of a request, adds rows
+and counts again.
+"""
+import pytest
+
+# (user, path, what to add, statements: JWT user lookup included)
+LISTINGS = [
+    ('customer', '/api/customer/service-requests', 'requests', 2),
+    ('customer', '/api/customer/service-history', 'requests', 3),
+    ('professional', '/api/professional/service-requests', 'requests', 3),
+    ('admin', '/api/admin/users', 'professionals', 6),
+    ('admin', '/api/admin/users', 'customers', 6),
+    ('admin', '/api/admin/customers', 'customers', 3),
+    ('admin', '/api/admin/professionals', 'professionals', 4),
+    ('admin', '/api/admin/professionals?include_verification=true', 'professionals', 4),
+    ('admin', '/api/admin/professionals/details', 'professionals', 4),
+    ('admin', '/api/admin/professionals/details?include_verification=true', 'professionals', 4),
+]
+
+
+@pytest.mark.parametrize('user, path, rows, statements', LISTINGS)
+def test_listing_query_count_does_not_grow_with_rows(client, admin, marketplace, auth_headers,
+                                                     count_queries, user, path, rows, statements):
+    headers = auth_headers(admin if user == 'admin' else marketplace[user])
+    add_rows = marketplace[f'add_{rows}']
+    counts = []
+    for count in (2, 20):
+        add_rows(count)
+        with count_queries() as executed:
+            response = client.get(path, headers=headers)
+        assert response.status_code == 200
+        counts.append(len(executed))
+    assert counts == [statements, statements]
@@ -0,0 +1,119 @@
+"""
+Single-flight view caching: a stale entry keeps being served while one
+request recomputes it, and concurrent requests never start a second
+computation. The view runs on its own Flask app whose cache is a
+``TwoTierRedisCache`` over fakeredis, so the refresh lock is a real
+``SET NX`` as with Redis.
+"""
+import threading
+import time
+
+import fakeredis
+import pytest
+from flask import Flask, jsonify
+
+from backend.cache_backend import TwoTierRedisCache
+from backend.caching import single_flight
+from backend.extensions import cache
+
+FRESH_SECONDS = 1
+THREADS = 8
+
+
+class SlowView:
+    """A view counting its computations, each held until ``release`` is set."""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5)
+        return jsonify(calls=self.calls)
+
+    def hold(self):
+        self.started.clear()
+        self.release.clear()
+
+
+@pytest.fixture
+def flight():
+    app = Flask('single_flight')
+    app.extensions['cache'] = {cache: TwoTierRedisCache(
+        host=fakeredis.FakeStrictRedis(server=fakeredis.FakeServer()), key_prefix='test:', probe_interval=0.05
+    )}
+    view = SlowView()
+    app.add_url_rule('/report', 'report', single_flight(timeout=FRESH_SECONDS, stale_timeout=60)(view))
+    yield app, view
+    view.release.set()
+
+
+def get(app):
+    response = app.test_client().get('/report')
+    assert response.status_code == 200
+    return response.get_json()['calls']
+
+
+def concurrently(app, count):
+    """Start ``count`` requests at once; returns the threads and their results."""
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get(app))) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(flight):
+    app, view = flight
+    assert get(app) == 1
+    assert get(app) == 1
+    time.sleep(FRESH_SECONDS + 0.1)
+
+    view.hold()
+    refresher, results = concurrently(app, 1)
+    assert view.started.wait(5)
+    # The entry is stale and being refreshed: served as it is, without waiting
+    assert [get(app) for _ in range(3)] == [1, 1, 1]
+    view.release.set()
+    refresher[0].join(5)
+
+    assert results == [2]
+    assert get(app) == 2
+    assert view.calls == 2
+
+
+def test_concurrent_requests_on_a_stale_entry_refresh_it_once(flight):
+    app, view = flight
+    assert get(app) == 1
+    time.sleep(FRESH_SECONDS + 0.1)
+
+    view.hold()
+    threads, results = concurrently(app, THREADS)
+    assert view.started.wait(5)
+    time.sleep(0.2)
+    view.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert view.calls == 2
+    # Requests that saw the entry stale got it as it was; the refresher the new one
+    assert len(results) == THREADS and set(results) == {1, 2}
+
+
+def test_concurrent_requests_on_a_missing_entry_compute_it_once(flight):
+    app, view = flight
+    view.hold()
+    threads, results = concurrently(app, THREADS)
+    assert view.started.wait(5)
+    # The others poll for the entry instead of computing it
+    time.sleep(0.2)
+    view.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert view.calls == 1
+    assert results == [1] * THREADS